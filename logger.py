@@ -8,12 +8,26 @@ import os
 import logging
 import datetime as dt
 
-# Configure the logger
-date_now = dt.datetime.now().strftime("%Y-%m-%dT%H-%M")
-logger_file_path = '{}/deltaLog_{}.log'.format(os.environ['LOG_PATH'], date_now)
-logger = logging.basicConfig(
-    filename=logger_file_path,
-    level=logging.INFO, format='%(asctime)s:%(levelname)s: | %(message)s',
-    force=True    # remove any existing handlers attached to the root logger
-)
-logger = logging.getLogger(__name__)
\ No newline at end of file
+logger = logging.getLogger(__name__)
+logger_file_path = None     # set once logging to file
+
+
+def log_to_file(log_dir_path:str=None) -> str:
+    """configure the root logger to write to 'deltaLog_{%Y-%m-%dT%H-%M}.log', once per process
+
+    Args:
+        log_dir_path (str, optional): log dir. Defaults to None (LOG_PATH env var).
+
+    Returns:
+        str: log file path
+    """
+    global logger_file_path
+    if (logger_file_path is None):
+        date_now = dt.datetime.now().strftime("%Y-%m-%dT%H-%M")
+        logger_file_path = '{}/deltaLog_{}.log'.format(log_dir_path or os.environ['LOG_PATH'], date_now)
+        logging.basicConfig(
+            filename=logger_file_path,
+            level=logging.INFO, format='%(asctime)s:%(levelname)s: | %(message)s',
+            force=True    # remove any existing handlers attached to the root logger
+        )
+    return logger_file_path
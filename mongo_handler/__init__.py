@@ -4,4 +4,5 @@
 # Sun 9 Jul 2023
 # ----------------------------------------------------------
 
-# To Do: store stock prices in MongoDB - equivalent to sql_handler.stock_price
\ No newline at end of file
+# store stock prices in MongoDB - equivalent to sql_handler.stock_price
+from delta.mongo_handler.stock_price import MongoStockPriceDB
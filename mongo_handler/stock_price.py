@@ -0,0 +1,386 @@
+# ----------------------------------------------------------
+# MongoStockPriceDB class
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# ----------------------------------------------------------
+
+import logging
+import numpy as np
+import pandas as pd
+
+from delta.utils import Utils
+from delta.sql_handler.nodata import NoDataDB
+from delta.sql_handler.stock_price import eod_dtypes, intra_dtypes
+
+# collection names
+tickers_collection_name = 'tickers'     # registered tickers, {_id: ticker}
+eod_collection_name = 'eod'             # eod bars of all tickers
+intra_collection_name = 'intra'         # intra bars of all tickers
+
+_duplicate_key_error_code = 11000
+
+
+class MongoStockPriceDB(NoDataDB):
+    # mongodb equivalent of sql_handler.stock_price.StockPriceDB
+    # eod and intra bars go to time-series collections ('ticker' as meta field,
+    # 'trade_datetime' as time field) with a compound index on (ticker, dt);
+    # servers or stand-ins without time-series support get regular collections
+    # with a unique compound index instead. any number of processes may write.
+
+    def __init__(
+        self, logger:logging.Logger, uri:str='mongodb://localhost:27017',
+        db_name:str='delta', client=None, NO_DATA_DB_PATH:str=None,
+    ):
+        """init MongoStockPriceDB
+
+        Args:
+            logger (logging.Logger): logger
+            uri (str, optional): mongodb uri. Defaults to 'mongodb://localhost:27017'.
+            db_name (str, optional): database name. Defaults to 'delta'.
+            client (optional): MongoClient (or mongomock.MongoClient) to use instead of connecting to `uri`. Defaults to None.
+            NO_DATA_DB_PATH (str, optional): nodata.db to clear pushed dts from, like StockPriceDB does. Defaults to None.
+        """
+        self.logger = logger
+        if (client is None):
+            # optional dependency, only needed for the mongodb backend
+            import pymongo
+            client = pymongo.MongoClient(uri)
+        self.logger.info(":: establish connection with mongodb \'{}\' ::".format(db_name))
+        self.client = client
+        self.mongo_db = self.client[db_name]
+
+        self.table_types = ['eod', 'intra']
+        self._init_collections()
+        self._tickers = {doc['_id'] for doc in self.mongo_db[tickers_collection_name].find({}, {'_id': 1})}
+
+        # nodata dts
+        self._is_nodata = NO_DATA_DB_PATH is not None
+        if (self._is_nodata):
+            NoDataDB.__init__(self, self.logger, NO_DATA_DB_PATH)
+
+    def is_stock_price_tables_exist(self, ticker:str) -> tuple[bool, list[str]]:
+        """check if the input ticker exists in database
+
+        Args:
+            ticker (str): _description_
+
+        Returns:
+            tuple[bool, list[str]]: is ticker registered, table types to create for it
+        """
+        self.logger.info("check stock price table exist")
+        is_exist = ticker in self._tickers
+        self.logger.info('- check if {} tables exist: {}'.format(ticker, is_exist))
+        return is_exist, ([] if is_exist else list(self.table_types))
+
+    def crt_stock_price_tables(self, ticker:str, table_types:list[str]):
+        """register a ticker, its documents go to the shared collections
+
+        Args:
+            ticker (str): _description_
+            table_types (list[str]): _description_
+        """
+        if (('eod' in table_types) or ('intra' in table_types)):
+            self.crt_missing_stock_price_tables([ticker])
+
+    def crt_missing_stock_price_tables(self, tickers:list[str]) -> int:
+        """register the tickers not registered yet
+
+        Args:
+            tickers (list[str]): tickers
+
+        Returns:
+            int: number of registered tickers
+        """
+        crt_tickers = [ticker for ticker in dict.fromkeys(tickers) if ticker not in self._tickers]
+        if (not crt_tickers):
+            return 0
+        self.logger.info("register {} tickers".format(len(crt_tickers)))
+        self._insert_many_unordered(
+            self.mongo_db[tickers_collection_name], [{'_id': ticker} for ticker in crt_tickers],
+        )
+        self._tickers.update(crt_tickers)
+        return len(crt_tickers)
+
+    def push_eod(self, ticker:str, df:pd.DataFrame, overwrite:bool=False) -> bool:
+        """push eod bars of a ticker, skipping dates already stored unless `overwrite`
+
+        Args:
+            ticker (str): ticker
+            df (pd.DataFrame): eod bars as returned by the api
+            overwrite (bool, optional): replace the bars of dates already stored. Defaults to False.
+
+        Returns:
+            bool: True if the data is successfully pushed, False otherwise.
+        """
+        self.logger.info('prepare for eod push')
+        is_success_format, df = Utils._format_column_names(df, 'eod')
+        if (not is_success_format):
+            self.logger.info('- fail to format dataframe')
+            return False
+
+        df = df.assign(trade_datetime=pd.to_datetime(df['trade_date']))
+        return self._push(eod_collection_name, 'trade_date', ticker, df, overwrite)
+
+    def push_intra(self, ticker:str, df:pd.DataFrame, overwrite:bool=False) -> bool:
+        """push intra bars of a ticker, skipping timestamps already stored unless `overwrite`
+
+        Args:
+            ticker (str): ticker
+            df (pd.DataFrame): intra bars as returned by the api
+            overwrite (bool, optional): replace the bars of timestamps already stored. Defaults to False.
+
+        Returns:
+            bool: True if the data is successfully pushed, False otherwise.
+        """
+        self.logger.info('prepare for intra push')
+        is_success_format, df = Utils._format_column_names(df, 'intra')
+        if (not is_success_format):
+            self.logger.info('- fail to format dataframe')
+            return False
+
+        df = df.assign(trade_datetime=pd.to_datetime(df['trade_timestamp'], unit='s'))
+        return self._push(intra_collection_name, 'trade_timestamp', ticker, df, overwrite)
+
+    def pull_tkl_dts(
+        self, ticker:str, start_date:str,
+        end_date:str, start_ts:int, end_ts:int
+    ) -> tuple[list[str], list[int]]:
+        """pull existing dates and timestamps from database
+
+        Args:
+            ticker (str): _description_
+            start_date (str): _description_
+            end_date (str): _description_
+            start_ts (int): _description_
+            end_ts (int): _description_
+
+        Returns:
+            tuple[list[str], list[int]]: _description_
+        """
+        self.logger.info("pull ticker dts: \'{}\'".format(ticker))
+        dates = [doc['trade_date'] for doc in self.mongo_db[eod_collection_name].find(
+            {'ticker': ticker, 'trade_date': {'$gte': start_date, '$lte': end_date}},
+            {'_id': 0, 'trade_date': 1},
+        ).sort('trade_date', 1)]
+        timestamps = [int(doc['trade_timestamp']) for doc in self.mongo_db[intra_collection_name].find(
+            {'ticker': ticker, 'trade_timestamp': {'$gte': int(start_ts), '$lte': int(end_ts)}},
+            {'_id': 0, 'trade_timestamp': 1},
+        ).sort('trade_timestamp', 1)]
+        self.logger.info('- existing dts: {}(date) {}(tss)'.format(len(dates), len(timestamps)))
+        return dates, timestamps
+
+    def pull_eod(
+        self, tickers:str|list[str], start_date:str=None, end_date:str=None,
+        columns:list[str]=None, as_frame:bool=True,
+    ) -> pd.DataFrame|np.ndarray:
+        """pull eod bars of one or more tickers, see `StockPriceDB.pull_eod`
+
+        Args:
+            tickers (str | list[str]): ticker, or list of tickers
+            start_date (str, optional): first date, '%Y-%m-%d'. Defaults to None (no bound).
+            end_date (str, optional): last date, '%Y-%m-%d'. Defaults to None (no bound).
+            columns (list[str], optional): columns to read, 'trade_date' is always included. Defaults to None (all).
+            as_frame (bool, optional): return a DataFrame instead of a structured array. Defaults to True.
+
+        Returns:
+            pd.DataFrame | np.ndarray: bars sorted by ticker and date, with a 'ticker' column when `tickers` is a list
+        """
+        return self._pull(eod_collection_name, eod_dtypes, tickers, start_date, end_date, columns, as_frame)
+
+    def pull_intra(
+        self, tickers:str|list[str], start_ts:int=None, end_ts:int=None,
+        columns:list[str]=None, as_frame:bool=True,
+    ) -> pd.DataFrame|np.ndarray:
+        """pull intra bars of one or more tickers, see `StockPriceDB.pull_intra`
+
+        Args:
+            tickers (str | list[str]): ticker, or list of tickers
+            start_ts (int, optional): first unix timestamp. Defaults to None (no bound).
+            end_ts (int, optional): last unix timestamp. Defaults to None (no bound).
+            columns (list[str], optional): columns to read, 'trade_timestamp' is always included. Defaults to None (all).
+            as_frame (bool, optional): return a DataFrame instead of a structured array. Defaults to True.
+
+        Returns:
+            pd.DataFrame | np.ndarray: bars sorted by ticker and timestamp, with a 'ticker' column when `tickers` is a list
+        """
+        start_ts = None if (start_ts is None) else int(start_ts)
+        end_ts = None if (end_ts is None) else int(end_ts)
+        return self._pull(intra_collection_name, intra_dtypes, tickers, start_ts, end_ts, columns, as_frame)
+
+    def _push(
+        self, collection_name:str, dt_column:str, ticker:str,
+        df:pd.DataFrame, overwrite:bool,
+    ) -> bool:
+        """write formatted bars of a ticker with one unordered bulk insert
+
+        Args:
+            collection_name (str): eod or intra collection
+            dt_column (str): date/timestamp column keyed with the ticker
+            ticker (str): ticker
+            df (pd.DataFrame): formatted bars with 'trade_datetime'
+            overwrite (bool): replace stored bars instead of skipping them
+
+        Returns:
+            bool: is success push
+        """
+        if (ticker not in self._tickers):
+            self.logger.info("- \'{}\' is not registered".format(ticker))
+            return False
+        collection = self.mongo_db[collection_name]
+        try:
+            dts = df[dt_column].tolist()
+            dts = [int(x) for x in dts] if (dt_column == 'trade_timestamp') else [str(x) for x in dts]
+            key_filter = {'ticker': ticker, dt_column: {'$gte': min(dts), '$lte': max(dts)}} if dts else None
+            if (key_filter is not None):
+                if (overwrite):
+                    collection.delete_many(dict(key_filter, **{dt_column: {'$in': dts}}))
+                else:
+                    # time-series collections have no unique index, skip stored keys up front
+                    stored_dts = {doc[dt_column] for doc in collection.find(key_filter, {'_id': 0, dt_column: 1})}
+                    df = df[[x not in stored_dts for x in dts]]
+
+            docs = df.assign(ticker=ticker).to_dict('records')
+            for doc in docs:
+                doc[dt_column] = int(doc[dt_column]) if (dt_column == 'trade_timestamp') else str(doc[dt_column])
+                doc['trade_datetime'] = pd.Timestamp(doc['trade_datetime']).to_pydatetime()
+            n_inserted = self._insert_many_unordered(collection, docs)
+            self.logger.info('- {} documents written to \'{}\', {} input'.format(n_inserted, collection_name, len(dts)))
+
+            # check nodata dts
+            if (self._is_nodata):
+                is_eod = dt_column == 'trade_date'
+                if (not self.rm_dts(ticker, dts if is_eod else [], [] if is_eod else dts)):
+                    self.logger.info('- exception on \'rm_dts\'')
+                    return False
+        except Exception as e:
+            self.logger.info('error occurred while pushing \'{}\' {}'.format(ticker, collection_name))
+            self.logger.info('- {}'.format(e))
+            return False
+
+        self.logger.info('success push {}'.format(collection_name))
+        return True
+
+    def _pull(
+        self, collection_name:str, dtypes:dict[str, str], tickers:str|list[str],
+        start, end, columns:list[str], as_frame:bool,
+    ) -> pd.DataFrame|np.ndarray:
+        """read bars ticker by ticker, each a range scan on the (ticker, dt) index
+
+        Args:
+            collection_name (str): eod or intra collection
+            dtypes (dict[str, str]): column dtypes, the first is the dt column
+            tickers (str | list[str]): ticker, or list of tickers
+            start: first date/timestamp, None for no bound
+            end: last date/timestamp, None for no bound
+            columns (list[str]): columns to read, None for all
+            as_frame (bool): return a DataFrame
+
+        Returns:
+            pd.DataFrame | np.ndarray: bars
+        """
+        dt_column = next(iter(dtypes))
+        if (columns is None):
+            columns = list(dtypes)
+        invalid_columns = [col for col in columns if col not in dtypes]
+        if (invalid_columns):
+            raise ValueError("invalid \'{}\' columns: {}".format(collection_name, ', '.join(invalid_columns)))
+        columns = [dt_column] + [col for col in dict.fromkeys(columns) if col != dt_column]
+
+        is_multi = not isinstance(tickers, str)
+        tickers = list(tickers) if is_multi else [tickers]
+        self.logger.info("pull {} of {} tickers".format(collection_name, len(tickers)))
+        dt_range = {}
+        if (start is not None):
+            dt_range['$gte'] = start
+        if (end is not None):
+            dt_range['$lte'] = end
+
+        width = max([len(ticker) for ticker in tickers], default=1)
+        dtype = np.dtype(
+            ([('ticker', 'U{}'.format(width))] if is_multi else [])
+            + [(col, dtypes[col]) for col in columns]
+        )
+        projection = dict({'_id': 0}, **{col: 1 for col in columns})
+        arrays = []
+        for ticker in tickers:
+            query = {'ticker': ticker}
+            if (dt_range):
+                query[dt_column] = dt_range
+            cursor = self.mongo_db[collection_name].find(query, projection).sort(dt_column, 1)
+            rows = (
+                ((ticker, ) if is_multi else ()) + tuple(_to_field(doc.get(col), dtypes[col]) for col in columns)
+                for doc in cursor
+            )
+            arrays.append(np.fromiter(rows, dtype=dtype))
+
+        bars = np.concatenate(arrays) if arrays else np.empty(0, dtype=dtype)
+        self.logger.info("- pulled {} rows".format(len(bars)))
+        return pd.DataFrame(bars) if as_frame else bars
+
+    def _insert_many_unordered(self, collection, docs:list[dict]) -> int:
+        """unordered bulk insert, documents hitting a unique index (concurrent writers) are skipped
+
+        Args:
+            collection (Collection): collection
+            docs (list[dict]): documents
+
+        Returns:
+            int: inserted documents
+        """
+        if (not docs):
+            return 0
+        try:
+            return len(collection.insert_many(docs, ordered=False).inserted_ids)
+        except Exception as e:
+            # pymongo / mongomock BulkWriteError
+            details = getattr(e, 'details', None)
+            if ((not details) or any(
+                err.get('code') != _duplicate_key_error_code for err in details.get('writeErrors', [])
+            )):
+                raise
+            return details.get('nInserted', 0)
+
+    def _init_collections(self):
+        """create the bar collections and their (ticker, dt) indexes
+        """
+        exist_collection_names = self.mongo_db.list_collection_names()
+        for collection_name, dt_column, granularity in (
+            (eod_collection_name, 'trade_date', 'hours'),
+            (intra_collection_name, 'trade_timestamp', 'minutes'),
+        ):
+            is_timeseries = True
+            if (collection_name not in exist_collection_names):
+                try:
+                    self.mongo_db.create_collection(collection_name, timeseries={
+                        'timeField': 'trade_datetime', 'metaField': 'ticker', 'granularity': granularity,
+                    })
+                except Exception as e:
+                    # server < 5.0 or a stand-in without time-series collections
+                    self.logger.info("- no time-series \'{}\' collection: {}".format(collection_name, e))
+                    is_timeseries = False
+            else:
+                try:
+                    is_timeseries = 'timeseries' in self.mongo_db[collection_name].options()
+                except (TypeError, NotImplementedError):
+                    # stand-ins without collection options (mongomock) have no time-series collections
+                    is_timeseries = False
+            self.mongo_db[collection_name].create_index(
+                [('ticker', 1), (dt_column, 1)], unique=not is_timeseries,
+            )
+
+
+def _to_field(value, dtype:str):
+    """document value as a structured array field, missing values as nan
+
+    Args:
+        value: document value
+        dtype (str): field dtype
+
+    Returns:
+        value for the field
+    """
+    if (dtype == 'M8[s]'):
+        return np.datetime64(value, 's') if (value is not None) else np.datetime64('NaT')
+    if ((value is None) and (dtype == 'f8')):
+        return np.nan
+    return value
@@ -0,0 +1,220 @@
+# -----------------------
+# RateLimiter class
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+import datetime as dt
+
+from delta.sql_handler.connection import connect
+
+
+class QuotaExceededError(Exception):
+    """raised when a request would exceed the daily api call limit"""
+
+
+class RateLimiter:
+    """weighted token bucket with a daily call quota
+
+    the bucket refills `calls_per_minute` tokens per minute and every request
+    takes as many tokens as the api calls it costs. state lives in a small
+    sqlite file, so every thread and process pointing at the same `db_path`
+    draws from the same bucket and the same daily quota.
+    """
+
+    def __init__(
+        self, logger:logging.Logger, call_limit:int,
+        calls_per_minute:int=1000, db_path:str=':memory:',
+        name:str='eod',
+    ):
+        """init RateLimiter
+
+        Args:
+            logger (logging.Logger): logger
+            call_limit (int): daily api call limit
+            calls_per_minute (int, optional): bucket size and refill per minute. Defaults to 1000.
+            db_path (str, optional): shared state file, ':memory:' limits only this process. Defaults to ':memory:'.
+            name (str, optional): bucket name, one row per bucket. Defaults to 'eod'.
+        """
+        if (calls_per_minute <= 0):
+            raise ValueError("\'calls_per_minute\' should be positive, not \'{}\'".format(calls_per_minute))
+        self.logger = logger
+        self.call_limit = call_limit
+        self.capacity = calls_per_minute
+        self.refill_per_sec = calls_per_minute / 60
+        self.db_path = db_path
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._con = None
+        self._pid = None
+
+    def acquire(self, cost:int, wait_for_quota:bool=False) -> int:
+        """take `cost` tokens, sleeping until the bucket has refilled enough
+
+        Args:
+            cost (int): api calls of the request
+            wait_for_quota (bool, optional): sleep until the quota resets instead of raising. Defaults to False.
+
+        Raises:
+            QuotaExceededError: daily call limit would be exceeded
+
+        Returns:
+            int: calls used today, including this request
+        """
+        if (cost > self.capacity):
+            raise ValueError("\'cost\' {} exceeds bucket size {}".format(cost, self.capacity))
+
+        while True:
+            with self._lock:
+                tokens, used, wait = self._try_take(cost)
+            if (wait == 0):
+                return used
+            if (tokens is None):     # quota spent
+                if (not wait_for_quota):
+                    raise QuotaExceededError(
+                        "daily api call limit reached: {} used, {} limit".format(used, self.call_limit)
+                    )
+                self.logger.info("- daily call limit reached, wait {:.0f}s for reset".format(wait))
+            time.sleep(wait)
+
+    def sync_used(self, used:int):
+        """align today's count with the calls reported by the api
+
+        Args:
+            used (int): calls used today according to the api
+        """
+        with self._lock:
+            self._begin()
+            try:
+                self._roll_day()
+                self._execute(
+                    "UPDATE rate_limit SET used=MAX(used, ?) WHERE name=?;",
+                    (int(used), self.name),
+                )
+                self._execute("COMMIT;")
+            except Exception:
+                self._execute("ROLLBACK;")
+                raise
+
+    def remaining(self) -> int:
+        """calls left in today's quota
+
+        Returns:
+            int: remaining calls
+        """
+        with self._lock:
+            self._begin()
+            try:
+                self._roll_day()
+                used = self._execute("SELECT used FROM rate_limit WHERE name=?;", (self.name, )).fetchone()[0]
+                self._execute("COMMIT;")
+            except Exception:
+                self._execute("ROLLBACK;")
+                raise
+        return max(self.call_limit - used, 0)
+
+    def _try_take(self, cost:int) -> tuple[float, int, float]:
+        """refill the bucket and take `cost` tokens if possible, in one transaction
+
+        Args:
+            cost (int): api calls of the request
+
+        Returns:
+            tuple[float, int, float]: tokens left (None if quota spent), calls used today, seconds to wait (0 if taken)
+        """
+        self._begin()
+        try:
+            self._roll_day()
+            tokens, updated, used = self._execute(
+                "SELECT tokens, updated, used FROM rate_limit WHERE name=?;", (self.name, )
+            ).fetchone()
+
+            # daily quota
+            if (used + cost > self.call_limit):
+                self._execute("COMMIT;")
+                return None, used, self._secs_to_reset()
+
+            # refill
+            now = time.time()
+            tokens = min(self.capacity, tokens + (now - updated) * self.refill_per_sec)
+            if (tokens < cost):
+                self._execute("COMMIT;")
+                return tokens, used, (cost - tokens) / self.refill_per_sec
+
+            tokens -= cost
+            used += cost
+            self._execute(
+                "UPDATE rate_limit SET tokens=?, updated=?, used=? WHERE name=?;",
+                (tokens, now, used, self.name),
+            )
+            self._execute("COMMIT;")
+            return tokens, used, 0
+        except Exception:
+            self._execute("ROLLBACK;")
+            raise
+
+    def _roll_day(self):
+        """reset the daily count once the (utc) day changes
+        """
+        self._execute(
+            "UPDATE rate_limit SET day=?, used=0 WHERE name=? AND day<>?;",
+            (self._today(), self.name, self._today()),
+        )
+
+    def _begin(self):
+        """start a write transaction, locking out other processes
+        """
+        self._execute("BEGIN IMMEDIATE;")
+
+    def _execute(self, query:str, params:tuple=()) -> sqlite3.Cursor:
+        """execute on this process' connection, reconnecting after a fork
+
+        Args:
+            query (str): sql query
+            params (tuple, optional): query parameters. Defaults to ().
+
+        Returns:
+            sqlite3.Cursor: cursor
+        """
+        if ((self._con is None) or (self._pid != os.getpid())):
+            self._connect()
+        return self._con.execute(query, params)
+
+    def _connect(self):
+        """connect to the state file and make sure the bucket row exists
+        """
+        self._con = connect(self.db_path, 'shared-state', isolation_level=None, check_same_thread=False)
+        self._pid = os.getpid()
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit("
+            "name TEXT PRIMARY KEY, tokens FLOAT, updated FLOAT, "
+            "day TEXT, used BIGINT);"
+        )
+        self._con.execute(
+            "INSERT OR IGNORE INTO rate_limit VALUES (?, ?, ?, ?, 0);",
+            (self.name, float(self.capacity), time.time(), self._today()),
+        )
+
+    def _today(self) -> str:
+        """api quota day, eodhistoricaldata resets at midnight gmt
+
+        Returns:
+            str: '%Y-%m-%d'
+        """
+        return dt.datetime.fromtimestamp(time.time(), dt.timezone.utc).strftime('%Y-%m-%d')
+
+    def _secs_to_reset(self) -> float:
+        """seconds until the next quota day
+
+        Returns:
+            float: seconds
+        """
+        now = dt.datetime.fromtimestamp(time.time(), dt.timezone.utc)
+        tomorrow = (now + dt.timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        return (tomorrow - now).total_seconds()
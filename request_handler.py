@@ -5,32 +5,129 @@
 # -----------------------
 
 import logging
+import threading
 import pandas as pd
-from eod import EodHistoricalData
+from typing import TYPE_CHECKING
 from urllib3.exceptions import HTTPError
 
+from delta.rate_limiter import RateLimiter
+from delta.response_cache import ResponseCache
+
+if TYPE_CHECKING:
+    from eod import EodHistoricalData
+
+_user_url = 'https://eodhistoricaldata.com/api/user'     # account info, incl. today's api requests
+
 class EodApiRequestHandler:
     
-    def __init__(self, logger:logging.Logger, api_key:str, call_limit=100_000):
+    def __init__(
+        self, logger:logging.Logger, api_key:str, call_limit=100_000,
+        calls_per_minute:int=1000, rate_limit_db_path:str=':memory:',
+        wait_for_quota:bool=False, response_cache_path:str=None,
+        offline:bool=False,
+    ):
         """_summary_
 
         Args:
             api_key (str): _description_
-            api_calls (int, optional): _description_. Defaults to 100000.
+            call_limit (int, optional): daily api call limit. Defaults to 100000.
+            calls_per_minute (int, optional): api calls allowed per minute. Defaults to 1000.
+            rate_limit_db_path (str, optional): rate limiter state file shared by all
+                processes using it, ':memory:' for this process only. Defaults to ':memory:'.
+            wait_for_quota (bool, optional): sleep until the daily quota resets instead of
+                raising QuotaExceededError. Defaults to False.
+            response_cache_path (str, optional): response cache file, eod/intra/fundamentals
+                responses are served from it when stored. Defaults to None (no cache).
+            offline (bool, optional): replay cached responses only, never call the api. Defaults to False.
         """
         self.logger = logger
         self.api_key = api_key
-        self.logger.info(":: init EOD API connection ::")
-        self.api_client = EodHistoricalData(self.api_key)
+        self._api_local = threading.local()     # one api client per fetcher thread
+        self._call_lock = threading.Lock()      # guards call_used
         
         # api calls per request
         self.eod_calls_per_reqeust = 1      # end-of-day
         self.intra_calls_per_reqeust = 5    # intraday
         self.fund_calls_per_rquest = 10     # fundamental data
+        self.bulk_calls_per_request = 100   # end-of-day of a whole exchange
+
+        # response cache
+        if (offline and (response_cache_path is None)):
+            raise ValueError("\'offline\' needs a \'response_cache_path\' to replay from")
+        self.offline = offline
+        self.response_cache = None
+        if (response_cache_path is not None):
+            self.response_cache = ResponseCache(self.logger, response_cache_path, offline=offline)
 
-        # daily api count
+        # daily api count, requested from the api on first use
         self.call_limit = call_limit
-        self.call_used = self._call_counts()
+        self._call_used = None
+
+        # rate limit, weighted by calls per request
+        self.wait_for_quota = wait_for_quota
+        self.rate_limiter = RateLimiter(
+            self.logger, self.call_limit, calls_per_minute, rate_limit_db_path,
+        )
+
+    @property
+    def api_client(self) -> 'EodHistoricalData':
+        """api client of the calling thread
+
+        the eod client keeps per-request state on the instance,
+        so each fetcher thread gets its own client.
+
+        Returns:
+            EodHistoricalData: api client
+        """
+        if (not hasattr(self._api_local, 'api_client')):
+            # imported on first request, reads need neither the client nor an api key
+            from eod import EodHistoricalData
+            self.logger.info(":: init EOD API connection ::")
+            self._api_local.api_client = EodHistoricalData(self.api_key)
+        return self._api_local.api_client
+
+    @property
+    def call_used(self) -> int:
+        """api calls used today, from the api on first use (0 offline),
+        the rate limiter is synced with it at the same time
+        """
+        if (self._call_used is None):
+            with self._call_lock:
+                if (self._call_used is None):
+                    call_used = 0 if (self.offline) else self._call_counts()
+                    self.rate_limiter.sync_used(call_used)
+                    self._call_used = call_used
+        return self._call_used
+
+    @call_used.setter
+    def call_used(self, call_used:int):
+        self._call_used = call_used
+
+    def handler_kwargs(self) -> dict:
+        """arguments creating a handler sharing this one's rate limiter and response cache,
+        eg. in a fetcher process
+
+        Returns:
+            dict: `EodApiRequestHandler` arguments, without the logger
+        """
+        return {
+            'api_key': self.api_key,
+            'call_limit': self.call_limit,
+            'calls_per_minute': self.rate_limiter.capacity,
+            'rate_limit_db_path': self.rate_limiter.db_path,
+            'wait_for_quota': self.wait_for_quota,
+            'response_cache_path': None if (self.response_cache is None) else self.response_cache.db_path,
+            'offline': self.offline,
+        }
+
+    def calls_remaining(self) -> int:
+        """api calls left today
+
+        Returns:
+            int: remaining calls
+        """
+        self.call_used      # sync the rate limiter first
+        return self.rate_limiter.remaining()
 
     def request_eod(
         self, ticker:str, exchange:str, 
@@ -51,11 +148,16 @@ class EodApiRequestHandler:
             tuple[bool, list]: _description_
         """
         self.logger.info("fetching eod data between {} and {}".format(start_date, end_date))
-        self.call_used += self.eod_calls_per_reqeust
+        symbol = '{}.{}'.format(ticker, exchange)
+        params = {'period': period, 'order': order, 'from': start_date, 'to': end_date}
+        is_cached, eod_json = self._cached_response('eod', symbol, params)
+        if (is_cached or self.offline):
+            return is_cached, eod_json
+        self._count_calls(self.eod_calls_per_reqeust)
         try:
             eod_json = []
             eod_json = self.api_client.get_prices_eod(
-                '{}.{}'.format(ticker, exchange),
+                symbol,
                 period=period, order=order,
                 from_=start_date, to=end_date,
             )
@@ -63,6 +165,7 @@ class EodApiRequestHandler:
                 self.logger.info("- empty return")
                 return False, ['empty return']     # ??? NOTED
             self.logger.info("- {} data point return".format(len(eod_json)))
+            self._cache_response('eod', symbol, params, eod_json)
             return True, eod_json
         except(HTTPError):
             self.logger.info("- \'HTTP exception raised\'")
@@ -86,21 +189,56 @@ class EodApiRequestHandler:
             tuple[bool, list]: _description_
         """
         self.logger.info("fetching intra data between {} and {}".format(start_ts, end_ts))
-        self.call_used += self.intra_calls_per_reqeust
+        symbol = '{}.{}'.format(ticker, exchange)
+        params = {'interval': interval, 'from': int(start_ts), 'to': int(end_ts)}
+        is_cached, intra_json = self._cached_response('intra', symbol, params)
+        if (is_cached or self.offline):
+            return is_cached, intra_json
+        self._count_calls(self.intra_calls_per_reqeust)
         try:
             intra_json = self.api_client.get_prices_intraday(
-                '{}.{}'.format(ticker, exchange), interval=interval,
+                symbol, interval=interval,
                 from_=start_ts, to=end_ts
             )
             if (not intra_json):
                 self.logger.info("- empty return")
                 return False, ['empty return']     # ???
             self.logger.info("- {} data point return".format(len(intra_json)))
+            self._cache_response('intra', symbol, params, intra_json)
             return True, intra_json
         except:
             self.logger.info("- \'HTTP exception raised\'")
             return False, ['HTTP exception raised']
 
+    def request_bulk_eod(self, exchange:str, date:str) -> tuple[bool, list]:
+        """request eod data of every symbol of an exchange for one date
+
+        Args:
+            exchange (str): exchange code
+            date (str): trade date, '%Y-%m-%d'
+
+        Returns:
+            tuple[bool, list]: is success, [{'code', 'exchange_short_name', 'date', 'open', ...}, ...]
+        """
+        exchange = exchange.upper()
+        self.logger.info("fetching {} bulk eod data of {}".format(exchange, date))
+        params = {'type': 'eod', 'date': date}
+        is_cached, bulk_json = self._cached_response('eod', exchange, params)
+        if (is_cached or self.offline):
+            return is_cached, bulk_json
+        self._count_calls(self.bulk_calls_per_request)
+        try:
+            bulk_json = self.api_client.get_bulk_markets(exchange, **params)
+            if (not bulk_json):
+                self.logger.info("- empty return")
+                return False, ['empty return']
+            self.logger.info("- {} symbols return".format(len(bulk_json)))
+            self._cache_response('eod', exchange, params, bulk_json)
+            return True, bulk_json
+        except:
+            self.logger.info("- \'HTTP exception raised\'")
+            return False, ['HTTP exception raised']
+
     def request_fundamentals(self, ticker:str, exchange:str) -> tuple[bool, dict]:
         """request fundamental data
         
@@ -114,13 +252,17 @@ class EodApiRequestHandler:
         """
         symbol = "{}.{}".format(ticker.upper(), exchange.upper())
         self.logger.info("fetching fundamentals of {}".format(symbol))
-        self.call_used += self.fund_calls_per_rquest
+        is_cached, fund = self._cached_response('fundamentals', symbol, {})
+        if (is_cached or self.offline):
+            return is_cached, (fund if is_cached else {'offline cache miss': ''})
+        self._count_calls(self.fund_calls_per_rquest)
         try:
             fund = self.api_client.get_fundamental_equity(symbol)
             if (not fund):
                 self.logger.info("- empty return")
                 return False, {'empty return': ''}
             self.logger.info("- request success")
+            self._cache_response('fundamentals', symbol, {}, fund)
             return True, fund
         except:
             self.logger.info("- \'HTTP exception raised\'")
@@ -137,7 +279,7 @@ class EodApiRequestHandler:
         """
         exchange = exchange.upper()
         self.logger.info("fetching {} exchange tickers".format(exchange))
-        self.call_used += self.fund_calls_per_rquest
+        self._count_calls(self.fund_calls_per_rquest)
         try:
             exg_symbols = self.api_client.get_exchange_symbols(exchange)
             if (not exg_symbols):
@@ -151,11 +293,64 @@ class EodApiRequestHandler:
             self.logger.info("- \'HTTP exception raised\'")
             return False, {'HTTP exception raised': ''}
 
-    # ?????
+    def _cached_response(self, endpoint:str, symbol:str, params:dict) -> tuple[bool, list|dict]:
+        """look a request up in the response cache
+
+        Args:
+            endpoint (str): 'eod', 'intra' or 'fundamentals'
+            symbol (str): '{ticker}.{exchange}', or the exchange of a bulk request
+            params (dict): request parameters
+
+        Returns:
+            tuple[bool, list|dict]: is cached, cached response (or the offline miss message)
+        """
+        if (self.response_cache is not None):
+            response = self.response_cache.get(endpoint, symbol, params)
+            if (response is not None):
+                self.logger.info("- cached response")
+                return True, response
+        if (self.offline):
+            self.logger.info("- offline, response not cached")
+        return False, ['offline cache miss']
+
+    def _cache_response(self, endpoint:str, symbol:str, params:dict, response:list|dict):
+        """store a successful response in the response cache
+
+        Args:
+            endpoint (str): 'eod', 'intra' or 'fundamentals'
+            symbol (str): '{ticker}.{exchange}'
+            params (dict): request parameters
+            response (list | dict): json response
+        """
+        if (self.response_cache is not None):
+            self.response_cache.put(endpoint, symbol, params, response)
+
     def _call_counts(self) -> int:
         """request call count from eodhistoricaldata.com api
 
+        Raises:
+            ValueError: no api key
+
         Returns:
-            int: _description_
+            int: api calls used today
+        """
+        import requests     # imported on first call
+        if (not self.api_key):
+            raise ValueError("\'API_KEY\' is needed to call the api")
+        resp = requests.get(_user_url, params={'api_token': self.api_key, 'fmt': 'json'}, timeout=60)
+        resp.raise_for_status()
+        return int(resp.json()['apiRequests'])
+
+    def _count_calls(self, calls:int):
+        """wait for the rate limiter and add api calls to the daily count
+
+        Args:
+            calls (int): api calls consumed by a request
+
+        Raises:
+            QuotaExceededError: daily call limit reached and `wait_for_quota` is off
         """
-        return int(self.api_client.get_user()['apiRequests'])
\ No newline at end of file
+        self.call_used      # sync the rate limiter before the first request
+        used = self.rate_limiter.acquire(calls, self.wait_for_quota)
+        with self._call_lock:
+            self._call_used = max(self._call_used + calls, used)
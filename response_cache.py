@@ -0,0 +1,227 @@
+# -----------------------
+# ResponseCache class
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+import datetime as dt
+
+from delta.sql_handler.connection import connect
+
+# seconds an api response stays fresh, per endpoint
+default_ttls = {
+    'eod': 7 * 24 * 3600,
+    'intra': 7 * 24 * 3600,
+    'fundamentals': 24 * 3600,
+}
+# seconds a response stays fresh when its window reaches the (utc) day it was fetched,
+# its last bars may still be missing or change
+open_window_ttl = 15 * 60
+
+
+class ResponseCache:
+    """api responses stored under the hash of (endpoint, symbol, params)
+
+    payloads are zlib compressed json in a sqlite file, served while younger
+    than the endpoint's ttl (`open_window_ttl` for windows reaching the day
+    they were fetched) and evicted least recently used first once the file
+    holds more than `max_bytes` of payloads. in `offline` mode every stored
+    response is replayed regardless of age and nothing is fetched.
+    """
+
+    def __init__(
+        self, logger:logging.Logger, db_path:str,
+        ttls:dict[str, int]=None, max_bytes:int=1 << 30,
+        offline:bool=False, open_window_ttl:int=open_window_ttl,
+    ):
+        """init ResponseCache
+
+        Args:
+            logger (logging.Logger): logger
+            db_path (str): cache file
+            ttls (dict[str, int], optional): seconds a response stays fresh, per endpoint. Defaults to None (`default_ttls`).
+            max_bytes (int, optional): compressed payload bytes kept before evicting. Defaults to 1 GiB.
+            offline (bool, optional): replay stored responses only, never fetch. Defaults to False.
+            open_window_ttl (int, optional): seconds a response stays fresh when its window ('to' or 'date')
+                reaches the day it was fetched. Defaults to 15 minutes.
+        """
+        self.logger = logger
+        self.db_path = db_path
+        self.ttls = dict(default_ttls, **(ttls or {}))
+        self.open_window_ttl = open_window_ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+
+        self._lock = threading.Lock()
+        self._con = None
+        self._pid = None
+
+    def key(self, endpoint:str, symbol:str, params:dict) -> str:
+        """content address of a request
+
+        Args:
+            endpoint (str): 'eod', 'intra', 'fundamentals', ...
+            symbol (str): '{ticker}.{exchange}'
+            params (dict): request parameters, eg. the range
+
+        Returns:
+            str: sha256 hex digest
+        """
+        request = json.dumps([endpoint, symbol, params], sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(request.encode()).hexdigest()
+
+    def get(self, endpoint:str, symbol:str, params:dict):
+        """stored response of a request
+
+        Args:
+            endpoint (str): 'eod', 'intra', 'fundamentals', ...
+            symbol (str): '{ticker}.{exchange}'
+            params (dict): request parameters
+
+        Returns:
+            list | dict: response, None if not stored or stale (stale responses are served offline)
+        """
+        key = self.key(endpoint, symbol, params)
+        with self._lock:
+            row = self._execute("SELECT created, data FROM responses WHERE key=?;", (key, )).fetchone()
+            if (row is None):
+                return None
+            created, data = row
+            if ((not self.offline) and (time.time() - created > self._ttl(endpoint, params, created))):
+                return None
+            self._execute("UPDATE responses SET accessed=? WHERE key=?;", (time.time(), key))
+        return json.loads(zlib.decompress(data))
+
+    def put(self, endpoint:str, symbol:str, params:dict, response):
+        """store a response, evicting least recently used ones beyond `max_bytes`
+
+        Args:
+            endpoint (str): 'eod', 'intra', 'fundamentals', ...
+            symbol (str): '{ticker}.{exchange}'
+            params (dict): request parameters
+            response (list | dict): json response
+        """
+        key = self.key(endpoint, symbol, params)
+        data = zlib.compress(json.dumps(response).encode())
+        now = time.time()
+        with self._lock:
+            self._begin()
+            try:
+                row = self._execute("SELECT size FROM responses WHERE key=?;", (key, )).fetchone()
+                self._execute(
+                    ("INSERT OR REPLACE INTO responses (key, endpoint, symbol, params, created, accessed, size, data) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?);"),
+                    (key, endpoint, symbol, json.dumps(params, sort_keys=True), now, now, len(data), data),
+                )
+                total_bytes = self._add_bytes(len(data) - (row[0] if row else 0))
+                if (total_bytes > self.max_bytes):
+                    self._evict(total_bytes)
+                self._execute("COMMIT;")
+            except Exception:
+                self._execute("ROLLBACK;")
+                raise
+
+    def _evict(self, total_bytes:int):
+        """drop least recently used responses until the payloads fit in `max_bytes`,
+        inside the caller's transaction
+
+        Args:
+            total_bytes (int): payload bytes stored
+        """
+        keys, evicted_bytes = [], 0
+        cur = self._execute("SELECT key, size FROM responses ORDER BY accessed;")
+        for key, size in cur:
+            keys.append((key, ))
+            evicted_bytes += size
+            if (total_bytes - evicted_bytes <= self.max_bytes):
+                break
+        cur.close()
+        self._con.executemany("DELETE FROM responses WHERE key=?;", keys)
+        self._add_bytes(-evicted_bytes)
+        self.logger.info("- evicted {} cached responses".format(len(keys)))
+
+    def _add_bytes(self, n_bytes:int) -> int:
+        """change the stored payload bytes kept in `cache_stats`
+
+        Args:
+            n_bytes (int): bytes added, negative when removed
+
+        Returns:
+            int: payload bytes stored
+        """
+        self._execute("UPDATE cache_stats SET value=value+? WHERE name='total_bytes';", (n_bytes, ))
+        return self._execute("SELECT value FROM cache_stats WHERE name='total_bytes';").fetchone()[0]
+
+    def _ttl(self, endpoint:str, params:dict, created:float) -> float:
+        """seconds a stored response stays fresh, `open_window_ttl` when its window
+        ('to' of eod/intra, 'date' of bulk) reaches the (utc) day it was fetched
+
+        Args:
+            endpoint (str): 'eod', 'intra', 'fundamentals', ...
+            params (dict): request parameters
+            created (float): unix time the response was stored
+
+        Returns:
+            float: ttl
+        """
+        window_end = params.get('to', params.get('date'))
+        if (window_end is None):
+            return self.ttls.get(endpoint, 0)
+        day_start = dt.datetime.fromtimestamp(created, dt.timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        if (isinstance(window_end, str)):
+            is_open = window_end >= day_start.strftime('%Y-%m-%d')
+        else:
+            is_open = window_end >= day_start.timestamp()
+        return min(self.open_window_ttl, self.ttls.get(endpoint, 0)) if (is_open) else self.ttls.get(endpoint, 0)
+
+    def _begin(self):
+        """start a write transaction, locking out other processes
+        """
+        self._execute("BEGIN IMMEDIATE;")
+
+    def _execute(self, query:str, params:tuple=()) -> sqlite3.Cursor:
+        """execute on this process' connection, reconnecting after a fork
+
+        Args:
+            query (str): sql query
+            params (tuple, optional): query parameters. Defaults to ().
+
+        Returns:
+            sqlite3.Cursor: cursor
+        """
+        if ((self._con is None) or (self._pid != os.getpid())):
+            self._connect()
+        return self._con.execute(query, params)
+
+    def _connect(self):
+        """connect to the cache file and make sure the tables exist
+        """
+        self._con = connect(self.db_path, 'shared-state', isolation_level=None, check_same_thread=False)
+        self._pid = os.getpid()
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS responses("
+            "key TEXT PRIMARY KEY, endpoint TEXT, symbol TEXT, params TEXT, "
+            "created FLOAT, accessed FLOAT, size INTEGER, data BLOB);"
+        )
+        self._con.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed);")
+        # payload bytes stored, kept up to date by `put` instead of summed on every put;
+        # counted once for cache files written before it (the sum skips its scan once the row exists)
+        self._con.execute("CREATE TABLE IF NOT EXISTS cache_stats(name TEXT PRIMARY KEY, value INTEGER NOT NULL);")
+        self._con.execute("BEGIN IMMEDIATE;")
+        try:
+            self._con.execute(
+                ("INSERT OR IGNORE INTO cache_stats SELECT 'total_bytes', COALESCE(SUM(size), 0) FROM responses "
+                 "WHERE NOT EXISTS (SELECT 1 FROM cache_stats WHERE name='total_bytes');")
+            )
+            self._con.execute("COMMIT;")
+        except Exception:
+            self._con.execute("ROLLBACK;")
+            raise
@@ -11,14 +11,21 @@ setup(
     version='0.1',
     packages=find_packages(),
     install_requires=[
-        'eod',
+        'eod>=0.2.1',
         'tqdm',
         'numpy',
         'openpyxl',
         'pandas',
         'pandas-market-calendars',
-        'requests'
+        'pytz',
+        'requests',
+        'urllib3',
     ],
+    extras_require={
+        'mongo': ['pymongo'],
+        'parquet': ['pyarrow'],
+        'test': ['pytest', 'mongomock'],
+    },
     author='Shi Junjie',
     author_email='shijunja@yahoo.com',
     license='MIT License',
@@ -4,4 +4,7 @@
 # Thu 13 Jul 2023
 # -----------------------
 
-from delta.sql_handler.db_handler import DBHandler
\ No newline at end of file
+from delta.sql_handler.db_handler import DBHandler
+from delta.sql_handler.sharded import ShardedDBHandler
+from delta.sql_handler.connection import connection_profiles
+from delta.sql_handler.fundamental.stock_info.stock_info import hist_mktcap_table_name
\ No newline at end of file
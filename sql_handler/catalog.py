@@ -0,0 +1,45 @@
+# -----------------------
+# TableCatalog class
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import sqlite3
+
+
+class TableCatalog:
+    """table names of a db, read from sqlite_master once and kept in a set
+
+    tables created or dropped through the handlers are added/discarded here,
+    so existence checks never go back to sqlite_master.
+    """
+
+    def __init__(self, cur:sqlite3.Cursor):
+        self.cur = cur
+        self.names = set()
+        self.load()
+
+    def load(self):
+        """(re)load table names from sqlite_master
+        """
+        rows = self.cur.execute("""SELECT name FROM sqlite_master WHERE type='table'""").fetchall()
+        self.names = {x[0] for x in rows}
+
+    def add(self, *table_names:str):
+        """record created tables
+
+        Args:
+            *table_names (str): table names
+        """
+        self.names.update(table_names)
+
+    def discard(self, *table_names:str):
+        """record dropped tables
+
+        Args:
+            *table_names (str): table names
+        """
+        self.names.difference_update(table_names)
+
+    def __contains__(self, table_name:str) -> bool:
+        return table_name in self.names
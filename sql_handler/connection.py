@@ -0,0 +1,95 @@
+# -----------------------
+# sqlite connection factory
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import os
+import sqlite3
+
+# pragmas of each connection profile, applied in order on connect.
+# 'page_size' only takes effect on a new (empty) db file, so it goes first
+connection_profiles = {
+    # sqlite defaults: rollback journal, synchronous=FULL
+    'default': {},
+    # large sequential writes: wal, no fsync per commit, big page cache
+    'bulk-ingest': {
+        'page_size': 16384,
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -262144,          # KiB, 256 MiB
+        'mmap_size': 268435456,         # 256 MiB
+        'temp_store': 'MEMORY',
+        'wal_autocheckpoint': 10000,    # pages
+    },
+    # many readers alongside an occasional writer: wal, large mmap
+    'read-mostly': {
+        'page_size': 4096,
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -65536,           # KiB, 64 MiB
+        'mmap_size': 1073741824,        # 1 GiB
+        'temp_store': 'MEMORY',
+    },
+    # small state files written by every process, eg. the rate limiter and response cache:
+    # wal, waiting up to a minute on a locked db
+    'shared-state': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 60000,          # ms
+    },
+}
+
+
+def connect(db_path:str, profile:str='default', **kwargs) -> sqlite3.Connection:
+    """connect to a sqlite db with the pragmas of a connection profile,
+    creating the directory of the db file if needed
+
+    Args:
+        db_path (str): db file path
+        profile (str, optional): one of `connection_profiles`. Defaults to 'default'.
+        **kwargs: passed on to `sqlite3.connect`
+
+    Raises:
+        ValueError: unknown profile
+
+    Returns:
+        sqlite3.Connection: connection
+    """
+    if (profile not in connection_profiles):
+        raise ValueError("\'profile\' should be one of {}, not \'{}\'".format(
+            ', '.join(connection_profiles), profile,
+        ))
+
+    dir_path = os.path.dirname(db_path)
+    if (dir_path):
+        os.makedirs(dir_path, exist_ok=True)
+    con = sqlite3.connect(db_path, **kwargs)
+    for pragma, value in connection_profiles[profile].items():
+        con.execute("PRAGMA {} = {};".format(pragma, value))
+    return con
+
+
+class opened_on_access:
+    """class attribute standing in for a connection attribute until the db is opened
+
+    the first read calls the `opener` method of the instance, which assigns the
+    real instance attributes; being a non-data descriptor, those shadow it from then on.
+    """
+
+    def __init__(self, opener:str):
+        """init opened_on_access
+
+        Args:
+            opener (str): name of the method opening the db
+        """
+        self.opener = opener
+
+    def __set_name__(self, owner:type, name:str):
+        self.name = name
+
+    def __get__(self, instance, owner:type=None):
+        if (instance is None):
+            return self
+        getattr(instance, self.opener)()
+        return instance.__dict__[self.name]
@@ -7,7 +7,10 @@
 
 _stock_price_db_file_name = 'stock_price.db'     # stock price db name
 _nodata_db_file_name = 'nodata.db'               # nodata db name
+_stock_price_shard_file_name = 'stock_price_{:02d}.db'   # stock price db name of a shard
+_nodata_shard_file_name = 'nodata_{:02d}.db'             # nodata db name of a shard
 _fund_dir_name = 'fund/'                         # path to store fundamentals
+_intra_dir_name = 'intra/'                       # path to store parquet intra bars
 
 # imports
 import os
@@ -21,25 +24,43 @@ from delta.sql_handler.stock_price import StockPriceDB
 
 class DBHandler(StockPriceDB, NoDataDB, FundDB):
     
-    def __init__(self, logger:logging.Logger, data_dir_path:str):
+    def __init__(
+        self, logger:logging.Logger, data_dir_path:str, profile:str='default',
+        intra_backend:str='sqlite', shard:int=None,
+    ):
+        """init DBHandler
+
+        Args:
+            logger (logging.Logger): logger
+            data_dir_path (str): data dir
+            profile (str, optional): connection profile of every db, see `connection_profiles`. Defaults to 'default'.
+            intra_backend (str, optional): 'sqlite' or 'parquet' (needs pyarrow) storage of intra bars. Defaults to 'sqlite'.
+            shard (int, optional): shard index, the stock price and nodata dbs of a shard have
+                files of their own, see `ShardedDBHandler`. Defaults to None (not sharded).
+        """
         
         self.logger = logger
-        self._DATA_DIR_PATH = data_dir_path
-        self._stock_price_db_file_name = _stock_price_db_file_name
-        self._nodata_db_file_name = _nodata_db_file_name
+        self._DATA_DIR_PATH = os.path.join(data_dir_path, '')    # db paths are joined to it, with or without a trailing slash
+        if (shard is None):
+            self._stock_price_db_file_name = _stock_price_db_file_name
+            self._nodata_db_file_name = _nodata_db_file_name
+        else:
+            self._stock_price_db_file_name = _stock_price_shard_file_name.format(shard)
+            self._nodata_db_file_name = _nodata_shard_file_name.format(shard)
         self._fund_dir_name = _fund_dir_name
 
         self._STOCK_PRICE_DB_PATH = '{}{}'.format(self._DATA_DIR_PATH, self._stock_price_db_file_name)
         self._NO_DATA_DB_PATH = '{}{}'.format(self._DATA_DIR_PATH, self._nodata_db_file_name)
         self._FUND_DIR_PATH = '{}{}'.format(self._DATA_DIR_PATH, self._fund_dir_name)
+        self._INTRA_DIR_PATH = '{}{}'.format(self._DATA_DIR_PATH, _intra_dir_name)
         
-        # init db files
-        self._init_db_files()
-        
-        # init
-        NoDataDB.__init__(self, self.logger, self._NO_DATA_DB_PATH)
-        StockPriceDB.__init__(self, self.logger, self._STOCK_PRICE_DB_PATH)
-        FundDB.__init__(self, self.logger, self._FUND_DIR_PATH)
+        # init, db files and dirs are created when first connected
+        NoDataDB.__init__(self, self.logger, self._NO_DATA_DB_PATH, profile)
+        StockPriceDB.__init__(
+            self, self.logger, self._STOCK_PRICE_DB_PATH, profile,
+            intra_backend=intra_backend, INTRA_DIR_PATH=self._INTRA_DIR_PATH,
+        )
+        FundDB.__init__(self, self.logger, self._FUND_DIR_PATH, profile)
 
     # @property
     # def stock_price_db_file_name(self):
@@ -82,31 +103,34 @@ class DBHandler(StockPriceDB, NoDataDB, FundDB):
     #     self._FUND_DIR_PATH = '{}{}'.format(self._DATA_DIR_PATH, self._fund_dir_name)
         
 
+    def crt_missing_tables(self, tickers:list[str]):
+        """create every table the tickers still miss, one transaction per db,
+        checked against the table catalogs instead of sqlite_master
+
+        Args:
+            tickers (list[str]): tickers
+        """
+        self.logger.info("create missing tables of {} tickers".format(len(tickers)))
+        n_tickers = self.crt_missing_stock_price_tables(tickers)
+        n_nodata_tables = self.crt_missing_nodata_tables(tickers)
+        n_hist_mktcap_tables = self.crt_missing_hist_mktcap_tables(tickers)
+        self.logger.info("- registered {} tickers, created {} nodata and {} hist market cap tables".format(
+            n_tickers, n_nodata_tables, n_hist_mktcap_tables,
+        ))
+
+    def reload_catalogs(self):
+        """re-read the table catalogs, after tables were changed from outside this handler
+        """
+        self._stock_price_catalog.load()
+        self._nodata_catalog.load()
+        self._data_catalog.load()
+
     def close_all_conn(self):
         """close all db connections
         """
         self.logger.info(":: Closing All Database Connections ::")
-        self.con.close()
-        self.nodata_con.close()
-        self.data_con.close()
+        for con_name in ('con', 'nodata_con', 'data_con', 'fund_con'):
+            # connections are opened on first use, unopened ones are skipped
+            if (con_name in self.__dict__):
+                self.__dict__[con_name].close()
         self.logger.info(":: Connection Closed ::")
-        
-    def _init_db_files(self):
-        """init db files
-        """
-        self.logger.info("init db files")
-        
-        # create db dir
-        if (not os.path.isdir(self.DATA_DIR_PATH)):
-            self.logger.info("- create dir \'{}\'".format(self.DATA_DIR_PATH))
-            os.mkdir(self.DATA_DIR_PATH)
-        
-        # create findata.db
-        if (not os.path.isfile(self.STOCK_PRICE_DB_PATH)):
-            self.logger.info("- create \'{}\' file in \'{}\'".format(self._stock_price_db_file_name, self.DATA_DIR_PATH))
-            open(self.STOCK_PRICE_DB_PATH, 'w').close()
-        
-        # create nodata.db
-        if (not os.path.isfile(self.NO_DATA_DB_PATH)):
-            self.logger.info("- create \'{}\' file in \'{}\'".format(self._nodata_db_file_name, self.DATA_DIR_PATH))
-            open(self.NO_DATA_DB_PATH, 'w').close()
\ No newline at end of file
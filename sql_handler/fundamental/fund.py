@@ -5,131 +5,165 @@
 # -----------------------
 
 import os
+import zlib
+import json
 import pickle
 import logging
 
 from delta.utils import Utils
+from delta.sql_handler.connection import connect, opened_on_access
 from delta.sql_handler.fundamental.stock_info.stock_info import StockInfoDB
 
-_us_exg_pickle = 'us.pickle'                     # file to store fundamentals
+_us_exg_pickle = 'us.pickle'                     # legacy fundamentals file, migrated into fund.db
+_fund_db_file_name = 'fund.db'                   # db to store fundamentals
+_fund_schema_version = 2                         # PRAGMA user_version, 1: us.pickle migrated, 2: no 'None' ipo dates
 
+fund_table_name = 'fund'                         # compressed json per (code, section)
+fund_index_table_name = 'fund_index'             # one row per ticker, fields read in bulk
 
 
 class FundDB(StockInfoDB):
+    # fundamentals are keyed by ticker code and split by top-level section
+    # ('General', 'Highlights', 'Financials', ...), each stored as zlib
+    # compressed json; 'fund_index' keeps the ipo date of every ticker
 
-    def __init__(self, logger:logging.Logger, _FUND_DIR_PATH:str):
+    # opened by `_open_fund_db` on first use
+    fund_con = opened_on_access('_open_fund_db')
+    fund_cur = opened_on_access('_open_fund_db')
+
+    def __init__(self, logger:logging.Logger, _FUND_DIR_PATH:str, profile:str='default'):
         self.logger = logger
         self._FUND_DIR_PATH = _FUND_DIR_PATH  # dir
         self._us_exg_pickle = _us_exg_pickle
         self._us_fund_file_path = '{}{}'.format(self._FUND_DIR_PATH, self._us_exg_pickle)
-        
-        # init fund files
-        self._init_fund_files()
-        
-        # init data.db
-        StockInfoDB.__init__(self, self.logger, self._FUND_DIR_PATH)
+        self._fund_db_file_path = '{}{}'.format(self._FUND_DIR_PATH, _fund_db_file_name)
+        self._fund_profile = profile
 
+        # init data.db
+        StockInfoDB.__init__(self, self.logger, self._FUND_DIR_PATH, profile)
 
-    def _init_fund_files(self):
-        """init fund files
+    def _open_fund_db(self):
+        """connect to fund.db (creating the fund dir), create its tables and migrate the legacy pickle
+        """
+        self.logger.info(":: establish connection with {} ({}) ::".format(_fund_db_file_name, self._fund_profile))
+        self.fund_con = connect(self._fund_db_file_path, self._fund_profile)
+        self.fund_cur = self.fund_con.cursor()
+        self._init_fund_tables()
+        self._migrate_fund_pickle()
+
+    def _init_fund_tables(self):
+        """create fund tables
         """
-        self.logger.info("init fund files")
-        # create fundamental dir
-        if (not os.path.isdir(self._FUND_DIR_PATH)):
-            self.logger.info("- create dir \'{}\'".format(self._FUND_DIR_PATH))
-            os.mkdir(self._FUND_DIR_PATH)
-            
-        # crt us.pickle
-        if (not os.path.isfile(self._us_fund_file_path)):
-            self.logger.info("- create \'{}\' file in \'{}\'".format(self._us_exg_pickle, self._FUND_DIR_PATH))
-            open(self._us_fund_file_path, 'w').close()
-            
-        # crt stock_info.db
-        if (not os.path.isfile(self._stock_info_db_file_path)):
-            self.logger.info("- create data \'{}\' file in \'{}\'".format(self._stock_info_db_file_path, self._FUND_DIR_PATH))
-            open(self._stock_info_db_file_path, 'w').close()
-
-    
+        self.fund_cur.execute(
+            ("CREATE TABLE IF NOT EXISTS "
+             "{}("
+             "code TEXT NOT NULL, "
+             "section TEXT NOT NULL, "
+             "data BLOB, "
+             "PRIMARY KEY (code, section)) WITHOUT ROWID;").format(fund_table_name)
+        )
+        self.fund_cur.execute(
+            ("CREATE TABLE IF NOT EXISTS "
+             "{}("
+             "code TEXT PRIMARY KEY, "
+             "ipo_date TEXT);").format(fund_index_table_name)
+        )
+        self.fund_con.commit()
+
+
     def push_fund(self, data_dicts:list[dict]) -> bool:
-        """ush fundamentals
+        """push fundamentals, replacing stored fundamentals of the same tickers
 
         Args:
-            data_dicts (list[dict]): _description_
-            self._us_exg_pickle (str, optional): _description_. Defaults to self._us_exg_pickle.
+            data_dicts (list[dict]): fundamentals as returned by the api
 
         Returns:
             bool: _description_
         """
-        file_path = '{}{}'.format(self._FUND_DIR_PATH, self._us_exg_pickle)
-        self.logger.info("push fundamentals to \'{}\'".format(file_path))
+        self.logger.info("push fundamentals to \'{}\'".format(self._fund_db_file_path))
 
-        # check valid file path
-        if (not Utils.file_exists(file_path)):
-            self.logger.info('- invalid \'file_path\' \'{}\''.format(file_path))
-        
         # check valid data dict
         if (len(data_dicts) == 0):
             self.logger.info("- invalid \'data_dicts\', length: 0")
             return False
 
-        # make unique 
-        unique_data_dicts = list(set(data_dicts))
+        # make unique, last one wins
+        unique_data_dicts = {data['General']['Code']: data for data in data_dicts}
         self.logger.info("input: {} dicts, unique: {} dicts".format(
             len(data_dicts), len(unique_data_dicts)
         ))
 
-        # append new data
-        with open(file_path, 'ab') as pickle_file:
-            pickle.dump(unique_data_dicts, pickle_file)
+        # replace in place, one transaction
+        try:
+            codes = [(code, ) for code in unique_data_dicts]
+            self.fund_cur.executemany("DELETE FROM {} WHERE code=?;".format(fund_table_name), codes)
+            self.fund_cur.executemany(
+                "INSERT INTO {} (code, section, data) VALUES (?, ?, ?);".format(fund_table_name),
+                (
+                    (code, section, zlib.compress(json.dumps(value).encode()))
+                    for code, data in unique_data_dicts.items()
+                    for section, value in data.items()
+                ),
+            )
+            self.fund_cur.executemany(
+                "INSERT OR REPLACE INTO {} (code, ipo_date) VALUES (?, ?);".format(fund_index_table_name),
+                (
+                    # NULL without an ipo date
+                    (code, str(data['General']['IPODate']) if (data['General'].get('IPODate')) else None)
+                    for code, data in unique_data_dicts.items()
+                ),
+            )
+            self.fund_con.commit()
+        except Exception as e:
+            self.fund_con.rollback()
+            self.logger.info("- {}".format(e))
+            return False
 
         self.logger.info("- success push {} dicts".format(len(unique_data_dicts)))
         return True
 
-    def pull_fund(self, tickers:list[str], all:bool=False) -> tuple[bool, list[dict]]:
+    def pull_fund(
+        self, tickers:list[str], all:bool=False, sections:list[str]=None,
+    ) -> tuple[bool, list[dict]]:
         """pull fundamentals
 
         Args:
             tickers (list[str]): _description_
             all (bool, optional): _description_. Defaults to False.
+            sections (list[str], optional): top-level sections to read, eg. ['General', 'Highlights']. Defaults to None (all).
 
         Returns:
             tuple[bool, list[dict]]: list of ticker fundamentals dict
         """
-        file_path = '{}{}'.format(self._FUND_DIR_PATH, self._us_exg_pickle)
-        self.logger.info("pull fundamentals from \'{}\'".format(file_path))
-        
-        # check valid file path
-        if (not Utils.file_exists(file_path)):
-            self.logger.info('- invalid \'file_path\' \'{}\''.format(file_path))
-            return False, [{}]
-
-        
-        # Retrieving the data dictionaries from the pickle file
-        with open(file_path, 'rb') as pickle_file:
-            loaded_data = pickle.load(pickle_file)
-            self.logger.info("- pulled {} data from file".format(len(loaded_data)))
-    
+        self.logger.info("pull fundamentals from \'{}\'".format(self._fund_db_file_path))
+
+        query = "SELECT code, section, data FROM {}".format(fund_table_name)
+        params = []
+        conditions = []
+        if (not all):
+            conditions.append("code IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(list(tickers)))
+        if (sections):
+            conditions.append("section IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(list(sections)))
+        if (conditions):
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY code;"
+
+        data_dicts = {}
+        for code, section, data in self.fund_cur.execute(query, params):
+            data_dicts.setdefault(code, {})[section] = json.loads(zlib.decompress(data))
+
         if (all):
-            self.logger.info("- return all")
-            return True, loaded_data
-        else:
-            data_dicts = []
-            append_tickers = []
-            # pull ticker dicts
-            for data in loaded_data:
-                tkl = data['General']['Code']
-                if tkl in tickers:
-                    append_tickers.append(tkl)
-                    data_dicts.append(data)
-                else:
-                    continue
-            not_found_tickers = list(set(tickers) - set(append_tickers))
-
-            self.logger.info("- return {} ticker dicts, expected {}, {} not found".format(
-                len(data_dicts)), len(tickers), len(not_found_tickers)
-            )
-            
-            return True, data_dicts
+            self.logger.info("- return all, {} ticker dicts".format(len(data_dicts)))
+            return True, list(data_dicts.values())
+
+        not_found_tickers = list(set(tickers) - set(data_dicts))
+        self.logger.info("- return {} ticker dicts, expected {}, {} not found".format(
+            len(data_dicts), len(tickers), len(not_found_tickers)
+        ))
+
+        return True, list(data_dicts.values())
 
     def pull_ipo_dates_from_fud(self, tickers:list[str]) -> tuple[bool, dict[str, str]]:
         """pull ipo dates from fundamentals
@@ -140,34 +174,48 @@ class FundDB(StockInfoDB):
         Returns:
             tuple[bool, dict[str, str]]: _description_
         """
-        file_path = '{}{}'.format(self._FUND_DIR_PATH, self._us_exg_pickle)
-        self.logger.info("pull ipo dates from \'{}\'".format(file_path))
-        
-        # check valid file path
-        if (not Utils.file_exists(file_path)):
-            self.logger.info('- invalid \'file_path\' \'{}\''.format(file_path))
-            return False, [{}]
-
-        
-        # Retrieving the data dictionaries from the pickle file
-        with open(file_path, 'rb') as pickle_file:
-            loaded_data = pickle.load(pickle_file)
-            self.logger.info("- pulled {} data from file".format(len(loaded_data)))
-
-        ipo_date = {}
-        append_tickers = []
-        # pull ticker dicts
-        for data in loaded_data:
-            tkl = data['General']['Code']
-            if tkl in tickers:
-                append_tickers.append(tkl)
-                ipo_date['%s' % tkl] = str(data['General']['IPODate'])
-            else:
-                continue
-        not_found_tickers = list(set(tickers) - set(append_tickers))
+        self.logger.info("pull ipo dates from \'{}\'".format(self._fund_db_file_path))
+
+        # tickers without an ipo date are left out, like tickers without fundamentals
+        stored_ipo_dates = dict(self.fund_cur.execute(
+            "SELECT code, ipo_date FROM {} WHERE ipo_date IS NOT NULL;".format(fund_index_table_name)
+        ).fetchall())
+        ipo_date = {
+            tkl: stored_ipo_dates[tkl]
+            for tkl in tickers if tkl in stored_ipo_dates
+        }
+        not_found_tickers = list(set(tickers) - set(ipo_date))
 
         self.logger.info("- return {} ticker ipo dates, expected {}, {} not found".format(
-            len(append_tickers)), len(tickers), len(not_found_tickers)
-        )
-            
-        return True, ipo_date
\ No newline at end of file
+            len(ipo_date), len(tickers), len(not_found_tickers)
+        ))
+
+        return True, ipo_date
+
+    def _migrate_fund_pickle(self):
+        """move fundamentals from the legacy us.pickle into fund.db and clear 'None' ipo dates, once per db file
+        """
+        version = self.fund_cur.execute("PRAGMA user_version;").fetchone()[0]
+        if (version >= _fund_schema_version):
+            return
+
+        if ((version < 1) and Utils.file_exists(self._us_fund_file_path) and os.path.getsize(self._us_fund_file_path)):
+            self.logger.info("migrate fundamentals from \'{}\'".format(self._us_fund_file_path))
+            # every push appended a pickle frame
+            data_dicts = []
+            with open(self._us_fund_file_path, 'rb') as pickle_file:
+                while True:
+                    try:
+                        data_dicts.extend(pickle.load(pickle_file))
+                    except EOFError:
+                        break
+            if (data_dicts and (not self.push_fund(data_dicts))):
+                raise Exception("fail to migrate \'{}\'".format(self._us_fund_file_path))
+        if (version < 2):
+            # pushes before version 2 stored a missing ipo date as 'None'
+            self.fund_cur.execute(
+                "UPDATE {} SET ipo_date=NULL WHERE ipo_date IN ('None', '');".format(fund_index_table_name)
+            )
+
+        self.fund_cur.execute("PRAGMA user_version = {};".format(_fund_schema_version))
+        self.fund_con.commit()
@@ -10,6 +10,7 @@ import pandas as pd
 
 # table names of stock_info.db
 hist_mktcap_table_name = '{}_hist_mktcap'       # historical market capitalisation of a ticker
+_crt_hist_mktcap_table_query = "CREATE TABLE IF NOT EXISTS \"{}\"(trade_date DATETIME UNIQUE, mkt_cap_value BIGINT, mkt_cap TEXT);"
 
 # market cap catagory
 market_cap_ctgs = {
@@ -34,14 +35,57 @@ class HistMarketCapHandler:
         self._stock_info_db_file_name = db_file_name
 
     def crt_ticker_hist_mktcap_table(self, ticker:str):
+        """create historical market cap table of a ticker
+
+        Args:
+            ticker (str): _description_
+        """
         table_name = hist_mktcap_table_name.format(ticker)
+        self.logger.info("create \'{}\' table on \'{}\'".format(table_name, self._stock_info_db_file_name))
+        try:
+            self.data_cur.execute(_crt_hist_mktcap_table_query.format(table_name))
+            self.data_con.commit()
+            self._data_catalog.add(table_name)
+        except Exception as e:
+            self.logger.info("- An exception occured while creating \'{}\' table: \'{}\', continue...".format(table_name, e))
+            return
+
+        self.logger.info("- created \'{}\' table".format(table_name))
+
+    def crt_missing_hist_mktcap_tables(self, tickers:list[str]) -> int:
+        """create the historical market cap tables missing for any of the tickers, in one transaction
+
+        Args:
+            tickers (list[str]): tickers
+
+        Returns:
+            int: number of created tables
+        """
+        table_names = [
+            hist_mktcap_table_name.format(ticker) for ticker in dict.fromkeys(tickers)
+            if (hist_mktcap_table_name.format(ticker) not in self._data_catalog)
+        ]
+        if (not table_names):
+            return 0
+
+        self.logger.info("create {} hist market cap tables on \'{}\'".format(len(table_names), self._stock_info_db_file_name))
+        try:
+            self.data_cur.execute("BEGIN;")     # ddl does not open a transaction by itself
+            for table_name in table_names:
+                self.data_cur.execute(_crt_hist_mktcap_table_query.format(table_name))
+            self.data_con.commit()
+        except Exception:
+            self.data_con.rollback()
+            raise
+        self._data_catalog.add(*table_names)
+        return len(table_names)
         
     
     def pull_hist_mktcap(self, ticker:str, keys:list[str]=None) -> tuple[bool, dict]:
         table_name = hist_mktcap_table_name.format(ticker)
         self.logger.info("create \'{}\' table on \'{}\'".format(table_name, self._stock_info_db_file_name))
         try:
-            crt_table_query = "CREATE TABLE IF NOT EXISTS {}(trade_date DATETIME UNIQUE, mkt_cap_value BIGINT, mkt_cap TEXT);".format(table_name)
+            crt_table_query = _crt_hist_mktcap_table_query.format(table_name)
             self.data_cur.execute(crt_table_query)
             self.data_con.commit()
         except Exception as e:
@@ -50,7 +94,6 @@ class HistMarketCapHandler:
         self.logger.info("- created \'{}\' table".format(table_name))    
     
     def push_hist_mktcap(self, ticker:str, df:pd.DataFrame) -> bool:
-        table_name = hist_mktcap_table_name.format(ticker)
         ...
     
     def update_mktcap_2_tkldata(self) -> bool:
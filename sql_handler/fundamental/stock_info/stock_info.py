@@ -5,8 +5,9 @@
 # -----------------------
 
 import logging
-import sqlite3
 
+from delta.sql_handler.catalog import TableCatalog
+from delta.sql_handler.connection import connect, opened_on_access
 from delta.sql_handler.fundamental.stock_info.ticker_data import TickerDataHandler
 
 hist_mktcap_table_name = '{}_hist_mktcap'       # historical market capitalisation of a ticker
@@ -16,19 +17,27 @@ ticker_data_table_name = 'tkl_data'             # snapshot of ticker info
 
 class StockInfoDB(TickerDataHandler):
     
-    def __init__(self, logger:logging.Logger, FUND_DIR_PATH:str):
+    # opened by `_open_stock_info_db` on first use
+    data_con = opened_on_access('_open_stock_info_db')
+    data_cur = opened_on_access('_open_stock_info_db')
+    _data_catalog = opened_on_access('_open_stock_info_db')
+    
+    def __init__(self, logger:logging.Logger, FUND_DIR_PATH:str, profile:str='default'):
         self.logger = logger
         self._stock_info_db_file_name = stock_info_db_file_name
         self._ticker_data_table_name = ticker_data_table_name
         self.FUND_DIR_PATH = FUND_DIR_PATH
-        self._stock_info_db_file_path = '{}{}'.format(self.FUND_DIR_PATH, self._ticker_data_table_name)
+        self._stock_info_db_file_path = '{}{}'.format(self.FUND_DIR_PATH, self._stock_info_db_file_name)
+        self._stock_info_profile = profile
+        # TickerDataHandler and HistMarketCapHandler share the connection attributes above
 
-        # sql connection
-        self.logger.info(":: establish connection with {} ::".format(stock_info_db_file_name))
-        self.data_con = sqlite3.connect(self.stock_info_db_file_path)
+    def _open_stock_info_db(self):
+        """connect to stock_info.db and load its table catalog
+        """
+        self.logger.info(":: establish connection with {} ({}) ::".format(self._stock_info_db_file_name, self._stock_info_profile))
+        self.data_con = connect(self._stock_info_db_file_path, self._stock_info_profile)
         self.data_cur = self.data_con.cursor()
-        
-        TickerDataHandler.__init__(self, self.logger, self.data_con, self.data_cur, self._stock_info_db_file_name, self._ticker_data_table_name)
+        self._data_catalog = TableCatalog(self.data_cur)
 
     @property
     def ticker_data_table_name(self):
@@ -70,5 +79,8 @@ class StockInfoDB(TickerDataHandler):
         # return
         return is_exist
         
-    def _data_table_names() -> list[str]:
-        ...
\ No newline at end of file
+    def _data_table_names(self) -> set[str]:
+        """table names of stock_info.db, from the catalog
+        
+        """
+        return self._data_catalog.names
\ No newline at end of file
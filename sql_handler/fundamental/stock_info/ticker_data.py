@@ -4,6 +4,7 @@
 # Thu 13 Jul 2023
 # -----------------------
 
+import json
 import logging
 import sqlite3
 import pandas as pd
@@ -48,6 +49,7 @@ class TickerDataHandler(HistMarketCapHandler):
                     currency TEXT, type TEXT, ipo_date TEXT, mkt_cap_value BIGINT, mkt_cap TEXT);".format(self._ticker_data_table_name)
             self.data_cur.execute(crt_table_query)
             self.data_con.commit()
+            self._data_catalog.add(self._ticker_data_table_name)
         except Exception as e:
             self.logger.info("- An exception occured while creating \'{}\' table: \'{}\', continue...".format(self._ticker_data_table_name, e))
 
@@ -112,6 +114,67 @@ class TickerDataHandler(HistMarketCapHandler):
             return False, {'exception': e}
         
 
+    def iter_ticker_data(
+        self, tickers:list[str]=None, keys:list[str]=None, chunk_size:int=10_000,
+    ):
+        """yield ticker data in chunks of at most `chunk_size` rows using `fetchmany`
+
+        Args:
+            tickers (list[str], optional): tickers to read. Defaults to None (all).
+            keys (list[str], optional): table columns, 'code' is always included. Defaults to None (all).
+            chunk_size (int, optional): rows per chunk. Defaults to 10_000.
+
+        Raises:
+            ValueError: keys do not match table column names
+
+        Yields:
+            pd.DataFrame: chunk of ticker data
+        """
+        if (keys):
+            invalid_keys = [elem for elem in keys if elem not in ticker_data_keys]
+            if (invalid_keys):
+                raise ValueError("keys element does not match with table column names: {}".format(', '.join(invalid_keys)))
+            keys = ['code'] + [key for key in keys if key != 'code']
+        self.logger.info("iter ticker data from \'{}\', table: \'{}\'".format(self._stock_info_db_file_name, self._ticker_data_table_name))
+
+        data_query = "SELECT {} FROM {}".format(', '.join(keys) if keys else '*', self._ticker_data_table_name)
+        params = []
+        if (tickers is not None):
+            data_query += " WHERE code IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(list(tickers)))
+
+        cur = self.data_con.cursor()
+        try:
+            cur.execute(data_query, params)
+            columns = [desc[0] for desc in cur.description]
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if (not rows):
+                    break
+                yield pd.DataFrame(rows, columns=columns)
+        finally:
+            cur.close()
+
+    def export_ticker_data(
+        self, file_path:str, tickers:list[str]=None, keys:list[str]=None,
+        chunk_size:int=10_000,
+    ) -> int:
+        """stream ticker data into a csv or parquet file at constant memory
+
+        Args:
+            file_path (str): '.csv' or '.parquet' file
+            tickers (list[str], optional): tickers to export. Defaults to None (all).
+            keys (list[str], optional): table columns. Defaults to None (all).
+            chunk_size (int, optional): rows held in memory at once. Defaults to 10_000.
+
+        Returns:
+            int: rows written
+        """
+        self.logger.info("export ticker data to \'{}\'".format(file_path))
+        n_rows = Utils.write_chunks(self.iter_ticker_data(tickers, keys, chunk_size), file_path)
+        self.logger.info("- exported {} rows".format(n_rows))
+        return n_rows
+
     def pull_tickers(self, mkt_cap:list=None) -> list[str]:
         """get tickers by market caps
 
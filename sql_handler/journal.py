@@ -0,0 +1,215 @@
+# -----------------------
+# UpdateJournal class
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import time
+import logging
+import pandas as pd
+
+# table names of stock_price.db
+update_runs_table_name = 'update_runs'          # one row per update run, keyed by its dates
+update_journal_table_name = 'update_journal'    # state of every ticker of a run
+update_windows_table_name = 'update_windows'    # request windows pushed for a ticker of a run
+
+# ticker states, in order
+ticker_states = ['planned', 'fetched', 'pushed', 'failed']
+
+
+class UpdateJournal:
+    # a run is planned -> fetched -> pushed (or failed) ticker by ticker, every
+    # change is committed as it happens so a crashed run can be resumed;
+    # a run is finished once every ticker is pushed
+
+    def __init__(self, logger:logging.Logger):
+        self.logger = logger
+
+    def start_update_run(self, start_date:str, end_date:str, resume:bool=False) -> int:
+        """start an update run, or pick up the last unfinished run of the same dates
+
+        Args:
+            start_date (str): update start date
+            end_date (str): update end date
+            resume (bool, optional): continue the last unfinished run of the dates if any. Defaults to False.
+
+        Returns:
+            int: run id
+        """
+        if (resume):
+            run_id = self.unfinished_update_run(start_date, end_date)
+            if (run_id is not None):
+                self.logger.info("resume update run {}".format(run_id))
+                return run_id
+            self.logger.info("no unfinished update run between {} and {} to resume".format(start_date, end_date))
+        self.cur.execute(
+            "INSERT INTO {} (start_date, end_date, started) VALUES (?, ?, ?);".format(update_runs_table_name),
+            (start_date, end_date, time.time()),
+        )
+        self.con.commit()
+        self.logger.info("start update run {}".format(self.cur.lastrowid))
+        return self.cur.lastrowid
+
+    def unfinished_update_run(self, start_date:str, end_date:str) -> int:
+        """last unfinished run of the dates
+
+        Args:
+            start_date (str): update start date
+            end_date (str): update end date
+
+        Returns:
+            int: run id, None if every run of the dates is finished
+        """
+        row = self.cur.execute(
+            ("SELECT run_id FROM {} WHERE start_date=? AND end_date=? AND finished IS NULL "
+             "ORDER BY run_id DESC LIMIT 1;").format(update_runs_table_name),
+            (start_date, end_date),
+        ).fetchone()
+        return None if (row is None) else row[0]
+
+    def finish_update_run(self, run_id:int):
+        """mark a run finished, it is no longer resumed
+
+        Args:
+            run_id (int): run id
+        """
+        self.cur.execute(
+            "UPDATE {} SET finished=? WHERE run_id=?;".format(update_runs_table_name), (time.time(), run_id),
+        )
+        self.con.commit()
+
+    def set_ticker_states(self, run_id:int, tickers:list[str], state:str, error:str=None):
+        """record the state of tickers, a failure also counts an attempt
+
+        Args:
+            run_id (int): run id
+            tickers (list[str]): tickers
+            state (str): one of `ticker_states`
+            error (str, optional): failure reason. Defaults to None.
+        """
+        if (state not in ticker_states):
+            raise ValueError("\'state\' should be one of {}, not \'{}\'".format(', '.join(ticker_states), state))
+        attempt = int(state == 'failed')
+        now = time.time()
+        self.cur.executemany(
+            ("INSERT INTO {} (run_id, ticker, state, attempts, error, updated) VALUES (?, ?, ?, ?, ?, ?) "
+             "ON CONFLICT(run_id, ticker) DO UPDATE SET state=excluded.state, attempts=attempts+excluded.attempts, "
+             "error=excluded.error, updated=excluded.updated;").format(update_journal_table_name),
+            ((run_id, ticker, state, attempt, error, now) for ticker in tickers),
+        )
+        self.con.commit()
+
+    def pull_ticker_states(self, run_id:int) -> dict[str, tuple[str, int]]:
+        """state of every ticker journaled in a run
+
+        Args:
+            run_id (int): run id
+
+        Returns:
+            dict[str, tuple[str, int]]: ticker: (state, failed attempts)
+        """
+        return {
+            ticker: (state, attempts) for ticker, state, attempts in self.cur.execute(
+                "SELECT ticker, state, attempts FROM {} WHERE run_id=?;".format(update_journal_table_name), (run_id, ),
+            ).fetchall()
+        }
+
+    def push_windows(self, run_id:int, ticker:str, windows:list[tuple]):
+        """record request windows whose data was pushed
+
+        Args:
+            run_id (int): run id
+            ticker (str): ticker
+            windows (list[tuple]): [(kind, start, end), ...], kind 'eod' with dates or 'intra' with unix timestamps
+        """
+        self.push_windows_batch(run_id, {ticker: windows})
+
+    def push_windows_batch(self, run_id:int, ticker_windows:dict[str, list[tuple]]):
+        """record request windows of many tickers in one transaction
+
+        Args:
+            run_id (int): run id
+            ticker_windows (dict[str, list[tuple]]): ticker: [(kind, start, end), ...]
+        """
+        self.cur.executemany(
+            ("INSERT OR IGNORE INTO {} (run_id, ticker, kind, window_start, window_end) "
+             "VALUES (?, ?, ?, ?, ?);").format(update_windows_table_name),
+            (
+                (run_id, ticker, kind, start, end)
+                for ticker, windows in ticker_windows.items() for kind, start, end in windows
+            ),
+        )
+        self.con.commit()
+
+    def pull_windows(self, run_id:int, ticker:str) -> dict[str, list[tuple]]:
+        """request windows of a ticker pushed in a run
+
+        Args:
+            run_id (int): run id
+            ticker (str): ticker
+
+        Returns:
+            dict[str, list[tuple]]: kind: [(start, end), ...]
+        """
+        windows = {'eod': [], 'intra': []}
+        for kind, start, end in self.cur.execute(
+            ("SELECT kind, window_start, window_end FROM {} WHERE run_id=? AND ticker=? "
+             "ORDER BY kind, window_start;").format(update_windows_table_name),
+            (run_id, ticker),
+        ).fetchall():
+            windows[kind].append((start, end))
+        return windows
+
+    def pull_journal(self, run_id:int=None) -> pd.DataFrame:
+        """ticker states of a run
+
+        Args:
+            run_id (int, optional): run id. Defaults to None (latest run).
+
+        Returns:
+            pd.DataFrame: 'ticker', 'state', 'attempts', 'error', 'updated' (unix time)
+        """
+        if (run_id is None):
+            run_id = self.cur.execute("SELECT MAX(run_id) FROM {};".format(update_runs_table_name)).fetchone()[0]
+        return pd.read_sql_query(
+            "SELECT ticker, state, attempts, error, updated FROM {} WHERE run_id=? ORDER BY ticker;".format(
+                update_journal_table_name,
+            ),
+            self.con, params=(run_id, ),
+        )
+
+    def _init_journal_tables(self):
+        """create the update journal tables
+        """
+        self.cur.execute(
+            ("CREATE TABLE IF NOT EXISTS "
+             "{}("
+             "run_id INTEGER PRIMARY KEY, "
+             "start_date DATE NOT NULL, "
+             "end_date DATE NOT NULL, "
+             "started FLOAT, "
+             "finished FLOAT);").format(update_runs_table_name)
+        )
+        self.cur.execute(
+            ("CREATE TABLE IF NOT EXISTS "
+             "{}("
+             "run_id INTEGER NOT NULL, "
+             "ticker TEXT NOT NULL, "
+             "state TEXT NOT NULL, "
+             "attempts INTEGER NOT NULL DEFAULT 0, "
+             "error TEXT, "
+             "updated FLOAT, "
+             "PRIMARY KEY (run_id, ticker)) WITHOUT ROWID;").format(update_journal_table_name)
+        )
+        # dates of eod windows and unix timestamps of intra windows share the untyped bounds
+        self.cur.execute(
+            ("CREATE TABLE IF NOT EXISTS "
+             "{}("
+             "run_id INTEGER NOT NULL, "
+             "ticker TEXT NOT NULL, "
+             "kind TEXT NOT NULL, "
+             "window_start NOT NULL, "
+             "window_end NOT NULL, "
+             "PRIMARY KEY (run_id, ticker, kind, window_start, window_end)) WITHOUT ROWID;").format(update_windows_table_name)
+        )
+        self.con.commit()
@@ -5,20 +5,42 @@
 # -----------------------
 
 import re
-import sqlite3
 import logging
 
+from delta.utils import Utils
+from delta.sql_handler.catalog import TableCatalog
+from delta.sql_handler.connection import connect, opened_on_access
+
+_nodata_schema_version = 1      # PRAGMA user_version, 1: intra no data stored as ranges
+_intra_step = 60                # seconds between intra bars
+
 class NoDataDB:
-    
-    def __init__(self, logger:logging.Logger, DB_PATH:str):
+    # '{ticker}_eod' keeps one row per no data date,
+    # '{ticker}_intra' keeps closed, merged (start_ts, end_ts) ranges of no data minutes
+
+    # opened by `_open_nodata_db` on first use
+    nodata_con = opened_on_access('_open_nodata_db')
+    nodata_cur = opened_on_access('_open_nodata_db')
+    _nodata_catalog = opened_on_access('_open_nodata_db')
+
+    def __init__(self, logger:logging.Logger, DB_PATH:str, profile:str='default'):
         self.logger = logger
-        self.NO_DATA_DB_PATH = DB_PATH  
-        self.logger.info(":: establish connection with nodata.db ::")
-        self.nodata_con = sqlite3.connect(self.NO_DATA_DB_PATH, check_same_thread=False)
-        self.nodata_cur = self.nodata_con.cursor()
+        self.NO_DATA_DB_PATH = DB_PATH
+        self._nodata_profile = profile
 
         self.nodata_table_types = ['eod', 'intra']
-            
+
+    def _open_nodata_db(self):
+        """connect to nodata.db, load its table catalog and migrate old tables
+        """
+        self.logger.info(":: establish connection with nodata.db ({}) ::".format(self._nodata_profile))
+        self.nodata_con = connect(self.NO_DATA_DB_PATH, self._nodata_profile, check_same_thread=False)
+        self.nodata_cur = self.nodata_con.cursor()
+        self._nodata_catalog = TableCatalog(self.nodata_cur)
+
+        # convert per-minute intra tables
+        self._migrate_nodata_tables()
+
     def is_nodata_table_exists(self, ticker:str) -> tuple[bool, list[str]]:
         """check if the input ticker exists in database
 
@@ -46,10 +68,10 @@ class NoDataDB:
 
         logging_info = logging_info + str(is_exist)
         self.logger.info(logging_info)
-        
+
         # return
         return is_exist, crt_tables
-        
+
     def crt_nodata_tables(self, ticker:str, table_types:list[str]):
         """create no data table for a ticker
 
@@ -60,12 +82,16 @@ class NoDataDB:
         self.logger.info("create nodata tables")
         is_crt = False
         if ('eod' in table_types):
-            self.nodata_cur.execute("CREATE TABLE IF NOT EXISTS {}_eod(trade_date DATE UNIQUE);".format(ticker))
+            self.nodata_cur.execute("CREATE TABLE IF NOT EXISTS \"{}_eod\"(trade_date DATE UNIQUE);".format(ticker))
             self.nodata_con.commit()
+            self._nodata_catalog.add('{}_eod'.format(ticker))
             is_crt = True
         if ('intra' in table_types):
-            self.nodata_cur.execute("CREATE TABLE IF NOT EXISTS {}_intra(trade_timestamp TIMESTAMP UNIQUE);".format(ticker))
+            self.nodata_cur.execute(
+                "CREATE TABLE IF NOT EXISTS \"{}_intra\"(start_ts INTEGER PRIMARY KEY, end_ts INTEGER NOT NULL);".format(ticker)
+            )
             self.nodata_con.commit()
+            self._nodata_catalog.add('{}_intra'.format(ticker))
             is_crt = True
 
         if (is_crt):
@@ -74,8 +100,42 @@ class NoDataDB:
             logging_info = '- fail to create nodata tables with \'table_type\': {}'.format(', '.join(table_types))
         self.logger.info(logging_info)
 
+    def crt_missing_nodata_tables(self, tickers:list[str]) -> int:
+        """create the nodata tables missing for any of the tickers, in one transaction
+
+        Args:
+            tickers (list[str]): tickers
+
+        Returns:
+            int: number of created tables
+        """
+        crt_tables = [
+            (ticker, table_type)
+            for ticker in tickers for table_type in self.nodata_table_types
+            if ('{}_{}'.format(ticker, table_type) not in self._nodata_catalog)
+        ]
+        if (not crt_tables):
+            return 0
+
+        self.logger.info("create {} nodata tables".format(len(crt_tables)))
+        try:
+            self.nodata_cur.execute("BEGIN;")   # ddl does not open a transaction by itself
+            for ticker, table_type in crt_tables:
+                if (table_type == 'eod'):
+                    self.nodata_cur.execute("CREATE TABLE IF NOT EXISTS \"{}_eod\"(trade_date DATE UNIQUE);".format(ticker))
+                else:
+                    self.nodata_cur.execute(
+                        "CREATE TABLE IF NOT EXISTS \"{}_intra\"(start_ts INTEGER PRIMARY KEY, end_ts INTEGER NOT NULL);".format(ticker)
+                    )
+            self.nodata_con.commit()
+        except Exception:
+            self.nodata_con.rollback()
+            raise
+        self._nodata_catalog.add(*['{}_{}'.format(ticker, table_type) for ticker, table_type in crt_tables])
+        return len(crt_tables)
+
     def push_nodata_dts(
-        self, ticker:str, dates:list[str], timestamps:list[int], 
+        self, ticker:str, dates:list[str], timestamps:list[int],
     ):
         """push no data dts of a ticker from database
 
@@ -90,22 +150,60 @@ class NoDataDB:
         is_right_fmt = self._check_dts_fmt(dates, timestamps)
         if (not is_right_fmt):
             raise ValueError("Invalid nodata dt formats")
-        # construct list of tuples
-        dates = [(d, ) for d in dates]
-        timestamps = [(t, ) for t in timestamps]
-        
-        # push 
-        # nodata the INSERT statement
-        date_insert_query = "INSERT OR REPLACE INTO {}_eod (trade_date) VALUES (?);".format(ticker)
-        ts_insert_query = "INSERT OR REPLACE INTO {}_intra (trade_timestamp) VALUES (?);".format(ticker)
-        
-        # Execute the INSERT statement with the data
-        self.nodata_cur.executemany(date_insert_query, dates)
-        self.nodata_con.commit()
-
-        self.nodata_cur.executemany(ts_insert_query, timestamps)
-        self.nodata_con.commit()
-        
+
+        self.push_nodata_ranges(ticker, dates, Utils.points_to_ranges(timestamps, _intra_step))
+
+    def push_nodata_ranges(
+        self, ticker:str, dates:list[str], ts_ranges:list[tuple[int, int]],
+    ):
+        """push no data dates and timestamp ranges of a ticker, merging them with stored ranges
+
+        Args:
+            ticker (str): _description_
+            dates (list[str]): no data dates
+            ts_ranges (list[tuple[int, int]]): closed no data (start_ts, end_ts) ranges
+        """
+        self.logger.info("start to push nodata ranges: {}(dates), {}(ts ranges)".format(
+            len(dates), len(ts_ranges)))
+        ts_ranges = Utils.merge_ranges([(int(s), int(e)) for s, e in ts_ranges], _intra_step)
+
+        try:
+            # push dates
+            date_insert_query = "INSERT OR REPLACE INTO \"{}_eod\" (trade_date) VALUES (?);".format(ticker)
+            self.nodata_cur.executemany(date_insert_query, [(d, ) for d in dates])
+
+            # merge with stored ranges touching the new ones
+            if (ts_ranges):
+                stored_ranges = self._pull_nodata_ranges_between(
+                    ticker, ts_ranges[0][0] - _intra_step, ts_ranges[-1][1] + _intra_step,
+                )
+                merged_ranges = Utils.merge_ranges(stored_ranges + ts_ranges, _intra_step)
+                self._replace_nodata_ranges(ticker, stored_ranges, merged_ranges)
+            self.nodata_con.commit()
+        except Exception:
+            self.nodata_con.rollback()
+            raise
+        self.logger.info("- push success")
+
+    def push_nodata_dates_bulk(self, ticker_dates:dict[str, list[str]]):
+        """push no data dates of many tickers in one transaction
+
+        Args:
+            ticker_dates (dict[str, list[str]]): ticker: no data dates
+        """
+        self.logger.info("start to push nodata dates of {} tickers".format(len(ticker_dates)))
+        try:
+            for ticker, dates in ticker_dates.items():
+                self.nodata_cur.executemany(
+                    "INSERT OR REPLACE INTO \"{}_eod\" (trade_date) VALUES (?);".format(ticker),
+                    [(d, ) for d in dates],
+                )
+            self.nodata_con.commit()
+        except Exception:
+            self.nodata_con.rollback()
+            raise
+        self.logger.info("- push success")
+
     def _check_dts_fmt(
         self, dates:list[str], timestamps:list[int],
     ) -> bool:
@@ -126,7 +224,7 @@ class NoDataDB:
             else:
                 self.logger.info(' - invalid date format for \'{}\''.format(date))
                 return False
-        
+
         # check timestamp fmt
         for timestamp in timestamps:
             if (len(str(timestamp)) >= 10):
@@ -134,15 +232,16 @@ class NoDataDB:
             else:
                 self.logger.info(' - invalid timestamp format for \'{}\''.format(timestamp))
                 return False
-        
+
         # return if all checks out
         self.logger.info('all dts format checks out')
         return True
-    
+
     def pull_nodata_dts(
         self, ticker:str,
     ) -> tuple[list[str], list[int]]:
         """pull no data dts of a ticker from database
+           * expands the stored ranges minute by minute, prefer `pull_nodata_ranges` *
 
         Args:
             ticker (str): _description_
@@ -150,22 +249,53 @@ class NoDataDB:
         Returns:
             tuple[list]: dates, timestamps
         """
+        dates, ts_ranges = self.pull_nodata_ranges(ticker)
+        timestamps = [ts for start_ts, end_ts in ts_ranges for ts in range(start_ts, end_ts + 1, _intra_step)]
+        return dates, timestamps
+
+    def pull_nodata_ranges(
+        self, ticker:str,
+    ) -> tuple[list[str], list[tuple[int, int]]]:
+        """pull no data dates and timestamp ranges of a ticker from database
+
+        Args:
+            ticker (str): _description_
+
+        Returns:
+            tuple[list[str], list[tuple[int, int]]]: dates, sorted (start_ts, end_ts) ranges
+        """
         self.logger.info("- pull nodata dts")
         exist_nodata_table_names = self._nodata_table_names()
         if (
             ('{}_eod'.format(ticker) in exist_nodata_table_names)
             and ('{}_intra'.format(ticker) in exist_nodata_table_names)
         ):
-            date_rows = self.nodata_cur.execute("SELECT trade_date FROM {}_eod".format(ticker))
+            date_rows = self.nodata_cur.execute("SELECT trade_date FROM \"{}_eod\" ORDER BY trade_date".format(ticker))
             date_rows = self.nodata_cur.fetchall()
-            ts_rows = self.nodata_cur.execute("SELECT trade_timestamp FROM {}_intra".format(ticker))
-            ts_rows = self.nodata_cur.fetchall()
-            self.logger.info("- pull success: {}(dates) {}(tss)".format(len(date_rows), len(ts_rows)))
-            return [x[0] for x in date_rows], [x[0] for x in ts_rows]
+            ts_ranges = self.nodata_cur.execute("SELECT start_ts, end_ts FROM \"{}_intra\" ORDER BY start_ts".format(ticker))
+            ts_ranges = self.nodata_cur.fetchall()
+            self.logger.info("- pull success: {}(dates) {}(ts ranges)".format(len(date_rows), len(ts_ranges)))
+            return [x[0] for x in date_rows], ts_ranges
         else:
             self.logger.error('- pull fail: \'{}\' not in nodata db'.format(ticker))
             raise ValueError('\'{}\' not in nodata db'.format(ticker))
 
+    def is_nodata_ts(self, ticker:str, timestamp:int) -> bool:
+        """check if a timestamp lies in a no data range, one index lookup
+
+        Args:
+            ticker (str): _description_
+            timestamp (int): unix timestamp
+
+        Returns:
+            bool: is no data timestamp
+        """
+        row = self.nodata_cur.execute(
+            "SELECT end_ts FROM \"{}_intra\" WHERE start_ts <= ? ORDER BY start_ts DESC LIMIT 1;".format(ticker),
+            (int(timestamp), ),
+        ).fetchone()
+        return (row is not None) and (int(timestamp) <= row[0])
+
     def rm_dts(self, ticker:str, dates:list[str], timestamps:list[int]) -> bool:
         """remove dts
 
@@ -178,44 +308,142 @@ class NoDataDB:
             bool: is success rm
         """
         self.logger.info("- remove dts: {}(dates) {}(tss)".format(len(dates), len(timestamps)))
-        
+
         if ((len(dates)==0) and (len(timestamps)==0)):
             self.logger.info("- empty input, pass remove dts")
             return True
-    
+
         # rm query
         try:
-            # table names
-            eod_table_name, intra_table_name = '{}_eod'.format(ticker), '{}_intra'.format(ticker)
-            # delete query
-            eod_delete_query = "DELETE FROM {} WHERE trade_date = ?".format(eod_table_name)
-            intra_delete_query = "DELETE FROM {} WHERE trade_timestamp = ?".format(intra_table_name)
-            
             # delete eod
-            if (dates):
+            if (len(dates)):
+                eod_delete_query = "DELETE FROM \"{}_eod\" WHERE trade_date = ?".format(ticker)
                 self.nodata_cur.executemany(eod_delete_query, [(date, ) for date in dates])
-                self.nodata_con.commit()
-            
-            # delete intra
-            if (timestamps):
-                self.nodata_cur.executemany(intra_delete_query, [(timestamp, ) for timestamp in timestamps])
-                self.nodata_con.commit()
-        
+
+            # subtract intra
+            if (len(timestamps)):
+                rm_ranges = Utils.points_to_ranges(timestamps, _intra_step)
+                stored_ranges = self._pull_nodata_ranges_between(ticker, rm_ranges[0][0], rm_ranges[-1][1])
+                if (stored_ranges):
+                    self._replace_nodata_ranges(
+                        ticker, stored_ranges,
+                        Utils.subtract_ranges(stored_ranges, rm_ranges, _intra_step),
+                    )
+            self.nodata_con.commit()
+
         except Exception as e:
+            self.nodata_con.rollback()
             self.logger.info("- unable to remove dts: {}(dates) {}(tss)".format(len(dates), len(timestamps)))
             self.logger.info("- {}".format(e))
             return False
 
-        # 
+        #
         self.logger.info("- remove dts success: {}(dates) {}(tss)".format(len(dates), len(timestamps)))
-        
+
         return True
-        
 
-    def _nodata_table_names(self):
+    def rm_dates_bulk(self, ticker_dates:dict[str, list[str]]) -> bool:
+        """remove no data dates of many tickers in one transaction,
+        tickers without nodata tables are skipped
+
+        Args:
+            ticker_dates (dict[str, list[str]]): ticker: dates
+
+        Returns:
+            bool: is success rm
         """
-        
+        exist_nodata_table_names = self._nodata_table_names()
+        ticker_dates = {
+            ticker: dates for ticker, dates in ticker_dates.items()
+            if ('{}_eod'.format(ticker) in exist_nodata_table_names) and (len(dates))
+        }
+        self.logger.info("- remove dates of {} tickers".format(len(ticker_dates)))
+        try:
+            for ticker, dates in ticker_dates.items():
+                self.nodata_cur.executemany(
+                    "DELETE FROM \"{}_eod\" WHERE trade_date = ?".format(ticker), [(date, ) for date in dates],
+                )
+            self.nodata_con.commit()
+        except Exception as e:
+            self.nodata_con.rollback()
+            self.logger.info("- unable to remove dates of {} tickers".format(len(ticker_dates)))
+            self.logger.info("- {}".format(e))
+            return False
+        return True
+
+    def _pull_nodata_ranges_between(self, ticker:str, start_ts:int, end_ts:int) -> list[tuple[int, int]]:
+        """stored no data ranges overlapping [start_ts, end_ts]
+
+        Args:
+            ticker (str): _description_
+            start_ts (int): _description_
+            end_ts (int): _description_
+
+        Returns:
+            list[tuple[int, int]]: sorted ranges
+        """
+        # ranges are disjoint, so only the last range starting before start_ts can reach into it
+        return self.nodata_cur.execute(
+            ("SELECT start_ts, end_ts FROM \"{0}_intra\" WHERE start_ts >= "
+             "COALESCE((SELECT MAX(start_ts) FROM \"{0}_intra\" WHERE start_ts <= ?), ?) "
+             "AND start_ts <= ? AND end_ts >= ? ORDER BY start_ts;").format(ticker),
+            (int(start_ts), int(start_ts), int(end_ts), int(start_ts)),
+        ).fetchall()
+
+    def _replace_nodata_ranges(
+        self, ticker:str, old_ranges:list[tuple[int, int]],
+        new_ranges:list[tuple[int, int]],
+    ):
+        """swap stored ranges for new ones, left uncommitted
+
+        Args:
+            ticker (str): _description_
+            old_ranges (list[tuple[int, int]]): stored ranges to delete
+            new_ranges (list[tuple[int, int]]): ranges to insert
+        """
+        self.nodata_cur.executemany(
+            "DELETE FROM \"{}_intra\" WHERE start_ts = ?;".format(ticker),
+            [(start_ts, ) for start_ts, _ in old_ranges],
+        )
+        self.nodata_cur.executemany(
+            "INSERT INTO \"{}_intra\" (start_ts, end_ts) VALUES (?, ?);".format(ticker),
+            new_ranges,
+        )
+
+    def _migrate_nodata_tables(self):
+        """convert per-minute '{ticker}_intra' tables to range tables, once per db file
+        """
+        version = self.nodata_cur.execute("PRAGMA user_version;").fetchone()[0]
+        if (version >= _nodata_schema_version):
+            return
+
+        legacy_tables = [
+            table_name for table_name in self._nodata_table_names()
+            if (table_name.endswith('_intra')) and ('trade_timestamp' in [
+                col[1] for col in self.nodata_cur.execute("PRAGMA table_info(\"{}\");".format(table_name)).fetchall()
+            ])
+        ]
+        self.logger.info("migrate {} nodata intra tables to ranges".format(len(legacy_tables)))
+        try:
+            self.nodata_cur.execute("BEGIN;")   # ddl does not open a transaction by itself
+            for table_name in legacy_tables:
+                ticker = table_name[:-len('_intra')]
+                timestamps = [x[0] for x in self.nodata_cur.execute(
+                    "SELECT trade_timestamp FROM \"{}\";".format(table_name)
+                ).fetchall()]
+                self.nodata_cur.execute("DROP TABLE \"{}\";".format(table_name))
+                self.nodata_cur.execute(
+                    "CREATE TABLE \"{}_intra\"(start_ts INTEGER PRIMARY KEY, end_ts INTEGER NOT NULL);".format(ticker)
+                )
+                self._replace_nodata_ranges(ticker, [], Utils.points_to_ranges(timestamps, _intra_step))
+            self.nodata_cur.execute("PRAGMA user_version = {};".format(_nodata_schema_version))
+            self.nodata_con.commit()
+        except Exception:
+            self.nodata_con.rollback()
+            raise
+
+    def _nodata_table_names(self) -> set[str]:
+        """table names of nodata.db, from the catalog
+
         """
-        rows = self.nodata_cur.execute("""SELECT name FROM sqlite_master WHERE type='table'""")
-        rows = self.nodata_cur.fetchall()
-        return [x[0] for x in rows]
\ No newline at end of file
+        return self._nodata_catalog.names
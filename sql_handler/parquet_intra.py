@@ -0,0 +1,217 @@
+# -----------------------
+# ParquetIntraStore class
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import os
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# stored columns, 'gmtoffset' (always 0) and 'trade_datetime' (utc time of the timestamp) are not kept
+intra_store_schema = pa.schema([
+    ('trade_timestamp', pa.int64()),
+    ('open', pa.float64()),
+    ('high', pa.float64()),
+    ('low', pa.float64()),
+    ('close', pa.float64()),
+    ('volume', pa.float64()),
+])
+_row_group_size = 4096          # rows per row group, ~4 trading days of 1min bars
+_part_file_name = 'part.parquet'
+
+
+class ParquetIntraStore:
+    """intra bars as parquet files partitioned by ticker and (utc) year-month
+
+    '{root}/ticker={ticker}/year_month={%Y-%m}/part.parquet', each file sorted by
+    timestamp, zstd compressed with dictionary encoding and small row groups so
+    timestamp filters skip row groups by their statistics. a push rewrites the
+    touched months through a temp file and an atomic rename.
+    """
+
+    def __init__(self, logger:logging.Logger, root_dir_path:str):
+        """init ParquetIntraStore
+
+        Args:
+            logger (logging.Logger): logger
+            root_dir_path (str): store directory
+        """
+        self.logger = logger
+        self.root_dir_path = root_dir_path     # created by the first push
+
+    def push(self, ticker:str, df:pd.DataFrame, overwrite:bool=False) -> int:
+        """write formatted intra bars of a ticker
+
+        Args:
+            ticker (str): ticker
+            df (pd.DataFrame): bars with 'trade_timestamp' and ohlcv columns
+            overwrite (bool, optional): replace bars already stored instead of skipping them. Defaults to False.
+
+        Returns:
+            int: rows added or replaced
+        """
+        table = pa.Table.from_pandas(
+            df[intra_store_schema.names].astype({name: 'float64' for name in intra_store_schema.names[1:]}),
+            schema=intra_store_schema, preserve_index=False,
+        )
+        timestamps = table.column('trade_timestamp').to_numpy()
+        months = timestamps.astype('datetime64[s]').astype('datetime64[M]')
+
+        n_written = 0
+        for month in np.unique(months):
+            new = table.filter(pa.array(months == month))
+            file_path = self._file_path(ticker, month)
+            if (os.path.isfile(file_path)):
+                stored = pq.read_table(file_path, memory_map=True)
+                new_ts = new.column('trade_timestamp').to_numpy()
+                stored_ts = stored.column('trade_timestamp').to_numpy()
+                if (overwrite):
+                    stored = stored.filter(pa.array(~np.isin(stored_ts, new_ts)))
+                else:
+                    new = new.filter(pa.array(~np.isin(new_ts, stored_ts)))
+                if (new.num_rows == 0):
+                    continue
+                merged = pa.concat_tables([stored, new])
+            else:
+                merged = new
+            n_written += new.num_rows
+            self._write(file_path, merged.sort_by('trade_timestamp'))
+
+        self.logger.info('- {} rows written to \'{}\', {} input'.format(n_written, self.root_dir_path, len(df)))
+        return n_written
+
+    def read_array(self, ticker:str, start_ts:int, end_ts:int, dtype:np.dtype) -> np.ndarray:
+        """read bars of a ticker into a structured array
+
+        Args:
+            ticker (str): ticker
+            start_ts (int): first unix timestamp, None for no bound
+            end_ts (int): last unix timestamp, None for no bound
+            dtype (np.dtype): structured dtype, fields not stored are filled with 0
+
+        Returns:
+            np.ndarray: bars sorted by timestamp
+        """
+        tables = [self._read_file(file_path, start_ts, end_ts, dtype) for file_path in self._file_paths(ticker, start_ts, end_ts)]
+        return _to_array(pa.concat_tables(tables) if tables else None, dtype)
+
+    def iter_arrays(self, ticker:str, start_ts:int, end_ts:int, dtype:np.dtype, chunk_size:int):
+        """yield bars of a ticker in structured arrays of at most `chunk_size` rows, one month held at a time
+
+        Args:
+            ticker (str): ticker
+            start_ts (int): first unix timestamp, None for no bound
+            end_ts (int): last unix timestamp, None for no bound
+            dtype (np.dtype): structured dtype, fields not stored are filled with 0
+            chunk_size (int): rows per chunk
+
+        Yields:
+            np.ndarray: bars sorted by timestamp
+        """
+        for file_path in self._file_paths(ticker, start_ts, end_ts):
+            table = self._read_file(file_path, start_ts, end_ts, dtype)
+            for batch in table.to_batches(max_chunksize=chunk_size):
+                if (batch.num_rows):
+                    yield _to_array(pa.Table.from_batches([batch]), dtype)
+
+    def _read_file(self, file_path:str, start_ts:int, end_ts:int, dtype:np.dtype) -> pa.Table:
+        """read a month file memory mapped, filtering row groups by timestamp statistics
+
+        Args:
+            file_path (str): month file
+            start_ts (int): first unix timestamp, None for no bound
+            end_ts (int): last unix timestamp, None for no bound
+            dtype (np.dtype): requested fields
+
+        Returns:
+            pa.Table: stored columns among the requested fields
+        """
+        filters = []
+        if (start_ts is not None):
+            filters.append(('trade_timestamp', '>=', int(start_ts)))
+        if (end_ts is not None):
+            filters.append(('trade_timestamp', '<=', int(end_ts)))
+        columns = [name for name in dtype.names if name in intra_store_schema.names]
+        return pq.read_table(file_path, columns=columns, filters=filters or None, memory_map=True)
+
+    def _file_paths(self, ticker:str, start_ts:int, end_ts:int) -> list[str]:
+        """month files of a ticker overlapping the range, in time order
+
+        Args:
+            ticker (str): ticker
+            start_ts (int): first unix timestamp, None for no bound
+            end_ts (int): last unix timestamp, None for no bound
+
+        Returns:
+            list[str]: file paths
+        """
+        ticker_dir_path = os.path.join(self.root_dir_path, 'ticker={}'.format(ticker))
+        if (not os.path.isdir(ticker_dir_path)):
+            return []
+        # partition pruning on the directory names
+        first_month = None if (start_ts is None) else str(np.datetime64(int(start_ts), 's').astype('datetime64[M]'))
+        last_month = None if (end_ts is None) else str(np.datetime64(int(end_ts), 's').astype('datetime64[M]'))
+        file_paths = []
+        for dir_name in sorted(os.listdir(ticker_dir_path)):
+            month = dir_name.split('=', 1)[-1]
+            if ((first_month is not None) and (month < first_month)):
+                continue
+            if ((last_month is not None) and (month > last_month)):
+                continue
+            file_path = os.path.join(ticker_dir_path, dir_name, _part_file_name)
+            if (os.path.isfile(file_path)):
+                file_paths.append(file_path)
+        return file_paths
+
+    def _file_path(self, ticker:str, month:np.datetime64) -> str:
+        """file of a ticker's month
+
+        Args:
+            ticker (str): ticker
+            month (np.datetime64): month
+
+        Returns:
+            str: file path
+        """
+        return os.path.join(
+            self.root_dir_path, 'ticker={}'.format(ticker),
+            'year_month={}'.format(str(month)), _part_file_name,
+        )
+
+    def _write(self, file_path:str, table:pa.Table):
+        """replace a month file atomically
+
+        Args:
+            file_path (str): month file
+            table (pa.Table): bars sorted by timestamp
+        """
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp_file_path = '{}.tmp'.format(file_path)
+        pq.write_table(
+            table, tmp_file_path, compression='zstd', use_dictionary=True,
+            row_group_size=_row_group_size, write_statistics=True,
+        )
+        os.replace(tmp_file_path, file_path)
+
+
+def _to_array(table:pa.Table, dtype:np.dtype) -> np.ndarray:
+    """structured array from an arrow table
+
+    Args:
+        table (pa.Table): bars, None for no rows
+        dtype (np.dtype): structured dtype, fields not in the table are filled with 0
+
+    Returns:
+        np.ndarray: bars
+    """
+    n_rows = 0 if (table is None) else table.num_rows
+    arr = np.zeros(n_rows, dtype=dtype)
+    if (n_rows):
+        for name in dtype.names:
+            if (name in table.column_names):
+                arr[name] = table.column(name).to_numpy()
+    return arr
@@ -0,0 +1,278 @@
+# -----------------------
+# ResampleData class
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import re
+import logging
+import numpy as np
+import pandas as pd
+
+from delta.utils import est
+
+# table names of stock_price.db
+intra_bars_table_name = 'intra_bars'                        # materialized bars of all tickers and intervals
+intra_bars_intervals_table_name = 'intra_bars_intervals'    # intervals kept in 'intra_bars'
+
+bar_columns = ['trade_timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+_interval_units = {'m': 60, 'h': 3600, 'd': 86400}
+_interval_pattern = re.compile(r'^(\d+)([mhd])$')
+
+
+def interval_secs(interval:int|str) -> int:
+    """bar interval in seconds
+
+    Args:
+        interval (int | str): seconds, or '5m', '1h', '1d', ...
+
+    Raises:
+        ValueError: invalid interval, or one that does not split a day evenly
+
+    Returns:
+        int: seconds
+    """
+    if (isinstance(interval, str)):
+        match = _interval_pattern.match(interval)
+        if (not match):
+            raise ValueError("\'interval\' should be like '5m', '1h' or '1d', not \'{}\'".format(interval))
+        secs = int(match.group(1)) * _interval_units[match.group(2)]
+    else:
+        secs = int(interval)
+    if ((secs < 60) or (secs % 60) or (86400 % secs)):
+        raise ValueError("\'interval\' should be whole minutes splitting a day evenly, not \'{}\'".format(interval))
+    return secs
+
+
+def bucket_starts(timestamps:np.ndarray, secs:int) -> np.ndarray:
+    """start timestamp of the bar each 1min timestamp falls in,
+    bars are aligned to new york wall clock so '1d' bars are trading days
+
+    Args:
+        timestamps (np.ndarray): unix timestamps
+        secs (int): bar interval in seconds
+
+    Returns:
+        np.ndarray: bar start unix timestamps (int64)
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    local_timestamps = pd.to_datetime(timestamps, unit='s', utc=True).tz_convert(est).tz_localize(None).as_unit('s').asi8
+    offsets = local_timestamps - timestamps
+    return local_timestamps // secs * secs - offsets
+
+
+def resample_bars(bars:pd.DataFrame|np.ndarray, interval:int|str) -> pd.DataFrame:
+    """aggregate 1min bars of one ticker, sorted by timestamp, into `interval` bars
+
+    Args:
+        bars (pd.DataFrame | np.ndarray): bars with `bar_columns`
+        interval (int | str): seconds, or '5m', '1h', '1d', ...
+
+    Returns:
+        pd.DataFrame: `bar_columns`, 'trade_timestamp' being the start of each bar
+    """
+    secs = interval_secs(interval)
+    if (len(bars) == 0):
+        return pd.DataFrame({col: np.empty(0, dtype=np.int64 if col == 'trade_timestamp' else np.float64) for col in bar_columns})
+
+    buckets = bucket_starts(bars['trade_timestamp'], secs)
+    # group boundaries where the bucket changes
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+    return pd.DataFrame({
+        'trade_timestamp': buckets[starts],
+        'open': np.asarray(bars['open'], dtype=np.float64)[starts],
+        'high': np.fmax.reduceat(np.asarray(bars['high'], dtype=np.float64), starts),
+        'low': np.fmin.reduceat(np.asarray(bars['low'], dtype=np.float64), starts),
+        'close': np.asarray(bars['close'], dtype=np.float64)[ends],
+        'volume': np.add.reduceat(np.nan_to_num(np.asarray(bars['volume'], dtype=np.float64)), starts),
+    })
+
+
+class ResampleData:
+    # '{intra_bars}' keeps bars of the intervals listed in '{intra_bars_intervals}',
+    # kept in step with 'intra' by `push_intra`
+
+    def __init__(self, logger:logging.Logger):
+        self.logger = logger
+
+    def pull_resampled(
+        self, tickers:str|list[str], interval:int|str,
+        start_ts:int=None, end_ts:int=None,
+    ) -> pd.DataFrame:
+        """pull bars of any interval, from the materialized table when the interval is kept there,
+        otherwise aggregated from the 1min bars
+
+        Args:
+            tickers (str | list[str]): ticker, or list of tickers
+            interval (int | str): seconds, or '5m', '1h', '1d', ...
+            start_ts (int, optional): first unix timestamp, widened to the start of its bar. Defaults to None (no bound).
+            end_ts (int, optional): last unix timestamp, widened to the end of its bar. Defaults to None (no bound).
+
+        Returns:
+            pd.DataFrame: whole bars, with a 'ticker' column when `tickers` is a list
+        """
+        secs = interval_secs(interval)
+        is_multi = not isinstance(tickers, str)
+        tickers = list(tickers) if is_multi else [tickers]
+        self.logger.info("pull {}s bars of {} tickers".format(secs, len(tickers)))
+
+        # widen to whole bars, so 1min and materialized bars agree
+        if (start_ts is not None):
+            start_ts = int(bucket_starts([start_ts], secs)[0])
+        if (end_ts is not None):
+            end_ts = int(bucket_starts([end_ts], secs)[0]) + secs - 1
+
+        dfs = []
+        for ticker in tickers:
+            ticker_id = self._ticker_id(ticker)
+            if (ticker_id is None):
+                self.logger.info("- \'{}\' not in the ticker dictionary".format(ticker))
+                continue
+            if (secs in self._materialized_intervals):
+                df = self._pull_materialized_bars(ticker_id, secs, start_ts, end_ts)
+            else:
+                df = resample_bars(self.pull_intra(ticker, start_ts, end_ts, columns=bar_columns, as_frame=False), secs)
+            if (is_multi):
+                df.insert(0, 'ticker', ticker)
+            dfs.append(df)
+
+        if (not dfs):
+            df = resample_bars([], secs)
+            if (is_multi):
+                df.insert(0, 'ticker', '')
+            return df
+        return pd.concat(dfs, ignore_index=True)
+
+    def materialize_intervals(self, intervals:list[int|str]):
+        """keep bars of the intervals in the materialized table,
+        building them from the stored 1min bars of every ticker
+
+        Args:
+            intervals (list[int | str]): seconds, or '5m', '1h', '1d', ...
+        """
+        new_secs = [secs for secs in dict.fromkeys(interval_secs(x) for x in intervals) if secs not in self._materialized_intervals]
+        self.logger.info("materialize {} intervals".format(len(new_secs)))
+        for secs in new_secs:
+            try:
+                self.cur.execute("DELETE FROM {} WHERE interval=?;".format(intra_bars_table_name), (secs, ))
+                for ticker, ticker_id in self._ticker_ids.items():
+                    # chunks arrive in time order, a bar split between two chunks is merged on conflict
+                    for chunk in self.iter_intra(ticker, columns=bar_columns):
+                        self._upsert_bars(ticker_id, secs, resample_bars(chunk, secs), merge=True)
+                self.cur.execute(
+                    "INSERT OR IGNORE INTO {}(interval) VALUES (?);".format(intra_bars_intervals_table_name), (secs, )
+                )
+                self.con.commit()
+            except Exception as e:
+                self.con.rollback()
+                self.logger.info("- fail to materialize {}s bars: {}".format(secs, e))
+                raise
+            self._materialized_intervals.append(secs)
+            self.logger.info("- materialized {}s bars".format(secs))
+
+    def drop_materialized_intervals(self, intervals:list[int|str]):
+        """stop keeping bars of the intervals
+
+        Args:
+            intervals (list[int | str]): seconds, or '5m', '1h', '1d', ...
+        """
+        drop_secs = [interval_secs(x) for x in intervals]
+        self.logger.info("drop {} materialized intervals".format(len(drop_secs)))
+        for table_name in (intra_bars_table_name, intra_bars_intervals_table_name):
+            self.cur.executemany("DELETE FROM {} WHERE interval=?;".format(table_name), [(secs, ) for secs in drop_secs])
+        self.con.commit()
+        self._materialized_intervals = [secs for secs in self._materialized_intervals if secs not in drop_secs]
+
+    def _update_materialized_bars(self, ticker:str, timestamps:np.ndarray):
+        """rebuild the materialized bars touched by newly pushed minutes, left uncommitted
+
+        Args:
+            ticker (str): ticker
+            timestamps (np.ndarray): pushed unix timestamps
+        """
+        if ((not self._materialized_intervals) or (len(timestamps) == 0)):
+            return
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        ticker_id = self._ticker_id(ticker)
+        for secs in self._materialized_intervals:
+            first_bucket, last_bucket = bucket_starts([timestamps.min(), timestamps.max()], secs)
+            bars = self.pull_intra(
+                ticker, int(first_bucket), int(last_bucket) + secs - 1,
+                columns=bar_columns, as_frame=False,
+            )
+            self._upsert_bars(ticker_id, secs, resample_bars(bars, secs), merge=False)
+
+    def _upsert_bars(self, ticker_id:int, secs:int, df:pd.DataFrame, merge:bool):
+        """write aggregated bars, left uncommitted
+
+        Args:
+            ticker_id (int): ticker id
+            secs (int): bar interval in seconds
+            df (pd.DataFrame): `bar_columns`
+            merge (bool): combine with a stored bar of the same start, instead of replacing it
+        """
+        if (merge):
+            conflict_action = ("DO UPDATE SET high=MAX(high, excluded.high), low=MIN(low, excluded.low), "
+                               "close=excluded.close, volume=volume+excluded.volume")
+        else:
+            conflict_action = ("DO UPDATE SET open=excluded.open, high=excluded.high, low=excluded.low, "
+                               "close=excluded.close, volume=excluded.volume")
+        self.cur.executemany(
+            ("INSERT INTO {} (ticker_id, interval, trade_timestamp, open, high, low, close, volume) "
+             "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(ticker_id, interval, trade_timestamp) {};").format(
+                intra_bars_table_name, conflict_action,
+            ),
+            ((ticker_id, secs, int(row[0])) + tuple(row[1:]) for row in df.itertuples(index=False, name=None)),
+        )
+
+    def _pull_materialized_bars(self, ticker_id:int, secs:int, start_ts:int, end_ts:int) -> pd.DataFrame:
+        """read bars from the materialized table
+
+        Args:
+            ticker_id (int): ticker id
+            secs (int): bar interval in seconds
+            start_ts (int): first bar start, None for no bound
+            end_ts (int): last timestamp, None for no bound
+
+        Returns:
+            pd.DataFrame: `bar_columns`
+        """
+        conditions = ['ticker_id=?', 'interval=?']
+        params = [ticker_id, secs]
+        if (start_ts is not None):
+            conditions.append('trade_timestamp>=?')
+            params.append(int(start_ts))
+        if (end_ts is not None):
+            conditions.append('trade_timestamp<=?')
+            params.append(int(end_ts))
+        query = "SELECT {} FROM {} WHERE {} ORDER BY trade_timestamp;".format(
+            ', '.join(bar_columns), intra_bars_table_name, ' AND '.join(conditions),
+        )
+        dtype = [('trade_timestamp', 'i8')] + [(col, 'f8') for col in bar_columns[1:]]
+        return pd.DataFrame(np.fromiter(self.con.execute(query, params), dtype=dtype))
+
+    def _init_resample_tables(self):
+        """create the materialized bar tables and load the kept intervals
+        """
+        self.cur.execute(
+            ("CREATE TABLE IF NOT EXISTS "
+             "{}("
+             "ticker_id INTEGER NOT NULL, "
+             "interval INTEGER NOT NULL, "
+             "trade_timestamp INTEGER NOT NULL, "
+             "open FLOAT, "
+             "high FLOAT, "
+             "low FLOAT, "
+             "close FLOAT, "
+             "volume FLOAT, "
+             "PRIMARY KEY (ticker_id, interval, trade_timestamp)) WITHOUT ROWID;").format(intra_bars_table_name)
+        )
+        self.cur.execute(
+            "CREATE TABLE IF NOT EXISTS {}(interval INTEGER PRIMARY KEY);".format(intra_bars_intervals_table_name)
+        )
+        self.con.commit()
+        self._materialized_intervals = [x[0] for x in self.cur.execute(
+            "SELECT interval FROM {} ORDER BY interval;".format(intra_bars_intervals_table_name)
+        ).fetchall()]
@@ -0,0 +1,111 @@
+# -----------------------
+# SessionData class
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import logging
+import numpy as np
+
+from delta.utils import TradingCalendar, nyse_sessions, session_dtype
+
+# table names of stock_price.db
+sessions_table_name = 'sessions'                    # one row per NYSE session
+sessions_coverage_table_name = 'sessions_coverage'  # calendar dates 'sessions' was computed for
+
+
+class SessionData:
+    # '{sessions}' keeps the open/close and extended hours boundaries of every
+    # NYSE session, computed with pandas_market_calendars for whole years the
+    # first time a period outside '{sessions_coverage}' is asked for
+
+    def __init__(self, logger:logging.Logger):
+        self.logger = logger
+
+    def session_calendar(self, start_date:str, end_date:str) -> TradingCalendar:
+        """trading calendar built from the stored sessions
+
+        Args:
+            start_date (str): start date, '%Y-%m-%d'
+            end_date (str): end date, '%Y-%m-%d'
+
+        Returns:
+            TradingCalendar: calendar
+        """
+        return TradingCalendar(start_date, end_date, self.pull_sessions(start_date, end_date))
+
+    def pull_sessions(self, start_date:str, end_date:str) -> np.ndarray:
+        """sessions between start and end dates, in one read
+
+        Args:
+            start_date (str): start date, '%Y-%m-%d'
+            end_date (str): end date, '%Y-%m-%d'
+
+        Returns:
+            np.ndarray: `session_dtype` sessions, sorted by date
+        """
+        self._cover_sessions(start_date, end_date)
+        return np.fromiter(
+            self.con.execute(
+                ("SELECT trade_date, pre_open, market_open, market_close, post_close FROM {} "
+                 "WHERE trade_date BETWEEN ? AND ? ORDER BY trade_date;").format(sessions_table_name),
+                (start_date, end_date),
+            ),
+            dtype=session_dtype,
+        )
+
+    def _cover_sessions(self, start_date:str, end_date:str):
+        """compute and store the sessions of whole years around the dates if not covered yet
+
+        Args:
+            start_date (str): start date, '%Y-%m-%d'
+            end_date (str): end date, '%Y-%m-%d'
+        """
+        coverage = self.cur.execute(
+            "SELECT start_date, end_date FROM {};".format(sessions_coverage_table_name)
+        ).fetchone()
+        if ((coverage is not None) and (coverage[0] <= start_date) and (end_date <= coverage[1])):
+            return
+        # extend the covered dates to whole years including the request
+        if (coverage is not None):
+            start_date, end_date = min(start_date, coverage[0]), max(end_date, coverage[1])
+        start_date, end_date = '{}-01-01'.format(start_date[:4]), '{}-12-31'.format(end_date[:4])
+        self.logger.info("compute nyse sessions between {} and {}".format(start_date, end_date))
+        sessions = nyse_sessions(start_date, end_date)
+        try:
+            self.cur.executemany(
+                ("INSERT OR REPLACE INTO {} (trade_date, pre_open, market_open, market_close, post_close) "
+                 "VALUES (?, ?, ?, ?, ?);").format(sessions_table_name),
+                sessions.tolist(),
+            )
+            self.cur.execute(
+                "INSERT OR REPLACE INTO {} (id, start_date, end_date) VALUES (0, ?, ?);".format(sessions_coverage_table_name),
+                (start_date, end_date),
+            )
+            self.con.commit()
+        except Exception as e:
+            self.con.rollback()
+            self.logger.info("- fail to store sessions: {}".format(e))
+            raise
+        self.logger.info("- stored {} sessions".format(len(sessions)))
+
+    def _init_session_tables(self):
+        """create the session tables
+        """
+        self.cur.execute(
+            ("CREATE TABLE IF NOT EXISTS "
+             "{}("
+             "trade_date DATE PRIMARY KEY, "
+             "pre_open INTEGER NOT NULL, "
+             "market_open INTEGER NOT NULL, "
+             "market_close INTEGER NOT NULL, "
+             "post_close INTEGER NOT NULL) WITHOUT ROWID;").format(sessions_table_name)
+        )
+        self.cur.execute(
+            ("CREATE TABLE IF NOT EXISTS "
+             "{}("
+             "id INTEGER PRIMARY KEY CHECK (id = 0), "
+             "start_date DATE NOT NULL, "
+             "end_date DATE NOT NULL);").format(sessions_coverage_table_name)
+        )
+        self.con.commit()
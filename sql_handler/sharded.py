@@ -0,0 +1,390 @@
+# -----------------------
+# ShardedDBHandler class
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import os
+import re
+import zlib
+import sqlite3
+import logging
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+from delta.utils import Utils
+from delta.sql_handler.db_handler import DBHandler
+from delta.sql_handler.stock_price import (
+    tickers_table_name, eod_table_name, intra_table_name, eod_dtypes, intra_dtypes,
+)
+
+max_view_shards = 10    # dbs sqlite attaches by default (SQLITE_MAX_ATTACHED)
+
+# table name of shard 0's stock_price db
+shard_layout_table_name = 'shard_layout'    # n_shards the data dir was laid out with
+
+_shard_file_pattern = re.compile(r'^stock_price_(\d+)\.db$')
+
+# methods taking a ticker first, run on the ticker's shard
+_ticker_methods = {
+    'pull_tkl_dts', 'push_eod', 'push_intra',
+    'is_stock_price_tables_exist', 'crt_stock_price_tables',
+    'is_nodata_table_exists', 'crt_nodata_tables',
+    'push_nodata_dts', 'push_nodata_ranges', 'pull_nodata_dts', 'pull_nodata_ranges',
+    'is_nodata_ts', 'rm_dts',
+}
+
+
+class ShardedDBHandler:
+    """stock price and nodata dbs split over `n_shards` pairs of files by ticker hash
+
+    every shard is a DBHandler of its own, with its own connections and writer
+    thread, so batches of many tickers are written to the shards in parallel.
+    calls taking a ticker go to its shard and calls taking many tickers are
+    split by shard; anything else (journal, sessions, fundamentals, ...) is
+    kept in shard 0. `open_cross_shard_view` attaches every shard for sql
+    reads across them. like DBHandler, a router is used from one thread.
+
+    the shard of a ticker depends on `n_shards`, which stays the same for a data dir.
+    """
+
+    def __init__(
+        self, logger:logging.Logger, data_dir_path:str, n_shards:int,
+        profile:str='default', intra_backend:str='sqlite',
+    ):
+        """init ShardedDBHandler
+
+        Args:
+            logger (logging.Logger): logger
+            data_dir_path (str): data dir
+            n_shards (int): number of shards
+            profile (str, optional): connection profile of every db, see `connection_profiles`. Defaults to 'default'.
+            intra_backend (str, optional): 'sqlite' or 'parquet' (needs pyarrow) storage of intra bars. Defaults to 'sqlite'.
+
+        Raises:
+            ValueError: `n_shards` is not positive, or the data dir is laid out with another `n_shards`
+        """
+        if (n_shards < 1):
+            raise ValueError("\'n_shards\' should be a positive integer, not \'{}\'".format(n_shards))
+        data_dir_path = os.path.join(data_dir_path, '')
+        shard_files = [
+            int(match.group(1)) for match in map(_shard_file_pattern.match, os.listdir(data_dir_path))
+            if (match is not None)
+        ] if (os.path.isdir(data_dir_path)) else []
+        if (shard_files and (max(shard_files) >= n_shards)):
+            raise ValueError("\'{}\' holds shard {}, not a layout of {} shards".format(
+                data_dir_path, max(shard_files), n_shards,
+            ))
+
+        self.logger = logger
+        self.n_shards = n_shards
+        self.shards = [
+            DBHandler(logger, data_dir_path, profile, intra_backend=intra_backend, shard=shard)
+            for shard in range(n_shards)
+        ]
+        self._check_layout(data_dir_path)
+        # one writer thread per shard, writes of a shard are never concurrent
+        self._writers = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix='shard{:02d}-writer'.format(shard))
+            for shard in range(n_shards)
+        ]
+
+    def __getattr__(self, name:str):
+        # only called for attributes the router does not define
+        if (name in ('shards', '_writers')):
+            raise AttributeError(name)
+        if (name in _ticker_methods):
+            def routed(ticker:str, *args, **kwargs):
+                return getattr(self.handler_of(ticker), name)(ticker, *args, **kwargs)
+            return routed
+        return getattr(self.shards[0], name)
+
+    def shard_of(self, ticker:str) -> int:
+        """shard of a ticker, stable across processes and runs
+
+        Args:
+            ticker (str): ticker
+
+        Returns:
+            int: shard index
+        """
+        return zlib.crc32(ticker.encode()) % self.n_shards
+
+    def handler_of(self, ticker:str) -> DBHandler:
+        """db handler of a ticker's shard
+
+        Args:
+            ticker (str): ticker
+
+        Returns:
+            DBHandler: shard
+        """
+        return self.shards[self.shard_of(ticker)]
+
+    def crt_missing_tables(self, tickers:list[str]):
+        """create every table the tickers still miss, in their shards
+
+        Args:
+            tickers (list[str]): tickers
+        """
+        for shard, shard_tickers in self._split(tickers).items():
+            self.shards[shard].crt_missing_tables(shard_tickers)
+
+    def pull_eod(self, tickers:str|list[str], *args, as_frame:bool=True, **kwargs) -> pd.DataFrame|np.ndarray:
+        """`DBHandler.pull_eod` across shards, bars in the order of `tickers`
+        """
+        return self._pull_each('pull_eod', tickers, args, kwargs, as_frame)
+
+    def pull_intra(self, tickers:str|list[str], *args, as_frame:bool=True, **kwargs) -> pd.DataFrame|np.ndarray:
+        """`DBHandler.pull_intra` across shards, bars in the order of `tickers`
+        """
+        return self._pull_each('pull_intra', tickers, args, kwargs, as_frame)
+
+    def pull_resampled(self, tickers:str|list[str], *args, **kwargs) -> pd.DataFrame:
+        """`DBHandler.pull_resampled` across shards, bars in the order of `tickers`
+        """
+        return self._pull_each('pull_resampled', tickers, args, kwargs, True)
+
+    def iter_eod(self, tickers:str|list[str], *args, **kwargs):
+        """`DBHandler.iter_eod` across shards, chunks in the order of `tickers`
+        """
+        yield from self._iter_each('iter_eod', tickers, args, kwargs)
+
+    def iter_intra(self, tickers:str|list[str], *args, **kwargs):
+        """`DBHandler.iter_intra` across shards, chunks in the order of `tickers`
+        """
+        yield from self._iter_each('iter_intra', tickers, args, kwargs)
+
+    def export_eod(self, file_path:str, tickers:str|list[str], *args, **kwargs) -> int:
+        """`DBHandler.export_eod` across shards
+
+        Returns:
+            int: rows written
+        """
+        return Utils.write_chunks(self.iter_eod(tickers, *args, **kwargs), file_path)
+
+    def export_intra(self, file_path:str, tickers:str|list[str], *args, **kwargs) -> int:
+        """`DBHandler.export_intra` across shards
+
+        Returns:
+            int: rows written
+        """
+        return Utils.write_chunks(self.iter_intra(tickers, *args, **kwargs), file_path)
+
+    def push_eod_bulk(self, df:pd.DataFrame, overwrite:bool=False) -> bool:
+        """`DBHandler.push_eod_bulk` split by shard, the shards are written in parallel
+
+        Returns:
+            bool: True if every shard is pushed
+        """
+        shards = df['ticker'].map(self.shard_of)
+        return all(self._on_shards({
+            shard: ('push_eod_bulk', (shard_df, overwrite)) for shard, shard_df in df.groupby(shards)
+        }).values())
+
+    def push_bars_batch(self, eod_frames:dict[str, pd.DataFrame], intra_frames:dict[str, pd.DataFrame]) -> bool:
+        """`DBHandler.push_bars_batch` split by shard, the shards are written in parallel,
+        each in one transaction
+
+        Returns:
+            bool: True if every shard is pushed
+        """
+        eod_split, intra_split = self._split(eod_frames), self._split(intra_frames)
+        return all(self._on_shards({
+            shard: (
+                'push_bars_batch',
+                (
+                    {ticker: eod_frames[ticker] for ticker in eod_split.get(shard, [])},
+                    {ticker: intra_frames[ticker] for ticker in intra_split.get(shard, [])},
+                ),
+            )
+            for shard in set(eod_split) | set(intra_split)
+        }).values())
+
+    def push_windows_batch(self, run_id:int, ticker_windows:dict[str, list[tuple]]):
+        """`DBHandler.push_windows_batch`, journaled in shard 0 with the rest of the run
+        """
+        self.shards[0].push_windows_batch(run_id, ticker_windows)
+
+    def push_nodata_dates_bulk(self, ticker_dates:dict[str, list[str]]):
+        """`DBHandler.push_nodata_dates_bulk` split by shard
+        """
+        self._on_shards({
+            shard: ('push_nodata_dates_bulk', ({ticker: ticker_dates[ticker] for ticker in tickers}, ))
+            for shard, tickers in self._split(ticker_dates).items()
+        })
+
+    def rm_dates_bulk(self, ticker_dates:dict[str, list[str]]) -> bool:
+        """`DBHandler.rm_dates_bulk` split by shard
+
+        Returns:
+            bool: is success rm
+        """
+        return all(self._on_shards({
+            shard: ('rm_dates_bulk', ({ticker: ticker_dates[ticker] for ticker in tickers}, ))
+            for shard, tickers in self._split(ticker_dates).items()
+        }).values())
+
+    def materialize_intervals(self, intervals:list[int|str]):
+        """`DBHandler.materialize_intervals` in every shard, in parallel
+        """
+        self._on_shards({shard: ('materialize_intervals', (intervals, )) for shard in range(self.n_shards)})
+
+    def drop_materialized_intervals(self, intervals:list[int|str]):
+        """`DBHandler.drop_materialized_intervals` in every shard
+        """
+        self._on_shards({shard: ('drop_materialized_intervals', (intervals, )) for shard in range(self.n_shards)})
+
+    def reload_catalogs(self):
+        """re-read the table catalogs of every shard
+        """
+        for shard in self.shards:
+            shard.reload_catalogs()
+
+    def close_all_conn(self):
+        """close the db connections of every shard
+        """
+        for shard in self.shards:
+            shard.close_all_conn()
+
+    def open_cross_shard_view(self) -> sqlite3.Connection:
+        """read only connection attaching the stock price db of every shard,
+        with temp views 'tickers', 'eod' and 'intra' over all of them keyed by ticker
+
+        Raises:
+            ValueError: more shards than sqlite attaches
+
+        Returns:
+            sqlite3.Connection: connection, eg. for `pd.read_sql_query`
+        """
+        if (self.n_shards > max_view_shards):
+            raise ValueError("a view attaches at most {} shards, not {}".format(max_view_shards, self.n_shards))
+        con = sqlite3.connect(':memory:', uri=True, check_same_thread=False)
+        schemas = []
+        for i, shard in enumerate(self.shards):
+            shard.con   # opened first, so the file and its tables exist
+            schema = 's{:02d}'.format(i)
+            con.execute("ATTACH DATABASE ? AS {};".format(schema), ('file:{}?mode=ro'.format(shard.STOCK_PRICE_DB_PATH), ))
+            schemas.append(schema)
+
+        con.execute("CREATE TEMP VIEW tickers AS {};".format(' UNION ALL '.join(
+            "SELECT ticker, {} AS shard FROM {}.{}".format(i, schema, tickers_table_name)
+            for i, schema in enumerate(schemas)
+        )))
+        for table_name, dtypes in ((eod_table_name, eod_dtypes), (intra_table_name, intra_dtypes)):
+            con.execute("CREATE TEMP VIEW {} AS {};".format(table_name, ' UNION ALL '.join(
+                "SELECT t.ticker, {} FROM {}.{} AS b JOIN {}.{} AS t ON t.ticker_id = b.ticker_id".format(
+                    ', '.join('b.{}'.format(col) for col in dtypes), schema, table_name, schema, tickers_table_name,
+                )
+                for schema in schemas
+            )))
+        self.logger.info("opened cross shard view of {} shards".format(self.n_shards))
+        return con
+
+    def _split(self, tickers) -> dict[int, list[str]]:
+        """tickers grouped by shard, in their order
+
+        Args:
+            tickers (Iterable[str]): tickers, eg. a list or the keys of a dict
+
+        Returns:
+            dict[int, list[str]]: shard: tickers
+        """
+        split = {}
+        for ticker in tickers:
+            split.setdefault(self.shard_of(ticker), []).append(ticker)
+        return split
+
+    def _on_shards(self, shard_calls:dict[int, tuple[str, tuple]]) -> dict[int, object]:
+        """run a method on several shards at once, each on its writer thread
+
+        Args:
+            shard_calls (dict[int, tuple[str, tuple]]): shard: (method name, args)
+
+        Returns:
+            dict[int, object]: shard: result
+        """
+        futures = {
+            shard: self._writers[shard].submit(getattr(self.shards[shard], name), *args)
+            for shard, (name, args) in shard_calls.items()
+        }
+        return {shard: future.result() for shard, future in futures.items()}
+
+    def _pull_each(
+        self, name:str, tickers:str|list[str], args:tuple, kwargs:dict, as_frame:bool,
+    ) -> pd.DataFrame|np.ndarray:
+        """pull a ticker's bars from its shard, or each ticker's from its shard combined
+
+        Args:
+            name (str): pull method
+            tickers (str | list[str]): ticker, or list of tickers
+            args (tuple): further arguments
+            kwargs (dict): further keyword arguments
+            as_frame (bool): return a DataFrame
+
+        Returns:
+            pd.DataFrame | np.ndarray: bars, with a 'ticker' column when `tickers` is a list
+        """
+        if (name != 'pull_resampled'):
+            kwargs = dict(kwargs, as_frame=as_frame)
+        if (isinstance(tickers, str)):
+            return getattr(self.handler_of(tickers), name)(tickers, *args, **kwargs)
+        tickers = list(tickers)
+        if (not tickers):
+            return getattr(self.shards[0], name)([], *args, **kwargs)
+        pulled = [getattr(self.handler_of(ticker), name)([ticker], *args, **kwargs) for ticker in tickers]
+        if (as_frame):
+            return pd.concat(pulled, ignore_index=True)
+        # 'ticker' fields are as wide as each ticker, widen them to the longest
+        width = max(len(ticker) for ticker in tickers)
+        dtype = np.dtype([
+            (field, 'U{}'.format(width) if (field == 'ticker') else pulled[0].dtype[field])
+            for field in pulled[0].dtype.names
+        ])
+        return np.concatenate([arr.astype(dtype) for arr in pulled])
+
+    def _iter_each(self, name:str, tickers:str|list[str], args:tuple, kwargs:dict):
+        """iter a ticker's bars from its shard, or each ticker's from its shard in turn
+
+        Args:
+            name (str): iter method
+            tickers (str | list[str]): ticker, or list of tickers
+            args (tuple): further arguments
+            kwargs (dict): further keyword arguments
+
+        Yields:
+            pd.DataFrame | pyarrow.RecordBatch: chunk of bars
+        """
+        if (isinstance(tickers, str)):
+            yield from getattr(self.handler_of(tickers), name)(tickers, *args, **kwargs)
+            return
+        for ticker in tickers:
+            yield from getattr(self.handler_of(ticker), name)([ticker], *args, **kwargs)
+
+    def _check_layout(self, data_dir_path:str):
+        """record `n_shards` in shard 0 on first use, raise if the data dir was laid out with another
+
+        Args:
+            data_dir_path (str): data dir
+
+        Raises:
+            ValueError: the recorded `n_shards` differs
+        """
+        con = self.shards[0].con
+        con.execute(
+            ("CREATE TABLE IF NOT EXISTS "
+             "{}("
+             "id INTEGER PRIMARY KEY CHECK (id = 0), "
+             "n_shards INTEGER NOT NULL);").format(shard_layout_table_name)
+        )
+        layout = con.execute("SELECT n_shards FROM {};".format(shard_layout_table_name)).fetchone()
+        if (layout is None):
+            con.execute(
+                "INSERT INTO {} (id, n_shards) VALUES (0, ?);".format(shard_layout_table_name), (self.n_shards, ),
+            )
+            self.logger.info("lay out \'{}\' with {} shards".format(data_dir_path, self.n_shards))
+        con.commit()
+        if ((layout is not None) and (layout[0] != self.n_shards)):
+            self.close_all_conn()
+            raise ValueError("\'{}\' is laid out with {} shards, not {}".format(data_dir_path, layout[0], self.n_shards))
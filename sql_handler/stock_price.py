@@ -4,6 +4,8 @@
 # Wed 14 Jun 2023
 # -----------------------
 
+import re
+import numpy as np
 import pandas as pd
 import sqlite3
 import logging
@@ -11,6 +13,45 @@ from delta.utils import Utils
 
 # import local
 from delta.sql_handler.nodata import NoDataDB
+from delta.sql_handler.catalog import TableCatalog
+from delta.sql_handler.connection import connect, opened_on_access
+from delta.sql_handler.resample import ResampleData
+from delta.sql_handler.journal import UpdateJournal
+from delta.sql_handler.sessions import SessionData
+
+# table names of stock_price.db
+tickers_table_name = 'tickers'      # ticker dictionary, ticker -> ticker_id
+eod_table_name = 'eod'              # eod bars of all tickers
+intra_table_name = 'intra'          # intra bars of all tickers
+
+intra_backends = ['sqlite', 'parquet']   # storage of intra bars
+
+_legacy_table_pattern = re.compile(r'^(.+)_(eod|intra)$')     # per-ticker tables, '{ticker}_eod'
+
+# column dtypes of pulled bars, value columns are floats so NULLs come back as nan
+eod_dtypes = {
+    'trade_date': 'U10',
+    'open': 'f8',
+    'high': 'f8',
+    'low': 'f8',
+    'close': 'f8',
+    'volume': 'f8',
+    'adj_close': 'f8',
+}
+intra_dtypes = {
+    'trade_timestamp': 'i8',
+    'open': 'f8',
+    'high': 'f8',
+    'low': 'f8',
+    'close': 'f8',
+    'volume': 'f8',
+    'gmtoffset': 'f8',
+    'trade_datetime': 'M8[s]',
+}
+# columns computed from another column instead of read, the api's 'datetime' is the utc time of 'timestamp'
+_derived_columns = {
+    'trade_datetime': 'trade_timestamp',
+}
 
 class GetData:
     
@@ -44,16 +85,16 @@ class GetData:
         dt_obj_index = 0
         
         # queries
-        eod_query = 'SELECT trade_date FROM {}_eod WHERE trade_date>={} AND trade_date<={};'.format(
-            ticker, start_date, end_date
-        )
-        intra_query = 'SELECT trade_timestamp FROM {}_intra WHERE trade_timestamp>={} AND trade_timestamp<={};'.format(
-            ticker, start_ts, end_ts
-        )
+        ticker_id = self._ticker_id(ticker)
+        eod_query = 'SELECT trade_date FROM {} WHERE ticker_id=? AND trade_date>=? AND trade_date<=?;'.format(eod_table_name)
+        intra_query = 'SELECT trade_timestamp FROM {} WHERE ticker_id=? AND trade_timestamp>=? AND trade_timestamp<=?;'.format(intra_table_name)
         
         # pull from database
-        raw_eod = self.con.execute(eod_query).fetchall()    # eod date "%Y%m%d"
-        raw_intra = self.con.execute(intra_query).fetchall() # intra datetime unix timestamp
+        raw_eod = self.con.execute(eod_query, (ticker_id, start_date, end_date)).fetchall()    # eod date "%Y-%m-%d"
+        if (self._intra_store is not None):
+            raw_intra = self._intra_store.read_array(ticker, start_ts, end_ts, np.dtype([('trade_timestamp', 'i8')])).tolist()
+        else:
+            raw_intra = self.con.execute(intra_query, (ticker_id, int(start_ts), int(end_ts))).fetchall() # intra datetime unix timestamp
         
         # extract dates
         if (raw_eod):
@@ -71,11 +112,339 @@ class GetData:
 
         return dates, timestamps
 
-    def pull_eod():
-        ...
+    def pull_eod(
+        self, tickers:str|list[str], start_date:str=None, end_date:str=None,
+        columns:list[str]=None, as_frame:bool=True,
+    ) -> pd.DataFrame|np.ndarray:
+        """pull eod bars of one or more tickers
+
+        Args:
+            tickers (str | list[str]): ticker, or list of tickers
+            start_date (str, optional): first date, '%Y-%m-%d'. Defaults to None (no bound).
+            end_date (str, optional): last date, '%Y-%m-%d'. Defaults to None (no bound).
+            columns (list[str], optional): columns to read, 'trade_date' is always included. Defaults to None (all).
+            as_frame (bool, optional): return a DataFrame instead of a structured array. Defaults to True.
+
+        Returns:
+            pd.DataFrame | np.ndarray: bars sorted by ticker and date, with a 'ticker' column when `tickers` is a list
+        """
+        return self._pull_bars(eod_table_name, eod_dtypes, tickers, start_date, end_date, columns, as_frame)
     
-    def pull_intra():
-        ...
+    def pull_intra(
+        self, tickers:str|list[str], start_ts:int=None, end_ts:int=None,
+        columns:list[str]=None, as_frame:bool=True,
+    ) -> pd.DataFrame|np.ndarray:
+        """pull intra bars of one or more tickers
+
+        Args:
+            tickers (str | list[str]): ticker, or list of tickers
+            start_ts (int, optional): first unix timestamp. Defaults to None (no bound).
+            end_ts (int, optional): last unix timestamp. Defaults to None (no bound).
+            columns (list[str], optional): columns to read, 'trade_timestamp' is always included. Defaults to None (all).
+            as_frame (bool, optional): return a DataFrame instead of a structured array. Defaults to True.
+
+        Returns:
+            pd.DataFrame | np.ndarray: bars sorted by ticker and timestamp, with a 'ticker' column when `tickers` is a list
+        """
+        start_ts = None if (start_ts is None) else int(start_ts)
+        end_ts = None if (end_ts is None) else int(end_ts)
+        return self._pull_bars(intra_table_name, intra_dtypes, tickers, start_ts, end_ts, columns, as_frame)
+
+    def iter_eod(
+        self, tickers:str|list[str], start_date:str=None, end_date:str=None,
+        columns:list[str]=None, chunk_size:int=100_000, as_record_batch:bool=False,
+    ):
+        """yield eod bars in chunks of at most `chunk_size` rows, see `pull_eod`
+
+        Args:
+            tickers (str | list[str]): ticker, or list of tickers
+            start_date (str, optional): first date, '%Y-%m-%d'. Defaults to None (no bound).
+            end_date (str, optional): last date, '%Y-%m-%d'. Defaults to None (no bound).
+            columns (list[str], optional): columns to read. Defaults to None (all).
+            chunk_size (int, optional): rows per chunk. Defaults to 100_000.
+            as_record_batch (bool, optional): yield pyarrow record batches instead of DataFrames. Defaults to False.
+
+        Yields:
+            pd.DataFrame | pyarrow.RecordBatch: chunk of bars
+        """
+        yield from self._iter_bars(
+            eod_table_name, eod_dtypes, tickers, start_date, end_date,
+            columns, chunk_size, as_record_batch,
+        )
+
+    def iter_intra(
+        self, tickers:str|list[str], start_ts:int=None, end_ts:int=None,
+        columns:list[str]=None, chunk_size:int=100_000, as_record_batch:bool=False,
+    ):
+        """yield intra bars in chunks of at most `chunk_size` rows, see `pull_intra`
+
+        Args:
+            tickers (str | list[str]): ticker, or list of tickers
+            start_ts (int, optional): first unix timestamp. Defaults to None (no bound).
+            end_ts (int, optional): last unix timestamp. Defaults to None (no bound).
+            columns (list[str], optional): columns to read. Defaults to None (all).
+            chunk_size (int, optional): rows per chunk. Defaults to 100_000.
+            as_record_batch (bool, optional): yield pyarrow record batches instead of DataFrames. Defaults to False.
+
+        Yields:
+            pd.DataFrame | pyarrow.RecordBatch: chunk of bars
+        """
+        start_ts = None if (start_ts is None) else int(start_ts)
+        end_ts = None if (end_ts is None) else int(end_ts)
+        yield from self._iter_bars(
+            intra_table_name, intra_dtypes, tickers, start_ts, end_ts,
+            columns, chunk_size, as_record_batch,
+        )
+
+    def export_eod(
+        self, file_path:str, tickers:str|list[str], start_date:str=None,
+        end_date:str=None, columns:list[str]=None, chunk_size:int=100_000,
+    ) -> int:
+        """stream eod bars into a csv or parquet file at constant memory
+
+        Args:
+            file_path (str): '.csv' or '.parquet' file
+            tickers (str | list[str]): ticker, or list of tickers
+            start_date (str, optional): first date, '%Y-%m-%d'. Defaults to None (no bound).
+            end_date (str, optional): last date, '%Y-%m-%d'. Defaults to None (no bound).
+            columns (list[str], optional): columns to export. Defaults to None (all).
+            chunk_size (int, optional): rows held in memory at once. Defaults to 100_000.
+
+        Returns:
+            int: rows written
+        """
+        self.logger.info("export eod to '{}'".format(file_path))
+        n_rows = Utils.write_chunks(
+            self.iter_eod(tickers, start_date, end_date, columns, chunk_size), file_path,
+        )
+        self.logger.info("- exported {} rows".format(n_rows))
+        return n_rows
+
+    def export_intra(
+        self, file_path:str, tickers:str|list[str], start_ts:int=None,
+        end_ts:int=None, columns:list[str]=None, chunk_size:int=100_000,
+    ) -> int:
+        """stream intra bars into a csv or parquet file at constant memory
+
+        Args:
+            file_path (str): '.csv' or '.parquet' file
+            tickers (str | list[str]): ticker, or list of tickers
+            start_ts (int, optional): first unix timestamp. Defaults to None (no bound).
+            end_ts (int, optional): last unix timestamp. Defaults to None (no bound).
+            columns (list[str], optional): columns to export. Defaults to None (all).
+            chunk_size (int, optional): rows held in memory at once. Defaults to 100_000.
+
+        Returns:
+            int: rows written
+        """
+        self.logger.info("export intra to '{}'".format(file_path))
+        n_rows = Utils.write_chunks(
+            self.iter_intra(tickers, start_ts, end_ts, columns, chunk_size), file_path,
+        )
+        self.logger.info("- exported {} rows".format(n_rows))
+        return n_rows
+
+    def _iter_bars(
+        self, table_name:str, dtypes:dict[str, str], tickers:str|list[str],
+        start, end, columns:list[str], chunk_size:int, as_record_batch:bool,
+    ):
+        """read bars with `fetchmany`, one ticker after another, on a cursor of its own
+
+        Args:
+            table_name (str): eod or intra table
+            dtypes (dict[str, str]): column dtypes of the table, the first is the dt column
+            tickers (str | list[str]): ticker, or list of tickers
+            start: first date/timestamp, None for no bound
+            end: last date/timestamp, None for no bound
+            columns (list[str]): columns to read, None for all
+            chunk_size (int): rows per chunk
+            as_record_batch (bool): yield pyarrow record batches
+
+        Yields:
+            pd.DataFrame | pyarrow.RecordBatch: chunk of bars
+        """
+        if (chunk_size < 1):
+            raise ValueError("'chunk_size' should be a positive integer, not '{}'".format(chunk_size))
+        if (as_record_batch):
+            # optional dependency, only needed for record batches
+            import pyarrow as pa
+
+        is_multi = not isinstance(tickers, str)
+        tickers = list(tickers) if is_multi else [tickers]
+        dtype, query, derived = self._bars_query(table_name, dtypes, start, end, columns)
+        width = max([len(ticker) for ticker in tickers], default=1)
+
+        cur = self.con.cursor()
+        try:
+            for ticker in tickers:
+                ticker_id = self._ticker_id(ticker)
+                if (ticker_id is None):
+                    self.logger.info("- '{}' not in the ticker dictionary".format(ticker))
+                    continue
+                for arr in self._iter_bar_arrays(cur, table_name, ticker, ticker_id, query, dtype, start, end, chunk_size):
+                    arr = _with_derived(arr, derived, dtypes)
+                    if (is_multi):
+                        arr = _with_ticker(arr, ticker, width)
+                    chunk = pd.DataFrame(arr)
+                    yield pa.RecordBatch.from_pandas(chunk, preserve_index=False) if as_record_batch else chunk
+        finally:
+            cur.close()
+
+    def _iter_bar_arrays(
+        self, cur:sqlite3.Cursor, table_name:str, ticker:str, ticker_id:int,
+        query:str, dtype:np.dtype, start, end, chunk_size:int,
+    ):
+        """yield structured arrays of a ticker's bars from sqlite or the intra store
+
+        Args:
+            cur (sqlite3.Cursor): cursor to read with
+            table_name (str): eod or intra table
+            ticker (str): ticker
+            ticker_id (int): ticker id
+            query (str): query from `_bars_query`
+            dtype (np.dtype): row dtype from `_bars_query`
+            start: first date/timestamp, None for no bound
+            end: last date/timestamp, None for no bound
+            chunk_size (int): rows per chunk
+
+        Yields:
+            np.ndarray: bars
+        """
+        if ((table_name == intra_table_name) and (self._intra_store is not None)):
+            yield from self._intra_store.iter_arrays(ticker, start, end, dtype, chunk_size)
+            return
+        cur.execute(query, [ticker_id] + [x for x in (start, end) if x is not None])
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if (not rows):
+                break
+            yield np.fromiter(rows, dtype=dtype, count=len(rows))
+
+    def _pull_bars(
+        self, table_name:str, dtypes:dict[str, str], tickers:str|list[str],
+        start, end, columns:list[str], as_frame:bool,
+    ) -> pd.DataFrame|np.ndarray:
+        """read bars one ticker at a time, each a range scan on the primary key,
+        straight from the cursor into a structured array
+
+        Args:
+            table_name (str): eod or intra table
+            dtypes (dict[str, str]): column dtypes of the table, the first is the dt column
+            tickers (str | list[str]): ticker, or list of tickers
+            start: first date/timestamp, None for no bound
+            end: last date/timestamp, None for no bound
+            columns (list[str]): columns to read, None for all
+            as_frame (bool): return a DataFrame
+
+        Returns:
+            pd.DataFrame | np.ndarray: bars
+        """
+        is_multi = not isinstance(tickers, str)
+        tickers = list(tickers) if is_multi else [tickers]
+        self.logger.info("pull {} of {} tickers".format(table_name, len(tickers)))
+        dtype, query, derived = self._bars_query(table_name, dtypes, start, end, columns)
+        width = max([len(ticker) for ticker in tickers], default=1)
+
+        arrays = []
+        for ticker in tickers:
+            ticker_id = self._ticker_id(ticker)
+            if (ticker_id is None):
+                self.logger.info("- '{}' not in the ticker dictionary".format(ticker))
+                continue
+            if ((table_name == intra_table_name) and (self._intra_store is not None)):
+                arr = self._intra_store.read_array(ticker, start, end, dtype)
+            else:
+                params = [ticker_id] + [x for x in (start, end) if x is not None]
+                arr = np.fromiter(self.con.execute(query, params), dtype=dtype)
+            if (derived):
+                arr = _with_derived(arr, derived, dtypes)
+            if (is_multi):
+                arr = _with_ticker(arr, ticker, width)
+            arrays.append(arr)
+
+        empty = _with_derived(np.empty(0, dtype=dtype), derived, dtypes)
+        if (is_multi):
+            empty = _with_ticker(empty, '', width)
+        bars = np.concatenate(arrays) if arrays else empty
+        self.logger.info("- pulled {} rows".format(len(bars)))
+        
+        return pd.DataFrame(bars) if as_frame else bars
+
+    def _bars_query(
+        self, table_name:str, dtypes:dict[str, str],
+        start, end, columns:list[str],
+    ) -> tuple[np.dtype, str, list[str]]:
+        """projection dtype and parameterized range query of a ticker's bars
+
+        Args:
+            table_name (str): eod or intra table
+            dtypes (dict[str, str]): column dtypes of the table, the first is the dt column
+            start: first date/timestamp, None for no bound
+            end: last date/timestamp, None for no bound
+            columns (list[str]): columns to read, None for all
+
+        Raises:
+            ValueError: unknown column
+
+        Returns:
+            tuple[np.dtype, str, list[str]]: row dtype, query taking (ticker_id[, start][, end]), derived columns
+        """
+        dt_column = next(iter(dtypes))
+        if (columns is None):
+            columns = list(dtypes)
+        invalid_columns = [col for col in columns if col not in dtypes]
+        if (invalid_columns):
+            raise ValueError("invalid '{}' columns: {}".format(table_name, ', '.join(invalid_columns)))
+        columns = [dt_column] + [col for col in dict.fromkeys(columns) if col != dt_column]
+        derived = [col for col in columns if col in _derived_columns]
+        columns = [col for col in columns if col not in _derived_columns]
+
+        conditions = ['ticker_id=?']
+        if (start is not None):
+            conditions.append('{}>=?'.format(dt_column))
+        if (end is not None):
+            conditions.append('{}<=?'.format(dt_column))
+        query = "SELECT {} FROM {} WHERE {} ORDER BY {};".format(
+            ', '.join(columns), table_name, ' AND '.join(conditions), dt_column,
+        )
+        return np.dtype([(col, dtypes[col]) for col in columns]), query, derived
+
+def _with_derived(arr:np.ndarray, derived:list[str], dtypes:dict[str, str]) -> np.ndarray:
+    """append derived fields to a structured array of bars
+
+    Args:
+        arr (np.ndarray): bars
+        derived (list[str]): derived columns
+        dtypes (dict[str, str]): column dtypes
+
+    Returns:
+        np.ndarray: bars with derived columns
+    """
+    if (not derived):
+        return arr
+    out = np.empty(len(arr), dtype=arr.dtype.descr + [(col, dtypes[col]) for col in derived])
+    for name in arr.dtype.names:
+        out[name] = arr[name]
+    for col in derived:
+        out[col] = arr[_derived_columns[col]].astype(dtypes[col])
+    return out
+
+def _with_ticker(arr:np.ndarray, ticker:str, width:int) -> np.ndarray:
+    """prepend a 'ticker' field to a structured array of bars
+
+    Args:
+        arr (np.ndarray): bars
+        ticker (str): ticker
+        width (int): max ticker length
+
+    Returns:
+        np.ndarray: bars with 'ticker'
+    """
+    out = np.empty(len(arr), dtype=[('ticker', 'U{}'.format(width))] + arr.dtype.descr)
+    out['ticker'] = ticker
+    for name in arr.dtype.names:
+        out[name] = arr[name]
+    return out
 
 class LoadData(NoDataDB):
     # TODO:
@@ -95,13 +464,15 @@ class LoadData(NoDataDB):
         # # init NoDataDB
         # NoDataDB.__init__(self, self.logger, NO_DATA_DB_PATH)
 
-    def push_eod(self, ticker: str, df: pd.DataFrame) -> bool:
+    def push_eod(self, ticker: str, df: pd.DataFrame, overwrite:bool=False) -> bool:
         """
         Pushes the data from a pandas DataFrame into the corresponding end-of-day (EOD) table in the database.
+        Only rows of dates not yet in the table are written, unless `overwrite`.
 
         Args:
             ticker (str): The ticker symbol of the stock or financial instrument.
             df (pd.DataFrame): The DataFrame containing the data to be pushed.
+            overwrite (bool, optional): Replace the values of dates already stored. Defaults to False.
 
         Returns:
             bool: True if the data is successfully pushed, False otherwise.
@@ -115,12 +486,12 @@ class LoadData(NoDataDB):
         
         # push data
         try:
-            df.to_sql('{}_eod'.format(ticker), self.con, if_exists='replace', index=False)
+            self._upsert(eod_table_name, 'trade_date', ticker, df, overwrite)
             
             # check nodata timestamps
             is_success_rm = self._rm_nodata_dts(ticker, df['trade_date'], [])
             if (not is_success_rm):
-                self.logger.info('error occurred while preparing to push eod'.format(ticker))
+                self.logger.info('error occurred while preparing to push \'{}\' eod'.format(ticker))
                 self.logger.info('- exception on \'_rm_nodata_dts\'')
                 self.logger.info('- cancel commit')
                 return False
@@ -130,17 +501,73 @@ class LoadData(NoDataDB):
             self.logger.info('success push eod')
             return True
         except Exception as e:
+            self.con.rollback()
             self.logger.info('error occurred while pushing \'{}\' eod'.format(ticker))
             self.logger.info('- {}'.format(e))
             return False
         
-    def push_intra(self, ticker:str, df:pd.DataFrame) -> bool:
+    def push_eod_bulk(self, df:pd.DataFrame, overwrite:bool=False) -> bool:
+        """push eod rows of many tickers in one transaction, eg. an exchange's bulk day,
+        rows of tickers not in the ticker dictionary are left out
+
+        Args:
+            df (pd.DataFrame): 'ticker' and the api's eod columns
+            overwrite (bool, optional): Replace the values of dates already stored. Defaults to False.
+
+        Returns:
+            bool: True if the data is successfully pushed, False otherwise.
+        """
+        self.logger.info('prepare for bulk eod push of {} tickers'.format(df['ticker'].nunique()))
+        ticker_ids = df['ticker'].map(self._ticker_ids)
+        is_known = ticker_ids.notna().to_numpy()
+        if (not is_known.all()):
+            self.logger.info('- {} rows of tickers not in the ticker dictionary left out'.format(int((~is_known).sum())))
+        df, ticker_ids = df[is_known], ticker_ids[is_known]
+        # format column name
+        is_success_format, formatted_df = Utils._format_column_names(df.drop(columns='ticker'), 'eod')
+        if (not is_success_format):
+            self.logger.info('- fail to format dataframe')
+            return False
+        formatted_df.insert(0, 'ticker_id', ticker_ids.astype('int64'))
+
+        # push data
+        try:
+            self.cur.executemany(
+                self._upsert_query(eod_table_name, 'trade_date', list(formatted_df.columns), overwrite),
+                formatted_df.itertuples(index=False, name=None),
+            )
+            self.logger.info('- {} rows written to \'{}\', {} input'.format(self.cur.rowcount, eod_table_name, len(formatted_df)))
+
+            # check nodata dates
+            is_success_rm = self.rm_dates_bulk(
+                df.groupby('ticker')['date'].agg(list).to_dict()
+            )
+            if (not is_success_rm):
+                self.logger.info('error occurred while preparing to push bulk eod')
+                self.logger.info('- exception on \'rm_dates_bulk\'')
+                self.logger.info('- cancel commit')
+                self.con.rollback()
+                return False
+
+            # commit if no exceptions
+            self.con.commit()
+            self.logger.info('success push bulk eod')
+            return True
+        except Exception as e:
+            self.con.rollback()
+            self.logger.info('error occurred while pushing bulk eod')
+            self.logger.info('- {}'.format(e))
+            return False
+
+    def push_intra(self, ticker:str, df:pd.DataFrame, overwrite:bool=False) -> bool:
         """
         Pushes the data from a pandas DataFrame into the corresponding intra-day table in the database.
+        Only rows of timestamps not yet in the table are written, unless `overwrite`.
 
         Args:
             ticker (str): The ticker symbol of the stock or financial instrument.
             df (pd.DataFrame): The DataFrame containing the data to be pushed.
+            overwrite (bool, optional): Replace the values of timestamps already stored. Defaults to False.
 
         Returns:
             bool: True if the data is successfully pushed, False otherwise.
@@ -155,26 +582,163 @@ class LoadData(NoDataDB):
         
         # push data
         try:
-            # push
-            df.to_sql('{}_intra'.format(ticker), self.con, if_exists='replace', index=False)
+            # push, parquet bars are written once the sqlite part is committed
+            if (self._intra_store is not None):
+                if (self._ticker_id(ticker) is None):
+                    raise ValueError("\'{}\' is not in the ticker dictionary".format(ticker))
+            else:
+                self._upsert(intra_table_name, 'trade_timestamp', ticker, df, overwrite)
+                # keep materialized bars in step, same transaction
+                self._update_materialized_bars(ticker, df['trade_timestamp'])
             
             # check nodata timestamps
-            is_success_rm = self._rm_nodata_dts(ticker, [], df['trade_datetime'])
+            is_success_rm = self._rm_nodata_dts(ticker, [], df['trade_timestamp'])
             if (not is_success_rm):
-                self.logger.info('error occurred while preparing to push intra'.format(ticker))
+                self.logger.info('error occurred while preparing to push \'{}\' intra'.format(ticker))
                 self.logger.info('- exception on \'_rm_nodata_dts\'')
                 self.logger.info('- canceled commit')
                 return False
             
             # commit if no exceptions
             self.con.commit()
-            self.logger.info('success push intra')
-            return True
         except Exception as e:
+            self.con.rollback()
             self.logger.info('error occurred while pushing \'{}\' intra'.format(ticker))
             self.logger.info('- {}'.format(e))
             return False
 
+        if ((self._intra_store is not None) and (not self._push_intra_store({ticker: df}, overwrite))):
+            return False
+        self.logger.info('success push intra')
+        return True
+
+    def push_bars_batch(
+        self, eod_frames:dict[str, pd.DataFrame], intra_frames:dict[str, pd.DataFrame],
+    ) -> bool:
+        """push formatted eod & intra bars of many tickers in one transaction,
+        only dts not yet stored are written. parquet intra bars are written
+        once it is committed, see `_push_intra_store`
+
+        Args:
+            eod_frames (dict[str, pd.DataFrame]): ticker: eod df with formatted column names
+            intra_frames (dict[str, pd.DataFrame]): ticker: intra df with formatted column names
+
+        Returns:
+            bool: True if every ticker is pushed, False otherwise (nothing is committed to sqlite
+                unless the parquet write failed, pushing again is safe).
+        """
+        self.logger.info('prepare for batch push: {}(eod) {}(intra) tickers'.format(len(eod_frames), len(intra_frames)))
+        try:
+            for ticker, df in eod_frames.items():
+                self._upsert(eod_table_name, 'trade_date', ticker, df, False)
+            for ticker, df in intra_frames.items():
+                if (self._intra_store is not None):
+                    # staged, parquet bars are written once the sqlite part is committed
+                    if (self._ticker_id(ticker) is None):
+                        raise ValueError("\'{}\' is not in the ticker dictionary".format(ticker))
+                else:
+                    self._upsert(intra_table_name, 'trade_timestamp', ticker, df, False)
+                    # keep materialized bars in step, same transaction
+                    self._update_materialized_bars(ticker, df['trade_timestamp'])
+
+            # check nodata dts
+            for ticker in dict.fromkeys(list(eod_frames) + list(intra_frames)):
+                is_success_rm = self._rm_nodata_dts(
+                    ticker,
+                    eod_frames[ticker]['trade_date'] if (ticker in eod_frames) else [],
+                    intra_frames[ticker]['trade_timestamp'] if (ticker in intra_frames) else [],
+                )
+                if (not is_success_rm):
+                    raise ValueError("fail to remove nodata dts of \'{}\'".format(ticker))
+
+            # commit if no exceptions
+            self.con.commit()
+        except Exception as e:
+            self.con.rollback()
+            self.logger.info('error occurred while pushing a batch of {} tickers'.format(
+                len(set(eod_frames) | set(intra_frames)),
+            ))
+            self.logger.info('- {}'.format(e))
+            return False
+
+        if ((self._intra_store is not None) and (not self._push_intra_store(intra_frames, False))):
+            return False
+        self.logger.info('success batch push')
+        return True
+
+    def _push_intra_store(self, intra_frames:dict[str, pd.DataFrame], overwrite:bool) -> bool:
+        """write intra bars to the parquet store after the sqlite part of a push is committed,
+        with the materialized bars of each ticker committed after its files
+
+        the store and sqlite are not written atomically. bars are written after their
+        nodata dts are cleared, so a failing write leaves bars missing (fetched again
+        by the next update), never no data dts of stored bars. pushes skip or replace
+        stored bars, pushing the same frames again completes a failed write.
+
+        Args:
+            intra_frames (dict[str, pd.DataFrame]): ticker: intra df with formatted column names
+            overwrite (bool): replace stored bars instead of skipping them
+
+        Returns:
+            bool: True if every ticker is written
+        """
+        for ticker, df in intra_frames.items():
+            try:
+                self._intra_store.push(ticker, df, overwrite)
+                self._update_materialized_bars(ticker, df['trade_timestamp'])
+                self.con.commit()
+            except Exception as e:
+                self.con.rollback()
+                self.logger.info('error occurred while writing \'{}\' parquet intra'.format(ticker))
+                self.logger.info('- {}'.format(e))
+                return False
+        return True
+
+    def _upsert(
+        self, table_name:str, dt_column:str, ticker:str,
+        df:pd.DataFrame, overwrite:bool,
+    ):
+        """insert formatted rows of a ticker into a shared table, left uncommitted
+
+        Args:
+            table_name (str): eod or intra table
+            dt_column (str): date/timestamp column of the primary key
+            ticker (str): ticker
+            df (pd.DataFrame): formatted df
+            overwrite (bool): update rows already stored instead of skipping them
+        """
+        ticker_id = self._ticker_id(ticker)
+        if (ticker_id is None):
+            raise ValueError("\'{}\' is not in the ticker dictionary".format(ticker))
+
+        upsert_query = self._upsert_query(table_name, dt_column, ['ticker_id'] + list(df.columns), overwrite)
+        rows = ((ticker_id, ) + row for row in df.itertuples(index=False, name=None))
+        self.cur.executemany(upsert_query, rows)
+        self.logger.info('- {} rows written to \'{}\', {} input'.format(self.cur.rowcount, table_name, len(df)))
+
+    def _upsert_query(self, table_name:str, dt_column:str, columns:list[str], overwrite:bool) -> str:
+        """insert query of rows keyed on (ticker_id, dt_column)
+
+        Args:
+            table_name (str): eod or intra table
+            dt_column (str): date/timestamp column of the primary key
+            columns (list[str]): inserted columns, starting with 'ticker_id'
+            overwrite (bool): update rows already stored instead of skipping them
+
+        Returns:
+            str: query
+        """
+        if (overwrite):
+            conflict_action = 'DO UPDATE SET {}'.format(', '.join(
+                '{0}=excluded.{0}'.format(col) for col in columns if col not in ('ticker_id', dt_column)
+            ))
+        else:
+            conflict_action = 'DO NOTHING'
+        return "INSERT INTO {} ({}) VALUES ({}) ON CONFLICT(ticker_id, {}) {};".format(
+            table_name, ', '.join(columns), ', '.join(['?'] * len(columns)),
+            dt_column, conflict_action,
+        )
+
     def _rm_nodata_dts(self, ticker:str, dates:list[str], timestamps:list[int]):
         """remove nodata dts
 
@@ -185,30 +749,73 @@ class LoadData(NoDataDB):
             
         """
         self.logger.info("- prepare to update nodata dts")
-        nodata_dates, nodata_timestamps = self.pull_nodata_dts(ticker)
         
-        dup_dates = list(set(dates) & set(nodata_dates))
-        dup_timestamps = list(set(timestamps) & set(nodata_timestamps))
-        
-        # remove from nodata db
-        is_success_rm = self.rm_dts(ticker, dup_dates, dup_timestamps)
+        # remove from nodata db, dts not in there are left untouched
+        is_success_rm = self.rm_dts(ticker, list(dates), list(timestamps))
 
         return is_success_rm
 
-class StockPriceDB(GetData, LoadData):
+class StockPriceDB(GetData, LoadData, ResampleData, UpdateJournal, SessionData):
+    # all tickers share one eod and one intra table, clustered on
+    # (ticker_id, trade_date) and (ticker_id, trade_timestamp);
+    # 'tickers' maps ticker symbols to ticker ids
+    
+    # opened by `_open_stock_price_db` on first use
+    con = opened_on_access('_open_stock_price_db')
+    cur = opened_on_access('_open_stock_price_db')
+    _stock_price_catalog = opened_on_access('_open_stock_price_db')
+    _ticker_ids = opened_on_access('_open_stock_price_db')
+    _materialized_intervals = opened_on_access('_open_stock_price_db')
     
-    def __init__(self, logger:logging.Logger, STOCK_PRICE_DB_PATH:str):
+    def __init__(
+        self, logger:logging.Logger, STOCK_PRICE_DB_PATH:str, profile:str='default',
+        intra_backend:str='sqlite', INTRA_DIR_PATH:str=None,
+    ):
         self.logger = logger
         self.STOCK_PRICE_DB_PATH = STOCK_PRICE_DB_PATH
-        self.logger.info(":: establish connection wtih stock_price.db ::")
-        self.con = sqlite3.connect(self.STOCK_PRICE_DB_PATH, check_same_thread=False)
-        self.cur = self.con.cursor()
+        self._stock_price_profile = profile
         
         self.table_types = ['eod', 'intra']
+
+        # intra bars in the 'intra' table, or in parquet files under INTRA_DIR_PATH
+        if (intra_backend not in intra_backends):
+            raise ValueError("\'intra_backend\' should be one of {}, not \'{}\'".format(', '.join(intra_backends), intra_backend))
+        self.intra_backend = intra_backend
+        self._intra_store = None
+        if (intra_backend == 'parquet'):
+            # optional dependency, only needed for the parquet backend
+            from delta.sql_handler.parquet_intra import ParquetIntraStore
+            self.logger.info(":: intra bars stored as parquet in {} ::".format(INTRA_DIR_PATH))
+            self._intra_store = ParquetIntraStore(self.logger, INTRA_DIR_PATH)
         
-        GetData.__init__(self, self.logger, self.STOCK_PRICE_DB_PATH, self.con, self.cur)
-        LoadData.__init__(self, self.logger, self.STOCK_PRICE_DB_PATH, self.con, self.cur)
+        # GetData and LoadData share the connection attributes above
+        ResampleData.__init__(self, self.logger)
+        UpdateJournal.__init__(self, self.logger)
+        SessionData.__init__(self, self.logger)
+
+    def _open_stock_price_db(self):
+        """connect to stock_price.db, create its tables and load the ticker dictionary
+        """
+        self.logger.info(":: establish connection wtih stock_price.db ({}) ::".format(self._stock_price_profile))
+        self.con = connect(self.STOCK_PRICE_DB_PATH, self._stock_price_profile, check_same_thread=False)
+        self.cur = self.con.cursor()
+
+        # init tables & ticker dictionary
+        self._init_stock_price_tables()
+        self._init_resample_tables()
+        self._init_journal_tables()
+        self._init_session_tables()
+        self._stock_price_catalog = TableCatalog(self.cur)
+        self._ticker_ids = dict(self.con.execute(
+            "SELECT ticker, ticker_id FROM {};".format(tickers_table_name)
+        ).fetchall())
         
+        # per-ticker tables of the old layout
+        legacy_tickers = self._legacy_stock_price_tickers()
+        if (legacy_tickers):
+            self.logger.warning("- {} tickers still in per-ticker tables, run 'migrate_per_ticker_tables'".format(
+                len(legacy_tickers)
+            ))
         
     def is_stock_price_tables_exist(self, ticker:str) -> tuple[bool, list[str]]:
         """check if the input ticker exists in database
@@ -217,24 +824,16 @@ class StockPriceDB(GetData, LoadData):
             ticker (str): _description_
 
         Returns:
-            tuple[bool, list[str]]: _description_
+            tuple[bool, list[str]]: is ticker registered, table types to create for it
         """
         self.logger.info("check stock price table exist")
 
         logging_info = '- check if {} tables exist: '.format(ticker)
-        crt_tables = []
-        for table_type in self.table_types:
-            table_name = '_'.join([ticker, table_type])
-            if (table_name in self._stock_price_table_names()):
-                continue
-            else:
-                # append for later action: create table
-                crt_tables.append(table_type)
-
-        if (crt_tables):
-            is_exist = False
+        if (ticker in self._ticker_ids):
+            is_exist, crt_tables = True, []
         else:
-            is_exist = True
+            # append for later action: create table
+            is_exist, crt_tables = False, list(self.table_types)
 
         logging_info = logging_info + str(is_exist)
         self.logger.info(logging_info) 
@@ -243,7 +842,7 @@ class StockPriceDB(GetData, LoadData):
         return is_exist, crt_tables
 
     def crt_stock_price_tables(self, ticker:str, table_types:list[str]):
-        """create ticker tables with the input table types
+        """register a ticker in the ticker dictionary, its rows go to the shared tables
 
         Args:
             ticker (str): _description_
@@ -252,36 +851,14 @@ class StockPriceDB(GetData, LoadData):
         # crt tables
         self.logger.info('create stock price tables')
         is_crt = False
-        if ('eod' in table_types):
-            #create eod
+        if (('eod' in table_types) or ('intra' in table_types)):
             self.cur.execute(
-                ("CREATE TABLE IF NOT EXISTS "
-                 "{}_eod("
-                 "trade_date DATE UNIQUE, "
-                 "open FLOAT, "
-                 "high FLOAT, "
-                 "low FLOAT, "
-                 "close FLOAT, "
-                 "volume BIGINT, "
-                 "adj_close FLOAT);").format(ticker)
-            )
-            self.con.commit()
-            is_crt = True
-        if ('intra' in table_types):
-            #create intra
-            self.cur.execute(
-                ("CREATE TABLE IF NOT EXISTS "
-                 "{}_intra("
-                 "trade_timestamp TIMESTAMP UNIQUE, "
-                 "open FLOAT, "
-                 "high FLOAT, "
-                 "low FLOAT, "
-                 "close FLOAT, "
-                 "volume BIGINT, "
-                 "gmtoffset INT, "
-                 "trade_datetime DATETIME);").format(ticker)
+                "INSERT OR IGNORE INTO {}(ticker) VALUES (?);".format(tickers_table_name), (ticker, )
             )
             self.con.commit()
+            self._ticker_ids[ticker] = self.cur.execute(
+                "SELECT ticker_id FROM {} WHERE ticker=?;".format(tickers_table_name), (ticker, )
+            ).fetchone()[0]
             is_crt = True
 
         if (is_crt):
@@ -290,10 +867,143 @@ class StockPriceDB(GetData, LoadData):
             logging_info = '- fail to create ticker tables with \'table_type\': {}'.format(', '.join(table_types))
         self.logger.info(logging_info)
 
-    def _stock_price_table_names(self):
+    def crt_missing_stock_price_tables(self, tickers:list[str]) -> int:
+        """register the tickers missing from the ticker dictionary, in one transaction
+
+        Args:
+            tickers (list[str]): tickers
+
+        Returns:
+            int: number of registered tickers
         """
+        crt_tickers = [ticker for ticker in dict.fromkeys(tickers) if (ticker not in self._ticker_ids)]
+        if (not crt_tickers):
+            return 0
+
+        self.logger.info("register {} tickers".format(len(crt_tickers)))
+        try:
+            self.cur.executemany(
+                "INSERT OR IGNORE INTO {}(ticker) VALUES (?);".format(tickers_table_name),
+                [(ticker, ) for ticker in crt_tickers],
+            )
+            self.con.commit()
+        except Exception:
+            self.con.rollback()
+            raise
+        self._ticker_ids = dict(self.con.execute(
+            "SELECT ticker, ticker_id FROM {};".format(tickers_table_name)
+        ).fetchall())
+        return len(crt_tickers)
+
+    def migrate_per_ticker_tables(self, drop:bool=True) -> int:
+        """move '{ticker}_eod' and '{ticker}_intra' tables into the shared tables
+
+        Args:
+            drop (bool, optional): drop per-ticker tables once copied. Defaults to True.
+
+        Returns:
+            int: number of migrated tickers
+        """
+        legacy_tickers = self._legacy_stock_price_tickers()
+        self.logger.info("migrate {} tickers from per-ticker tables".format(len(legacy_tickers)))
+        
+        for ticker, table_types in legacy_tickers.items():
+            self.crt_stock_price_tables(ticker, table_types)
+            ticker_id = self._ticker_id(ticker)
+            try:
+                # one transaction per ticker
+                if ('eod' in table_types):
+                    self.cur.execute(
+                        ("INSERT OR IGNORE INTO {}"
+                         "(ticker_id, trade_date, open, high, low, close, volume, adj_close) "
+                         "SELECT ?, trade_date, open, high, low, close, volume, adj_close "
+                         "FROM \"{}_eod\";").format(eod_table_name, ticker), (ticker_id, )
+                    )
+                if ('intra' in table_types):
+                    self.cur.execute(
+                        ("INSERT OR IGNORE INTO {}"
+                         "(ticker_id, trade_timestamp, open, high, low, close, volume, gmtoffset, trade_datetime) "
+                         "SELECT ?, trade_timestamp, open, high, low, close, volume, gmtoffset, trade_datetime "
+                         "FROM \"{}_intra\";").format(intra_table_name, ticker), (ticker_id, )
+                    )
+                if (drop):
+                    for table_type in table_types:
+                        self.cur.execute("DROP TABLE \"{}_{}\";".format(ticker, table_type))
+                self.con.commit()
+                if (drop):
+                    self._stock_price_catalog.discard(*['{}_{}'.format(ticker, table_type) for table_type in table_types])
+            except Exception as e:
+                self.con.rollback()
+                self.logger.info("- fail to migrate \'{}\': {}".format(ticker, e))
+                raise
+            self.logger.info("- migrated {}: {}".format(ticker, ', '.join(table_types)))
+        
+        return len(legacy_tickers)
+
+    def _init_stock_price_tables(self):
+        """create the ticker dictionary and the shared eod & intra tables
+        """
+        self.cur.execute(
+            ("CREATE TABLE IF NOT EXISTS "
+             "{}("
+             "ticker_id INTEGER PRIMARY KEY, "
+             "ticker TEXT UNIQUE NOT NULL);").format(tickers_table_name)
+        )
+        self.cur.execute(
+            ("CREATE TABLE IF NOT EXISTS "
+             "{}("
+             "ticker_id INTEGER NOT NULL, "
+             "trade_date DATE NOT NULL, "
+             "open FLOAT, "
+             "high FLOAT, "
+             "low FLOAT, "
+             "close FLOAT, "
+             "volume BIGINT, "
+             "adj_close FLOAT, "
+             "PRIMARY KEY (ticker_id, trade_date)) WITHOUT ROWID;").format(eod_table_name)
+        )
+        self.cur.execute(
+            ("CREATE TABLE IF NOT EXISTS "
+             "{}("
+             "ticker_id INTEGER NOT NULL, "
+             "trade_timestamp INTEGER NOT NULL, "
+             "open FLOAT, "
+             "high FLOAT, "
+             "low FLOAT, "
+             "close FLOAT, "
+             "volume BIGINT, "
+             "gmtoffset INT, "
+             "trade_datetime DATETIME, "
+             "PRIMARY KEY (ticker_id, trade_timestamp)) WITHOUT ROWID;").format(intra_table_name)
+        )
+        self.con.commit()
+
+    def _ticker_id(self, ticker:str) -> int:
+        """ticker id from the ticker dictionary
+
+        Args:
+            ticker (str): ticker
+
+        Returns:
+            int: ticker id, None if the ticker is not registered
+        """
+        return self._ticker_ids.get(ticker)
+
+    def _legacy_stock_price_tickers(self) -> dict[str, list[str]]:
+        """tickers still stored in per-ticker tables
+
+        Returns:
+            dict[str, list[str]]: ticker: table types
+        """
+        legacy_tickers = {}
+        for table_name in self._stock_price_table_names():
+            match = _legacy_table_pattern.match(table_name)
+            if (match):
+                legacy_tickers.setdefault(match.group(1), []).append(match.group(2))
+        return legacy_tickers
+
+    def _stock_price_table_names(self) -> set[str]:
+        """table names of stock_price.db, from the catalog
         
         """
-        rows = self.cur.execute("""SELECT name FROM sqlite_master WHERE type='table'""")
-        rows = self.cur.fetchall()
-        return [x[0] for x in rows]
\ No newline at end of file
+        return self._stock_price_catalog.names
@@ -0,0 +1,5 @@
+# -----------------------
+# init tests
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
@@ -0,0 +1,43 @@
+# -----------------------
+# shared test fixtures
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import logging
+import pytest
+
+from delta.tests.fake_api import FakeEodClient
+
+test_tickers = ['AAA', 'BBB', 'CCC']     # tickers with fundamentals in the `updater` data dir
+
+
+@pytest.fixture
+def test_logger() -> logging.Logger:
+    return logging.getLogger('delta.tests')
+
+
+@pytest.fixture
+def fake_client(monkeypatch) -> type[FakeEodClient]:
+    """`FakeEodClient` in place of the eod api client, today's api calls start at 0
+    """
+    import eod
+    from delta.request_handler import EodApiRequestHandler
+    FakeEodClient.reset()
+    monkeypatch.setattr(eod, 'EodHistoricalData', FakeEodClient)
+    monkeypatch.setattr(EodApiRequestHandler, '_call_counts', lambda self: 0)
+    yield FakeEodClient
+    FakeEodClient.reset()
+
+
+@pytest.fixture
+def updater(tmp_path, monkeypatch, fake_client):
+    """DBUpdater on an empty data dir with fundamentals of `test_tickers`, calling `fake_client`
+    """
+    from delta.updater import DBUpdater
+    monkeypatch.setenv('DATA_DIR_PATH', '{}/'.format(tmp_path))
+    monkeypatch.setenv('API_KEY', 'test')
+    updater = DBUpdater(activate_logger=False, use_response_cache=False)
+    updater.push_fund([{'General': {'Code': ticker, 'IPODate': '2000-01-01'}} for ticker in test_tickers])
+    yield updater
+    updater.close_all_conn()
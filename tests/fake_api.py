@@ -0,0 +1,78 @@
+# -----------------------
+# fake api responses and client
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import pandas as pd
+
+
+def eod_json(dates:list[str], close:float=1.5) -> list[dict]:
+    """eod response of the api for the dates
+    """
+    return [
+        dict(date=date, open=1., high=2., low=.5, close=close, adjusted_close=close, volume=10)
+        for date in dates
+    ]
+
+
+def intra_json(timestamps:list[int], close:float=1.5) -> list[dict]:
+    """1min intra response of the api for the timestamps
+    """
+    return [
+        dict(
+            timestamp=ts, gmtoffset=0, datetime=str(pd.Timestamp(ts, unit='s')),
+            open=1., high=2., low=.5, close=close, volume=10,
+        )
+        for ts in timestamps
+    ]
+
+
+class FakeEodClient:
+    """stand-in for `eod.EodHistoricalData`, answering from a generated market
+
+    every weekday has an eod bar and every minute an intra bar, unless in `holes`.
+    requests are logged in `requests` as (endpoint, symbol, from, to) and the ones
+    `fail` returns True for raise an HTTPError. state is kept on the class so
+    clients of fetcher threads (and forked processes) share it; `reset` clears it.
+    """
+    requests = []
+    fail = None         # (endpoint, symbol, from, to) -> bool
+    holes = None        # (symbol, timestamp) -> bool, minutes without bars
+    bulk_symbols = []   # codes of a bulk eod response
+
+    def __init__(self, api_key:str):
+        self.api_key = api_key
+
+    @classmethod
+    def reset(cls):
+        cls.requests = []
+        cls.fail = None
+        cls.holes = None
+        cls.bulk_symbols = []
+
+    def get_prices_eod(self, symbol:str, period:str='d', order:str='a', from_:str=None, to:str=None) -> list[dict]:
+        self._request('eod', symbol, from_, to)
+        dates = pd.bdate_range(from_, to).strftime('%Y-%m-%d').tolist()
+        return eod_json(dates)
+
+    def get_prices_intraday(self, symbol:str, interval:str='1m', from_:int=None, to:int=None) -> list[dict]:
+        self._request('intra', symbol, from_, to)
+        timestamps = range(int(from_), int(to) + 1, 60)
+        if (FakeEodClient.holes is not None):
+            timestamps = [ts for ts in timestamps if not FakeEodClient.holes(symbol, ts)]
+        return intra_json(timestamps)
+
+    def get_fundamental_equity(self, symbol:str) -> dict:
+        self._request('fundamentals', symbol, None, None)
+        return {'General': {'Code': symbol.split('.')[0]}}
+
+    def get_bulk_markets(self, exchange:str, type:str='eod', date:str=None) -> list[dict]:
+        self._request('bulk', exchange, date, date)
+        return [dict(row, code=code, exchange_short_name=exchange) for code in FakeEodClient.bulk_symbols for row in eod_json([date])]
+
+    def _request(self, endpoint:str, symbol:str, from_, to):
+        from urllib3.exceptions import HTTPError
+        FakeEodClient.requests.append((endpoint, symbol, from_, to))
+        if ((FakeEodClient.fail is not None) and FakeEodClient.fail(endpoint, symbol, from_, to)):
+            raise HTTPError('fake {} request failed'.format(endpoint))
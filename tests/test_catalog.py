@@ -0,0 +1,85 @@
+# -----------------------
+# table catalog tests
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import sqlite3
+import pytest
+
+from delta.sql_handler import DBHandler
+from delta.sql_handler.catalog import TableCatalog
+
+
+@pytest.fixture
+def db(test_logger, tmp_path) -> DBHandler:
+    db = DBHandler(test_logger, str(tmp_path))
+    yield db
+    db.close_all_conn()
+
+
+def master_reads(con:sqlite3.Connection) -> list[str]:
+    """statements of the connection reading sqlite_master, from now on
+    """
+    statements = []
+    con.set_trace_callback(lambda statement: statements.append(statement) if ('sqlite_master' in statement) else None)
+    return statements
+
+
+def test_catalog_add_discard_and_load():
+    con = sqlite3.connect(':memory:')
+    con.execute("CREATE TABLE a(x INTEGER);")
+    catalog = TableCatalog(con.cursor())
+    assert catalog.names == {'a'}
+
+    catalog.add('b', 'c')
+    catalog.discard('a', 'd')
+    assert ('b' in catalog) and ('a' not in catalog)
+    # load goes back to sqlite_master
+    catalog.load()
+    assert catalog.names == {'a'}
+
+
+def test_created_tables_are_in_the_catalogs(db):
+    db.crt_missing_tables(['AAA', 'BRK_B'])
+    reads = [master_reads(con) for con in (db.con, db.nodata_con, db.data_con)]
+
+    assert {'AAA_eod', 'AAA_intra', 'BRK_B_eod', 'BRK_B_intra'} <= db._nodata_table_names()
+    assert {'AAA_hist_mktcap', 'BRK_B_hist_mktcap'} <= db._data_table_names()
+    assert db.is_nodata_table_exists('BRK_B') == (True, [])
+    assert db.is_stock_info_table_exists('AAA_hist_mktcap')
+    assert db.is_stock_price_tables_exist('BRK_B') == (True, [])
+    assert db.is_nodata_table_exists('CCC') == (False, ['eod', 'intra'])
+
+    # nothing left to create, and all of it answered without sqlite_master
+    db.crt_missing_tables(['AAA', 'BRK_B'])
+    assert reads == [[], [], []]
+
+    db.crt_nodata_tables('CCC', ['eod'])
+    db.crt_ticker_hist_mktcap_table('CCC')
+    assert db.is_nodata_table_exists('CCC') == (False, ['intra'])
+    assert db.is_stock_info_table_exists('CCC_hist_mktcap')
+    assert reads == [[], [], []]
+    # only a reload reads it
+    db.reload_catalogs()
+    assert all(len(statements) == 1 for statements in reads)
+
+
+def test_catalogs_follow_drops_and_reload(db):
+    db.crt_missing_tables(['AAA'])
+    # a per-ticker table of the old layout, created outside the handler
+    db.cur.execute("CREATE TABLE AAA_eod(trade_date DATE UNIQUE, open FLOAT, high FLOAT, low FLOAT, "
+                   "close FLOAT, volume BIGINT, adj_close FLOAT);")
+    db.nodata_cur.execute("DROP TABLE AAA_intra;")
+    assert 'AAA_eod' not in db._stock_price_table_names()
+    assert 'AAA_intra' in db._nodata_table_names()
+
+    db.reload_catalogs()
+    assert 'AAA_eod' in db._stock_price_table_names()
+    assert db.is_nodata_table_exists('AAA') == (False, ['intra'])
+
+    # tables dropped by the migration leave the catalog with them
+    assert db.migrate_per_ticker_tables() == 1
+    assert 'AAA_eod' not in db._stock_price_table_names()
+    db.crt_missing_tables(['AAA'])
+    assert db.is_nodata_table_exists('AAA') == (True, [])
@@ -0,0 +1,56 @@
+# -----------------------
+# connection profile tests
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import pytest
+
+from delta.sql_handler import DBHandler
+from delta.sql_handler.connection import connect, connection_profiles
+from delta.rate_limiter import RateLimiter
+
+pragma_values = {'WAL': 'wal', 'NORMAL': 1, 'MEMORY': 2}     # as read back by sqlite
+
+
+def pragmas(con, names) -> dict:
+    return {name: con.execute("PRAGMA {};".format(name)).fetchone()[0] for name in names}
+
+
+@pytest.mark.parametrize('profile', list(connection_profiles))
+def test_profile_pragmas_are_applied(tmp_path, profile):
+    con = connect(str(tmp_path / 'dir' / 'test.db'), profile)
+    expected = {name: pragma_values.get(value, value) for name, value in connection_profiles[profile].items()}
+    assert pragmas(con, expected) == expected
+    con.close()
+
+
+def test_default_profile_keeps_sqlite_defaults(tmp_path):
+    con = connect(str(tmp_path / 'test.db'))
+    assert pragmas(con, ['journal_mode', 'synchronous']) == {'journal_mode': 'delete', 'synchronous': 2}
+    con.close()
+    with pytest.raises(ValueError):
+        connect(str(tmp_path / 'test.db'), 'fast')
+
+
+def test_page_size_only_applies_to_new_files(tmp_path):
+    db_path = str(tmp_path / 'test.db')
+    con = connect(db_path)
+    con.execute("CREATE TABLE t(x INTEGER);")
+    con.close()
+    con = connect(db_path, 'bulk-ingest')
+    assert pragmas(con, ['page_size', 'journal_mode']) == {'page_size': 4096, 'journal_mode': 'wal'}
+    con.close()
+
+
+def test_handlers_connect_with_their_profile(test_logger, tmp_path):
+    db = DBHandler(test_logger, str(tmp_path), profile='read-mostly')
+    for con in (db.con, db.nodata_con, db.fund_con, db.data_con):
+        assert pragmas(con, ['journal_mode', 'mmap_size']) == {'journal_mode': 'wal', 'mmap_size': 1073741824}
+    db.close_all_conn()
+
+    rate_limiter = RateLimiter(test_logger, 100, db_path=str(tmp_path / 'rate_limit.db'))
+    rate_limiter.acquire(1)
+    assert pragmas(rate_limiter._con, ['journal_mode', 'busy_timeout']) == {
+        'journal_mode': 'wal', 'busy_timeout': 60000,
+    }
@@ -0,0 +1,101 @@
+# -----------------------
+# fundamentals store tests
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import json
+import os
+import pickle
+import sqlite3
+import zlib
+import pytest
+
+from delta.sql_handler import DBHandler
+
+
+def fund(code:str, ipo_date:str|None='2000-01-03', **sections) -> dict:
+    return dict({'General': {'Code': code, 'IPODate': ipo_date}, 'Highlights': {'PERatio': 10.}}, **sections)
+
+
+@pytest.fixture
+def data_dir_path(tmp_path) -> str:
+    return str(tmp_path)
+
+
+@pytest.fixture
+def db(test_logger, data_dir_path) -> DBHandler:
+    db = DBHandler(test_logger, data_dir_path)
+    yield db
+    db.close_all_conn()
+
+
+def test_sections_are_stored_as_compressed_json(db):
+    assert db.push_fund([fund('AAA'), fund('BBB', Earnings={'History': {'2023-01-01': 1.}})])
+    rows = db.fund_cur.execute("SELECT section, data FROM fund WHERE code='BBB' ORDER BY section;").fetchall()
+    assert [section for section, _ in rows] == ['Earnings', 'General', 'Highlights']
+    assert json.loads(zlib.decompress(rows[0][1])) == {'History': {'2023-01-01': 1.}}
+
+    assert db.pull_fund(['BBB', 'CCC']) == (True, [fund('BBB', Earnings={'History': {'2023-01-01': 1.}})])
+    assert db.pull_fund(['AAA', 'BBB'], sections=['General']) == (
+        True, [{'General': fund('AAA')['General']}, {'General': fund('BBB')['General']}],
+    )
+    assert [data['General']['Code'] for data in db.pull_fund([], all=True)[1]] == ['AAA', 'BBB']
+
+
+def test_push_replaces_a_tickers_fundamentals(db):
+    assert not db.push_fund([])
+    assert db.push_fund([fund('AAA', Earnings={})])
+    # the last of the same code wins, and sections it lacks are gone
+    assert db.push_fund([fund('AAA', '2001-01-02'), fund('AAA', '2002-01-02')])
+    assert db.pull_fund(['AAA']) == (True, [fund('AAA', '2002-01-02')])
+    assert db.pull_ipo_dates_from_fud(['AAA']) == (True, {'AAA': '2002-01-02'})
+
+
+def test_missing_ipo_dates_are_null(db):
+    assert db.push_fund([fund('AAA'), fund('BBB', None), fund('CCC', '')])
+    assert db.fund_cur.execute("SELECT code, ipo_date FROM fund_index ORDER BY code;").fetchall() == [
+        ('AAA', '2000-01-03'), ('BBB', None), ('CCC', None),
+    ]
+    # and left out on read, like tickers without fundamentals
+    assert db.pull_ipo_dates_from_fud(['AAA', 'BBB', 'CCC', 'DDD']) == (True, {'AAA': '2000-01-03'})
+
+
+def test_pickle_is_migrated_once(test_logger, data_dir_path):
+    fund_dir_path = os.path.join(data_dir_path, 'fund')
+    os.makedirs(fund_dir_path)
+    pickle_path = os.path.join(fund_dir_path, 'us.pickle')
+    # every legacy push appended a frame
+    with open(pickle_path, 'wb') as pickle_file:
+        pickle.dump([fund('AAA'), fund('BBB', None)], pickle_file)
+        pickle.dump([fund('AAA', '2001-01-02')], pickle_file)
+
+    db = DBHandler(test_logger, data_dir_path)
+    assert db.pull_ipo_dates_from_fud(['AAA', 'BBB']) == (True, {'AAA': '2001-01-02'})
+    assert [data['General']['Code'] for data in db.pull_fund([], all=True)[1]] == ['AAA', 'BBB']
+    assert db.fund_cur.execute("PRAGMA user_version;").fetchone()[0] == 2
+    db.push_fund([fund('CCC')])
+    db.close_all_conn()
+
+    # the pickle is not read again
+    with open(pickle_path, 'wb') as pickle_file:
+        pickle.dump([fund('DDD')], pickle_file)
+    db = DBHandler(test_logger, data_dir_path)
+    assert [data['General']['Code'] for data in db.pull_fund([], all=True)[1]] == ['AAA', 'BBB', 'CCC']
+    db.close_all_conn()
+
+
+def test_none_ipo_dates_of_older_dbs_are_cleared(test_logger, data_dir_path):
+    fund_dir_path = os.path.join(data_dir_path, 'fund')
+    os.makedirs(fund_dir_path)
+    con = sqlite3.connect(os.path.join(fund_dir_path, 'fund.db'))
+    con.execute("CREATE TABLE fund_index(code TEXT PRIMARY KEY, ipo_date TEXT);")
+    con.executemany("INSERT INTO fund_index VALUES (?, ?);", [('AAA', '2000-01-03'), ('BBB', 'None')])
+    con.execute("PRAGMA user_version = 1;")
+    con.commit()
+    con.close()
+
+    db = DBHandler(test_logger, data_dir_path)
+    assert db.pull_ipo_dates_from_fud(['AAA', 'BBB']) == (True, {'AAA': '2000-01-03'})
+    assert db.fund_cur.execute("SELECT ipo_date FROM fund_index WHERE code='BBB';").fetchone() == (None, )
+    db.close_all_conn()
@@ -0,0 +1,79 @@
+# -----------------------
+# update journal and resume tests
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import numpy as np
+
+start_date, end_date = '2023-01-03', '2023-01-10'
+
+
+def intra_requests(fake_client, symbol:str) -> list[tuple]:
+    return [request for request in fake_client.requests if request[:2] == ('intra', symbol)]
+
+
+def test_journal_states(updater, fake_client):
+    updater.update(start_date, end_date, tickers=['AAA', 'BBB'])
+    journal = updater.pull_journal()
+    assert dict(zip(journal['ticker'], journal['state'])) == {'AAA': 'pushed', 'BBB': 'pushed'}
+    assert updater.unfinished_update_run(start_date, end_date) is None
+
+
+def test_resume_skips_pushed_windows(updater, fake_client):
+    updater.max_days = 2    # several intra windows per ticker
+    # BBB's second intra window fails, the run is left unfinished
+    fake_client.fail = lambda endpoint, symbol, from_, to: (
+        (symbol == 'BBB.us') and (len(intra_requests(fake_client, 'BBB.us')) == 2)
+    )
+    updater.update(start_date, end_date, tickers=['AAA', 'BBB'], max_attempts=1)
+    run_id = updater.unfinished_update_run(start_date, end_date)
+    assert run_id is not None
+    journal = updater.pull_journal(run_id)
+    assert dict(zip(journal['ticker'], journal['state'])) == {'AAA': 'pushed', 'BBB': 'failed'}
+
+    bbb_windows = intra_requests(fake_client, 'BBB.us')
+    assert len(bbb_windows) == 2
+    done_windows = updater.pull_windows(run_id, 'BBB')
+    assert len(done_windows['eod']) == 1
+    assert [tuple(window) for window in done_windows['intra']] == [bbb_windows[0][2:]]
+
+    # resuming requests the failed window onwards, nothing of AAA or of BBB's pushed windows
+    fake_client.fail = None
+    fake_client.requests.clear()
+    plan = updater.update(start_date, end_date, tickers=['AAA', 'BBB'], resume=True)
+    assert plan.run_id == run_id
+    assert plan.tickers == ['BBB']
+    assert {request[:2] for request in fake_client.requests} == {('intra', 'BBB.us')}
+    assert fake_client.requests[0][2] == bbb_windows[1][2]
+    assert all(request[2] > bbb_windows[0][3] for request in fake_client.requests)
+    assert updater.unfinished_update_run(start_date, end_date) is None
+
+    # both tickers end up with the whole minute grid
+    calendar = updater.session_calendar(start_date, end_date)
+    for ticker in ('AAA', 'BBB'):
+        _, timestamps = updater.pull_tkl_dts(
+            ticker, start_date, end_date, int(calendar.timestamps[0]), int(calendar.timestamps[-1]),
+        )
+        np.testing.assert_array_equal(timestamps, calendar.timestamps)
+
+
+def test_resume_after_crash_skips_pushed_tickers(updater, fake_client, monkeypatch):
+    from delta.updater import DBUpdater
+    push_tickers = DBUpdater._push_tickers
+    def crashing_push(self, ticker_plans, record_nodata=True):
+        if (any(ticker_plan['ticker'] == 'CCC' for ticker_plan in ticker_plans)):
+            raise RuntimeError('crash')
+        return push_tickers(self, ticker_plans, record_nodata)
+    monkeypatch.setattr(DBUpdater, '_push_tickers', crashing_push)
+    try:
+        updater.update(start_date, end_date, tickers=['AAA', 'CCC'])
+    except RuntimeError:
+        pass
+    assert updater.unfinished_update_run(start_date, end_date) is not None
+
+    monkeypatch.setattr(DBUpdater, '_push_tickers', push_tickers)
+    fake_client.requests.clear()
+    updater.update(start_date, end_date, tickers=['AAA', 'CCC'], resume=True)
+    assert {request[1] for request in fake_client.requests} == {'CCC.us'}
+    assert updater.unfinished_update_run(start_date, end_date) is None
@@ -0,0 +1,76 @@
+# -----------------------
+# lazy connection, api client and log file tests
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import os
+import subprocess
+import sys
+
+import delta
+from delta.sql_handler import DBHandler
+from delta.request_handler import EodApiRequestHandler
+
+db_attrs = {
+    'stock price': ['con', 'cur'],
+    'nodata': ['nodata_con', 'nodata_cur'],
+    'fund': ['fund_con', 'fund_cur'],
+}
+
+
+def opened(db:DBHandler) -> set[str]:
+    """dbs of the handler with an open connection
+    """
+    return {name for name, attrs in db_attrs.items() if all(attr in vars(db) for attr in attrs)}
+
+
+def test_db_connections_open_on_first_access(test_logger, tmp_path):
+    data_dir_path = tmp_path / 'data'
+    db = DBHandler(test_logger, str(data_dir_path))
+    assert opened(db) == set()
+    assert not data_dir_path.exists()
+
+    # each db is opened by the first read of its own connection
+    assert len(db.pull_eod('AAA')) == 0
+    assert opened(db) == {'stock price'}
+    assert os.listdir(data_dir_path) == ['stock_price.db']
+    db.crt_missing_nodata_tables(['AAA'])
+    assert opened(db) == {'stock price', 'nodata'}
+    assert db.pull_fund(['AAA']) == (True, [])
+    assert opened(db) == {'stock price', 'nodata', 'fund'}
+    db.close_all_conn()
+
+
+def test_api_client_is_built_on_first_request(test_logger, fake_client):
+    handler = EodApiRequestHandler(test_logger, 'test')
+    assert not hasattr(handler._api_local, 'api_client')
+    assert handler._call_used is None
+    assert fake_client.requests == []
+
+    assert handler.request_eod('AAA', 'us', '2023-01-03', '2023-01-10')[0]
+    assert isinstance(handler._api_local.api_client, fake_client)
+    assert handler._call_used == 1
+    assert len(fake_client.requests) == 1
+
+
+def test_log_file_is_opened_by_the_updater_only(tmp_path):
+    log_dir_path, data_dir_path = tmp_path / 'log', tmp_path / 'data'
+    log_dir_path.mkdir()
+    script = '\n'.join([
+        "from delta import logger",
+        "from delta.updater import DBUpdater",
+        "DBUpdater(activate_logger=False, use_response_cache=False)",
+        "assert logger.logger_file_path is None",
+        "DBUpdater(activate_logger=True, use_response_cache=False)",
+        "print(logger.logger_file_path)",
+    ])
+    env = dict(
+        {key: value for key, value in os.environ.items() if (key != 'API_KEY')},
+        PYTHONPATH=os.path.dirname(os.path.dirname(delta.__file__)),
+        LOG_PATH=str(log_dir_path), DATA_DIR_PATH='{}/'.format(data_dir_path),
+    )
+    result = subprocess.run([sys.executable, '-c', script], env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    # no api key needed, one log file once activated
+    assert [os.path.join(log_dir_path, name) for name in os.listdir(log_dir_path)] == [result.stdout.strip()]
@@ -0,0 +1,124 @@
+# -----------------------
+# MongoStockPriceDB tests, against mongomock
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from delta.mongo_handler import MongoStockPriceDB
+from delta.sql_handler import DBHandler
+from delta.tests.fake_api import eod_json, intra_json
+
+mongomock = pytest.importorskip('mongomock')
+
+dates = ['2023-01-03', '2023-01-04', '2023-01-05']
+timestamps = [1672756200, 1672756260, 1672756320]
+
+
+@pytest.fixture
+def mongo_db(test_logger) -> MongoStockPriceDB:
+    return MongoStockPriceDB(test_logger, client=mongomock.MongoClient())
+
+
+@pytest.fixture
+def sql_db(test_logger, tmp_path) -> DBHandler:
+    db = DBHandler(test_logger, str(tmp_path))
+    yield db
+    db.close_all_conn()
+
+
+def test_crt_missing_stock_price_tables(mongo_db):
+    assert mongo_db.is_stock_price_tables_exist('AAA') == (False, ['eod', 'intra'])
+    assert mongo_db.crt_missing_stock_price_tables(['AAA', 'BBB', 'AAA']) == 2
+    assert mongo_db.crt_missing_stock_price_tables(['AAA', 'CCC']) == 1
+    assert mongo_db.is_stock_price_tables_exist('AAA') == (True, [])
+
+    # registered tickers are read back by a new handler
+    reopened = MongoStockPriceDB(mongo_db.logger, client=mongo_db.client)
+    assert reopened.is_stock_price_tables_exist('CCC') == (True, [])
+
+
+def test_push_unregistered_ticker(mongo_db):
+    assert not mongo_db.push_eod('AAA', pd.DataFrame(eod_json(dates)))
+
+
+def test_push_eod_skips_stored_dates(mongo_db):
+    mongo_db.crt_missing_stock_price_tables(['AAA'])
+    assert mongo_db.push_eod('AAA', pd.DataFrame(eod_json(dates[:2], close=1.5)))
+    assert mongo_db.push_eod('AAA', pd.DataFrame(eod_json(dates, close=9.)))
+
+    df = mongo_db.pull_eod('AAA')
+    assert df['trade_date'].tolist() == dates
+    assert df['close'].tolist() == [1.5, 1.5, 9.]
+
+
+def test_push_eod_overwrite(mongo_db):
+    mongo_db.crt_missing_stock_price_tables(['AAA'])
+    mongo_db.push_eod('AAA', pd.DataFrame(eod_json(dates, close=1.5)))
+    assert mongo_db.push_eod('AAA', pd.DataFrame(eod_json(dates[1:], close=9.)), overwrite=True)
+
+    df = mongo_db.pull_eod('AAA')
+    assert df['close'].tolist() == [1.5, 9., 9.]
+    assert mongo_db.mongo_db['eod'].count_documents({'ticker': 'AAA'}) == len(dates)
+
+
+def test_push_intra_skip_and_overwrite(mongo_db):
+    mongo_db.crt_missing_stock_price_tables(['AAA'])
+    assert mongo_db.push_intra('AAA', pd.DataFrame(intra_json(timestamps[:2], close=1.5)))
+    assert mongo_db.push_intra('AAA', pd.DataFrame(intra_json(timestamps, close=9.)))
+    assert mongo_db.pull_intra('AAA')['close'].tolist() == [1.5, 1.5, 9.]
+
+    assert mongo_db.push_intra('AAA', pd.DataFrame(intra_json(timestamps[:1], close=5.)), overwrite=True)
+    assert mongo_db.pull_intra('AAA')['close'].tolist() == [5., 1.5, 9.]
+
+
+def test_insert_many_unordered_tolerates_duplicates(mongo_db):
+    collection = mongo_db.mongo_db['tickers']
+    assert mongo_db._insert_many_unordered(collection, [{'_id': 'AAA'}, {'_id': 'BBB'}]) == 2
+    # a concurrent writer got 'BBB' in first, the rest is still inserted
+    assert mongo_db._insert_many_unordered(collection, [{'_id': 'BBB'}, {'_id': 'CCC'}]) == 1
+    assert sorted(doc['_id'] for doc in collection.find()) == ['AAA', 'BBB', 'CCC']
+    assert mongo_db._insert_many_unordered(collection, []) == 0
+
+
+def test_insert_many_unordered_raises_other_errors(mongo_db):
+    collection = mongo_db.mongo_db['tickers']
+    with pytest.raises(TypeError):
+        mongo_db._insert_many_unordered(collection, [object()])
+
+
+def test_pull_tkl_dts(mongo_db):
+    mongo_db.crt_missing_stock_price_tables(['AAA'])
+    mongo_db.push_eod('AAA', pd.DataFrame(eod_json(dates)))
+    mongo_db.push_intra('AAA', pd.DataFrame(intra_json(timestamps)))
+
+    assert mongo_db.pull_tkl_dts('AAA', dates[1], dates[2], timestamps[0], timestamps[1]) == (
+        dates[1:], timestamps[:2],
+    )
+    assert mongo_db.pull_tkl_dts('BBB', dates[0], dates[2], timestamps[0], timestamps[2]) == ([], [])
+
+
+@pytest.mark.parametrize('table_type', ['eod', 'intra'])
+@pytest.mark.parametrize('tickers', ['AAA', ['AAA', 'BB']])
+def test_pull_matches_stock_price_db(mongo_db, sql_db, table_type, tickers):
+    for db in (mongo_db, sql_db):
+        db.crt_missing_stock_price_tables(['AAA', 'BB'])
+        for ticker in ('AAA', 'BB'):
+            if (table_type == 'eod'):
+                db.push_eod(ticker, pd.DataFrame(eod_json(dates)))
+            else:
+                db.push_intra(ticker, pd.DataFrame(intra_json(timestamps)))
+
+    pull = 'pull_{}'.format(table_type)
+    mongo_arr = getattr(mongo_db, pull)(tickers, as_frame=False)
+    sql_arr = getattr(sql_db, pull)(tickers, as_frame=False)
+    assert mongo_arr.dtype == sql_arr.dtype
+    np.testing.assert_array_equal(mongo_arr, sql_arr)
+
+    columns = ['close'] if (table_type == 'eod') else ['volume', 'trade_datetime']
+    mongo_df = getattr(mongo_db, pull)(tickers, columns=columns)
+    sql_df = getattr(sql_db, pull)(tickers, columns=columns)
+    pd.testing.assert_frame_equal(mongo_df, sql_df)
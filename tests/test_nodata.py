@@ -0,0 +1,111 @@
+# -----------------------
+# nodata ranges tests
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import sqlite3
+import pytest
+
+from delta.sql_handler.nodata import NoDataDB
+
+t0 = 1672756200     # 2023-01-03 14:30 utc
+
+
+def minutes(start:int, end:int) -> list[int]:
+    """timestamps of the minutes t0 + start .. t0 + end, both included
+    """
+    return [t0 + 60 * m for m in range(start, end + 1)]
+
+
+@pytest.fixture
+def db_path(tmp_path) -> str:
+    return str(tmp_path / 'nodata.db')
+
+
+@pytest.fixture
+def db(test_logger, db_path) -> NoDataDB:
+    db = NoDataDB(test_logger, db_path)
+    db.crt_missing_nodata_tables(['AAA'])
+    yield db
+    db.nodata_con.close()
+
+
+def test_adjacent_and_overlapping_ranges_merge(db):
+    db.push_nodata_ranges('AAA', ['2023-01-03'], [(t0, t0 + 60 * 4)])
+    # one minute after the stored range: adjacent, extends it
+    db.push_nodata_ranges('AAA', [], [(t0 + 60 * 5, t0 + 60 * 9)])
+    assert db.pull_nodata_ranges('AAA') == (['2023-01-03'], [(t0, t0 + 60 * 9)])
+
+    # a gap of one missing minute stays apart
+    db.push_nodata_ranges('AAA', [], [(t0 + 60 * 11, t0 + 60 * 12)])
+    assert db.pull_nodata_ranges('AAA')[1] == [(t0, t0 + 60 * 9), (t0 + 60 * 11, t0 + 60 * 12)]
+
+    # an overlapping range bridges both, the date is not duplicated
+    db.push_nodata_ranges('AAA', ['2023-01-03'], [(t0 + 60 * 8, t0 + 60 * 10), (t0 + 60 * 20, t0 + 60 * 20)])
+    assert db.pull_nodata_ranges('AAA') == (['2023-01-03'], [(t0, t0 + 60 * 12), (t0 + 60 * 20, t0 + 60 * 20)])
+
+    # a range inside a stored one changes nothing
+    db.push_nodata_ranges('AAA', [], [(t0 + 60 * 2, t0 + 60 * 3)])
+    assert db.pull_nodata_ranges('AAA')[1] == [(t0, t0 + 60 * 12), (t0 + 60 * 20, t0 + 60 * 20)]
+
+
+def test_timestamps_are_pushed_as_ranges(db):
+    db.push_nodata_dts('AAA', [], minutes(0, 2) + minutes(5, 5) + minutes(1, 3))
+    assert db.pull_nodata_ranges('AAA')[1] == [(t0, t0 + 60 * 3), (t0 + 60 * 5, t0 + 60 * 5)]
+    assert db.pull_nodata_dts('AAA')[1] == minutes(0, 3) + minutes(5, 5)
+    with pytest.raises(ValueError):
+        db.push_nodata_dts('AAA', ['20230103'], [])
+
+
+def test_refetched_range_is_subtracted(db):
+    db.push_nodata_dts('AAA', ['2023-01-03', '2023-01-04'], minutes(0, 9) + minutes(20, 29))
+    # refetched minutes in the middle split a range, at the edges shorten it
+    assert db.rm_dts('AAA', ['2023-01-04'], minutes(3, 4) + minutes(9, 22))
+    assert db.pull_nodata_ranges('AAA') == (
+        ['2023-01-03'],
+        [(t0, t0 + 60 * 2), (t0 + 60 * 5, t0 + 60 * 8), (t0 + 60 * 23, t0 + 60 * 29)],
+    )
+    # removing minutes that are not stored is a no-op
+    assert db.rm_dts('AAA', [], minutes(40, 45))
+    # removing a whole range drops its row
+    assert db.rm_dts('AAA', [], minutes(23, 29))
+    assert db.pull_nodata_ranges('AAA')[1] == [(t0, t0 + 60 * 2), (t0 + 60 * 5, t0 + 60 * 8)]
+    assert db.rm_dts('AAA', [], [])
+
+
+def test_is_nodata_ts(db):
+    db.push_nodata_ranges('AAA', [], [(t0, t0 + 60 * 4), (t0 + 60 * 10, t0 + 60 * 10)])
+    assert db.is_nodata_ts('AAA', t0)
+    assert db.is_nodata_ts('AAA', t0 + 60 * 4)
+    assert db.is_nodata_ts('AAA', t0 + 60 * 10)
+    assert not db.is_nodata_ts('AAA', t0 - 60)
+    assert not db.is_nodata_ts('AAA', t0 + 60 * 5)
+    assert not db.is_nodata_ts('AAA', t0 + 60 * 11)
+
+
+def test_per_minute_tables_migrate_to_ranges(test_logger, db_path):
+    # nodata.db as written before ranges: one row per no data minute
+    con = sqlite3.connect(db_path)
+    for ticker, timestamps in (('AAA', minutes(0, 4) + minutes(10, 11)), ('BRK_B', [])):
+        con.execute("CREATE TABLE {}_eod(trade_date DATE UNIQUE);".format(ticker))
+        con.execute("CREATE TABLE {}_intra(trade_timestamp TIMESTAMP UNIQUE);".format(ticker))
+        con.executemany("INSERT INTO {}_intra VALUES (?);".format(ticker), [(ts, ) for ts in timestamps])
+    con.execute("INSERT INTO AAA_eod VALUES ('2023-01-03');")
+    con.commit()
+    con.close()
+
+    db = NoDataDB(test_logger, db_path)
+    assert db.pull_nodata_ranges('AAA') == (['2023-01-03'], [(t0, t0 + 60 * 4), (t0 + 60 * 10, t0 + 60 * 11)])
+    assert db.pull_nodata_ranges('BRK_B') == ([], [])
+    assert [col[1] for col in db.nodata_cur.execute("PRAGMA table_info(AAA_intra);").fetchall()] == ['start_ts', 'end_ts']
+    assert db.nodata_cur.execute("PRAGMA user_version;").fetchone()[0] == 1
+    # and the migrated tables take new ranges
+    db.push_nodata_ranges('AAA', [], [(t0 + 60 * 5, t0 + 60 * 9)])
+    assert db.pull_nodata_ranges('AAA')[1] == [(t0, t0 + 60 * 11)]
+    db.nodata_con.close()
+
+    # reopening does not migrate again
+    db = NoDataDB(test_logger, db_path)
+    assert db.pull_nodata_ranges('AAA')[1] == [(t0, t0 + 60 * 11)]
+    db.nodata_con.close()
@@ -0,0 +1,73 @@
+# -----------------------
+# parquet intra backend tests
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from delta.sql_handler import DBHandler
+
+pytest.importorskip('pyarrow')
+
+# two utc months, so a push touches two files
+timestamps = [1675209540, 1675209600, 1675209660]    # 2023-01-31 23:59 .. 2023-02-01 00:01
+
+
+def intra_frame(timestamps:list[int], close:float=1.5) -> pd.DataFrame:
+    return pd.DataFrame({
+        'trade_timestamp': timestamps, 'open': 1., 'high': 2., 'low': .5, 'close': close, 'volume': 10.,
+    })
+
+
+@pytest.fixture
+def db(test_logger, tmp_path) -> DBHandler:
+    db = DBHandler(test_logger, str(tmp_path), intra_backend='parquet')
+    db.crt_missing_tables(['AAA', 'BBB'])
+    yield db
+    db.close_all_conn()
+
+
+def test_push_bars_batch_round_trip(db):
+    assert db.push_bars_batch({}, {'AAA': intra_frame(timestamps), 'BBB': intra_frame(timestamps[:1])})
+    assert db.pull_intra('AAA')['trade_timestamp'].tolist() == timestamps
+    assert db.pull_tkl_dts('BBB', '2023-01-31', '2023-02-01', timestamps[0], timestamps[-1]) == (
+        [], timestamps[:1],
+    )
+
+
+def test_push_bars_batch_writes_parquet_after_commit(db, monkeypatch):
+    db.materialize_intervals(['5m'])
+    for ticker in ('AAA', 'BBB'):
+        db.push_nodata_dts(ticker, [], timestamps)
+
+    push = db._intra_store.push
+    def failing_push(ticker, df, overwrite=False):
+        if (ticker == 'BBB'):
+            raise OSError('disk full')
+        return push(ticker, df, overwrite)
+    monkeypatch.setattr(db._intra_store, 'push', failing_push)
+    frames = {'AAA': intra_frame(timestamps), 'BBB': intra_frame(timestamps)}
+    assert not db.push_bars_batch({}, frames)
+
+    # the nodata of both is cleared with the sqlite commit, only AAA's bars are written
+    assert db.pull_nodata_ranges('AAA')[1] == []
+    assert db.pull_nodata_ranges('BBB')[1] == []
+    assert db.pull_intra('AAA')['trade_timestamp'].tolist() == timestamps
+    assert len(db.pull_intra('BBB')) == 0
+    assert len(db.pull_resampled('AAA', '5m')) == 2
+    assert len(db.pull_resampled('BBB', '5m')) == 0
+
+    # pushing again completes the write, without duplicating AAA
+    monkeypatch.setattr(db._intra_store, 'push', push)
+    assert db.push_bars_batch({}, frames)
+    for ticker in ('AAA', 'BBB'):
+        np.testing.assert_array_equal(db.pull_intra(ticker)['trade_timestamp'], timestamps)
+        assert len(db.pull_resampled(ticker, '5m')) == 2
+
+
+def test_push_bars_batch_unknown_ticker_writes_nothing(db):
+    assert not db.push_bars_batch({}, {'AAA': intra_frame(timestamps), 'ZZZ': intra_frame(timestamps)})
+    assert len(db.pull_intra('AAA')) == 0
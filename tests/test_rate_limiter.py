@@ -0,0 +1,142 @@
+# -----------------------
+# RateLimiter tests
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import multiprocessing
+import threading
+import pytest
+
+import delta.rate_limiter
+from delta.rate_limiter import RateLimiter, QuotaExceededError
+from delta.request_handler import EodApiRequestHandler
+
+day_start = 1697587200.0    # 2023-10-18 00:00 utc
+
+
+class FakeClock:
+    """stands in for the `time` module of the rate limiter, `sleep` moves the clock on
+    """
+
+    def __init__(self, now:float):
+        self.now = now
+        self.slept = []
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, secs:float):
+        self.slept.append(secs)
+        self.now += secs
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock(day_start + 12 * 3600)
+    monkeypatch.setattr(delta.rate_limiter, 'time', clock)
+    return clock
+
+
+def test_in_memory_limiter(test_logger, clock):
+    rate_limiter = RateLimiter(test_logger, 100)
+    assert rate_limiter.acquire(1) == 1
+    assert rate_limiter.acquire(5) == 6
+    assert rate_limiter.remaining() == 94
+    with pytest.raises(ValueError):
+        rate_limiter.acquire(rate_limiter.capacity + 1)
+
+
+def test_bucket_refills_over_time(test_logger, clock):
+    rate_limiter = RateLimiter(test_logger, 10_000, calls_per_minute=60)   # 1 token a second
+    assert rate_limiter.acquire(60) == 60
+    assert clock.slept == []
+    # the bucket is empty, 5 tokens take 5 seconds
+    assert rate_limiter.acquire(5) == 65
+    assert clock.slept == [pytest.approx(5)]
+    # after a while it is full again, but never holds more than its size
+    clock.now += 3600
+    assert rate_limiter.acquire(60) == 125
+    assert rate_limiter.acquire(1) == 126
+    assert clock.slept == [pytest.approx(5), pytest.approx(1)]
+
+
+def test_quota(test_logger, clock):
+    rate_limiter = RateLimiter(test_logger, 10)
+    assert rate_limiter.acquire(5) == 5
+    assert rate_limiter.acquire(5) == 10
+    with pytest.raises(QuotaExceededError):
+        rate_limiter.acquire(1)
+    assert rate_limiter.remaining() == 0
+    # calls reported by the api only ever raise the count
+    rate_limiter.sync_used(3)
+    assert rate_limiter.remaining() == 0
+    # a new (utc) day resets it
+    clock.now = day_start + 86400
+    assert rate_limiter.remaining() == 10
+    rate_limiter.sync_used(8)
+    assert rate_limiter.remaining() == 2
+
+
+def test_wait_for_quota(test_logger, clock):
+    rate_limiter = RateLimiter(test_logger, 10)
+    rate_limiter.acquire(10)
+    # sleeps to midnight utc, then the request counts against the new day
+    assert rate_limiter.acquire(5, wait_for_quota=True) == 5
+    assert clock.slept == [pytest.approx(12 * 3600)]
+    assert rate_limiter.remaining() == 5
+
+
+def test_requests_are_weighted_by_cost(test_logger, fake_client, clock):
+    handler = EodApiRequestHandler(test_logger, 'test', call_limit=100)
+    assert handler.request_eod('AAA', 'us', '2023-01-03', '2023-01-10')[0]
+    assert handler.calls_remaining() == 99
+    assert handler.request_intra('AAA', 'us', 1672756200, 1672759800)[0]
+    assert handler.calls_remaining() == 94
+    assert handler.request_fundamentals('AAA', 'us')[0]
+    assert handler.calls_remaining() == 84
+    assert handler.call_used == 16
+    # a request past the quota is not sent
+    handler.call_limit = handler.rate_limiter.call_limit = 20
+    with pytest.raises(QuotaExceededError):
+        handler.request_fundamentals('AAA', 'us')
+    assert len(fake_client.requests) == 3
+
+
+def test_threads_share_the_bucket(test_logger, tmp_path, clock):
+    rate_limiter = RateLimiter(test_logger, 10_000, db_path=str(tmp_path / 'rate_limit.db'))
+    def take():
+        for _ in range(50):
+            rate_limiter.acquire(1)
+    threads = [threading.Thread(target=take) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert rate_limiter.remaining() == 10_000 - 8 * 50
+
+
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != 'fork',
+    reason='the fake clock only reaches forked processes',
+)
+def test_processes_share_the_bucket(test_logger, tmp_path, clock):
+    db_path = str(tmp_path / 'rate_limit.db')
+    rate_limiter = RateLimiter(test_logger, 10_000, calls_per_minute=120, db_path=db_path)
+    rate_limiter.acquire(10)
+    def take():
+        limiter = RateLimiter(test_logger, 10_000, calls_per_minute=120, db_path=db_path)
+        for _ in range(20):
+            limiter.acquire(1)
+    processes = [multiprocessing.get_context('fork').Process(target=take) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+    assert rate_limiter.remaining() == 10_000 - 10 - 4 * 20
+    # and their tokens: the clock stood still, 30 of 120 are left
+    assert rate_limiter.acquire(30) == 120
+    assert clock.slept == []
+    rate_limiter.acquire(1)
+    assert clock.slept == [pytest.approx(0.5)]
@@ -0,0 +1,105 @@
+# -----------------------
+# resampled bars tests
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from delta.sql_handler import DBHandler
+from delta.sql_handler.resample import bar_columns
+
+pandas_rules = {'5m': '5min', '15m': '15min', '1h': '1h', '1d': '1D'}
+
+
+def session_minutes(dates:list[str]) -> np.ndarray:
+    """unix timestamps of the regular session minutes of the dates, new york time
+    """
+    return np.concatenate([
+        pd.date_range('{} 09:30'.format(date), '{} 15:59'.format(date), freq='min', tz='America/New_York')
+        .tz_convert('UTC').as_unit('s').asi8
+        for date in dates
+    ])
+
+
+def api_bars(timestamps:np.ndarray, seed:int=0) -> pd.DataFrame:
+    """1min bars as the api returns them, random walk prices
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.standard_normal(len(timestamps)).cumsum()
+    return pd.DataFrame({
+        'timestamp': timestamps, 'gmtoffset': 0,
+        'datetime': pd.to_datetime(timestamps, unit='s').astype(str),
+        'open': close + rng.uniform(-.5, .5, len(timestamps)),
+        'high': close + 1., 'low': close - 1., 'close': close,
+        'volume': rng.integers(1, 1000, len(timestamps)).astype(float),
+    })
+
+
+def pandas_resample(bars:pd.DataFrame, interval:str) -> pd.DataFrame:
+    """`pandas.resample` of 1min bars on new york time, bars labelled by their start
+    """
+    index = pd.to_datetime(bars['trade_timestamp'], unit='s', utc=True).dt.tz_convert('America/New_York')
+    resampled = bars.set_index(index)[bar_columns[1:]].resample(pandas_rules[interval]).agg(
+        {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'},
+    ).dropna(subset=['open'])
+    resampled.insert(0, 'trade_timestamp', (resampled.index - pd.Timestamp(0, tz='UTC')) // pd.Timedelta('1s'))
+    return resampled.reset_index(drop=True).astype({'trade_timestamp': 'int64'})
+
+
+# a friday and the monday after the switch to daylight saving time
+timestamps = session_minutes(['2023-03-10', '2023-03-13'])
+
+
+@pytest.fixture
+def db(test_logger, tmp_path) -> DBHandler:
+    db = DBHandler(test_logger, str(tmp_path))
+    db.crt_missing_tables(['AAA'])
+    yield db
+    db.close_all_conn()
+
+
+@pytest.mark.parametrize('is_materialized', [False, True])
+@pytest.mark.parametrize('interval', ['5m', '1h', '1d'])
+def test_resampled_bars_match_pandas(db, interval, is_materialized):
+    assert db.push_intra('AAA', api_bars(timestamps))
+    if (is_materialized):
+        db.materialize_intervals([interval])
+    expected = pandas_resample(db.pull_intra('AAA', columns=bar_columns), interval)
+    pd.testing.assert_frame_equal(db.pull_resampled('AAA', interval), expected)
+    assert len(db.pull_resampled('AAA', '1d')) == 2
+
+
+def test_partial_bounds_give_whole_bars_on_both_paths(db):
+    assert db.push_intra('AAA', api_bars(timestamps))
+    # 09:32 to 10:07 of the first day, inside the 09:30 and 10:00 bars
+    start_ts, end_ts = int(timestamps[2]), int(timestamps[37])
+    on_the_fly = db.pull_resampled('AAA', '15m', start_ts, end_ts)
+    db.materialize_intervals(['15m'])
+    materialized = db.pull_resampled('AAA', '15m', start_ts, end_ts)
+
+    expected = pandas_resample(db.pull_intra('AAA', columns=bar_columns), '15m').iloc[:3]
+    pd.testing.assert_frame_equal(on_the_fly, expected)
+    pd.testing.assert_frame_equal(materialized, expected)
+    # the last bar is the whole 10:00 - 10:14 bar
+    assert on_the_fly['volume'].iloc[-1] == expected['volume'].iloc[-1]
+
+
+def test_materialized_bars_follow_pushes(db):
+    db.materialize_intervals(['5m', '1d'])
+    # the first push ends inside a 5m bar, the next ones complete it
+    assert db.push_intra('AAA', api_bars(timestamps[:52]))
+    assert db.push_intra('AAA', api_bars(timestamps, seed=0).iloc[52:])
+    for interval in ('5m', '1d'):
+        expected = pandas_resample(db.pull_intra('AAA', columns=bar_columns), interval)
+        pd.testing.assert_frame_equal(db.pull_resampled('AAA', interval), expected)
+
+    # overwritten minutes rebuild their bars
+    repriced = api_bars(timestamps[50:55], seed=1)
+    assert db.push_intra('AAA', repriced, overwrite=True)
+    for interval in ('5m', '1d'):
+        expected = pandas_resample(db.pull_intra('AAA', columns=bar_columns), interval)
+        pd.testing.assert_frame_equal(db.pull_resampled('AAA', interval), expected)
+    assert db.pull_resampled('AAA', '5m')['close'].iloc[10] == pytest.approx(repriced['close'].iloc[4])
@@ -0,0 +1,147 @@
+# -----------------------
+# ResponseCache tests
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import json
+import time
+import zlib
+import pytest
+
+from delta.request_handler import EodApiRequestHandler
+from delta.rate_limiter import RateLimiter
+from delta.response_cache import ResponseCache
+
+
+@pytest.fixture
+def cache_path(tmp_path) -> str:
+    return str(tmp_path / 'response_cache.db')
+
+
+def test_round_trip(test_logger, cache_path):
+    cache = ResponseCache(test_logger, cache_path)
+    assert cache.get('eod', 'AAA.US', {'from': '2023-01-03', 'to': '2023-01-10'}) is None
+    cache.put('eod', 'AAA.US', {'from': '2023-01-03', 'to': '2023-01-10'}, [{'date': '2023-01-03'}])
+    # params are keyed in any order, and the file is shared
+    reopened = ResponseCache(test_logger, cache_path)
+    assert reopened.get('eod', 'AAA.US', {'to': '2023-01-10', 'from': '2023-01-03'}) == [{'date': '2023-01-03'}]
+    assert reopened.get('eod', 'AAA.US', {'from': '2023-01-04', 'to': '2023-01-10'}) is None
+    assert reopened.get('intra', 'AAA.US', {'from': '2023-01-03', 'to': '2023-01-10'}) is None
+
+
+def test_state_files_share_a_connection_profile(test_logger, tmp_path, cache_path):
+    cache = ResponseCache(test_logger, cache_path)
+    rate_limiter = RateLimiter(test_logger, 100, db_path=str(tmp_path / 'rate_limit.db'))
+    for execute in (cache._execute, rate_limiter._execute):
+        assert execute("PRAGMA journal_mode;").fetchone()[0] == 'wal'
+        assert execute("PRAGMA busy_timeout;").fetchone()[0] == 60000
+
+
+def test_ttl_and_offline(test_logger, cache_path, monkeypatch):
+    cache = ResponseCache(test_logger, cache_path, ttls={'fundamentals': 60})
+    cache.put('fundamentals', 'AAA.US', {}, {'General': {}})
+    cache.put('eod', 'AAA.US', {}, [])
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 120)
+    assert cache.get('fundamentals', 'AAA.US', {}) is None
+    assert cache.get('eod', 'AAA.US', {}) == []      # default ttl of 7 days
+    # offline, stale responses are replayed
+    assert ResponseCache(test_logger, cache_path, offline=True).get('fundamentals', 'AAA.US', {}) == {'General': {}}
+
+
+def test_evicts_least_recently_used(test_logger, cache_path):
+    cache = ResponseCache(test_logger, cache_path)
+    for symbol in ('AAA.US', 'BBB.US', 'CCC.US'):
+        cache.put('eod', symbol, {}, [symbol])
+    size = cache._execute("SELECT MAX(size) FROM responses;").fetchone()[0]
+    cache.get('eod', 'AAA.US', {})      # BBB is now the least recently used
+    cache.max_bytes = 3 * size     # room for 3 of the same size
+    cache.put('eod', 'DDD.US', {}, ['DDD.US'])
+    stored = {symbol for symbol, in cache._execute("SELECT symbol FROM responses;")}
+    assert stored == {'AAA.US', 'CCC.US', 'DDD.US'}
+
+
+def stored_bytes(cache:ResponseCache) -> tuple[int, int]:
+    """tracked and summed payload bytes of the cache
+    """
+    return (
+        cache._execute("SELECT value FROM cache_stats WHERE name='total_bytes';").fetchone()[0],
+        cache._execute("SELECT COALESCE(SUM(size), 0) FROM responses;").fetchone()[0],
+    )
+
+
+def test_total_size_is_tracked_per_put(test_logger, cache_path):
+    cache = ResponseCache(test_logger, cache_path)
+    cache.put('eod', 'AAA.US', {}, ['AAA.US'])
+    statements = []
+    cache._con.set_trace_callback(statements.append)
+    cache.put('eod', 'BBB.US', {}, ['BBB.US'] * 100)
+    cache.put('eod', 'AAA.US', {}, ['AAA.US'] * 10)     # replaced, counted once
+    assert not [statement for statement in statements if ('SUM(' in statement)]
+    tracked, summed = stored_bytes(cache)
+    assert tracked == summed
+
+    # many evictions of one put in a single transaction, the total follows them
+    response = ['CCC.US'] * 1000
+    cache.max_bytes = len(zlib.compress(json.dumps(response).encode()))    # room for CCC only
+    statements.clear()
+    cache.put('eod', 'CCC.US', {}, response)
+    assert {symbol for symbol, in cache._execute("SELECT symbol FROM responses;")} == {'CCC.US'}
+    assert len([statement for statement in statements if statement.startswith('DELETE')]) == 2
+    assert [statement for statement in statements if statement in ('BEGIN IMMEDIATE;', 'COMMIT;')] == ['BEGIN IMMEDIATE;', 'COMMIT;']
+    assert stored_bytes(cache) == (cache.max_bytes, cache.max_bytes)
+
+
+def test_total_size_of_an_older_cache_file(test_logger, cache_path):
+    cache = ResponseCache(test_logger, cache_path)
+    for symbol in ('AAA.US', 'BBB.US'):
+        cache.put('eod', symbol, {}, [symbol])
+    # as written before the total was kept
+    cache._execute("DROP TABLE cache_stats;")
+    reopened = ResponseCache(test_logger, cache_path)
+    tracked, summed = stored_bytes(reopened)
+    assert tracked == summed > 0
+
+
+def test_windows_reaching_today_expire_early(test_logger, cache_path, monkeypatch):
+    now = time.time()
+    today = time.strftime('%Y-%m-%d', time.gmtime(now))
+    cache = ResponseCache(test_logger, cache_path)
+    eod_params = {'from': '2023-01-03', 'to': today}
+    intra_params = {'from': int(now) - 3600, 'to': int(now)}
+    past_params = {'from': '2023-01-03', 'to': '2023-01-10'}
+    bulk_params = {'type': 'eod', 'date': today}
+    for endpoint, symbol, params in (
+        ('eod', 'AAA.US', eod_params), ('intra', 'AAA.US', intra_params),
+        ('eod', 'AAA.US', past_params), ('eod', 'US', bulk_params),
+    ):
+        cache.put(endpoint, symbol, params, [symbol])
+
+    monkeypatch.setattr(time, 'time', lambda: now + 60)
+    assert cache.get('eod', 'AAA.US', eod_params) == ['AAA.US']
+    assert cache.get('intra', 'AAA.US', intra_params) == ['AAA.US']
+    # past the open window ttl only the closed window is fresh
+    monkeypatch.setattr(time, 'time', lambda: now + 16 * 60)
+    assert cache.get('eod', 'AAA.US', eod_params) is None
+    assert cache.get('intra', 'AAA.US', intra_params) is None
+    assert cache.get('eod', 'US', bulk_params) is None
+    assert cache.get('eod', 'AAA.US', past_params) == ['AAA.US']
+    assert ResponseCache(test_logger, cache_path, offline=True).get('eod', 'AAA.US', eod_params) == ['AAA.US']
+
+
+def test_handler_serves_cached_responses(test_logger, cache_path, fake_client):
+    handler = EodApiRequestHandler(test_logger, 'test', response_cache_path=cache_path)
+    for _ in range(2):
+        is_success, eod_json = handler.request_eod('AAA', 'US', '2023-01-03', '2023-01-06')
+        assert is_success and (len(eod_json) == 4)
+    assert len(fake_client.requests) == 1
+    assert handler.call_used == handler.eod_calls_per_reqeust
+
+    # offline replays the cache and never calls the api
+    fake_client.requests.clear()
+    offline = EodApiRequestHandler(test_logger, 'test', response_cache_path=cache_path, offline=True)
+    assert offline.request_eod('AAA', 'US', '2023-01-03', '2023-01-06') == (True, eod_json)
+    assert offline.request_eod('BBB', 'US', '2023-01-03', '2023-01-06') == (False, ['offline cache miss'])
+    assert fake_client.requests == []
+    assert offline.call_used == 0
@@ -0,0 +1,61 @@
+# -----------------------
+# session calendar tests
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import numpy as np
+import pandas as pd
+
+from delta.utils import TradingCalendar
+
+start_date, end_date = '2023-11-22', '2023-11-27'    # thanksgiving, early close on the 24th
+
+
+def ny_time(timestamp:int) -> str:
+    return pd.Timestamp(int(timestamp), unit='s', tz='UTC').tz_convert('America/New_York').strftime('%Y-%m-%d %H:%M')
+
+
+def test_early_close_minute_grid():
+    calendar = TradingCalendar(start_date, end_date)
+    assert calendar.dates.tolist() == ['2023-11-22', '2023-11-24', '2023-11-27']
+
+    _, timestamps = calendar.slice('2023-11-24', '2023-11-24')
+    assert (ny_time(timestamps[0]), ny_time(timestamps[-1])) == ('2023-11-24 04:00', '2023-11-24 17:00')
+    assert len(timestamps) == 13 * 60 + 1
+    _, timestamps = calendar.slice('2023-11-27', '2023-11-27')
+    assert (ny_time(timestamps[0]), ny_time(timestamps[-1])) == ('2023-11-27 04:00', '2023-11-27 20:00')
+    assert len(timestamps) == 16 * 60 + 1
+
+    assert len(calendar.timestamps) == 2 * (16 * 60 + 1) + 13 * 60 + 1
+    assert (np.diff(calendar.timestamps) > 0).all()
+    assert [ny_time(ts) for ts in calendar.period_timestamps('2023-11-23', '2023-11-24')] == [
+        '2023-11-24 04:00', '2023-11-24 17:00',
+    ]
+
+
+def test_stored_sessions(updater):
+    calendar = updater.session_calendar(start_date, end_date)
+    np.testing.assert_array_equal(calendar.timestamps, TradingCalendar(start_date, end_date).timestamps)
+
+    # whole years are stored once
+    assert updater.cur.execute("SELECT start_date, end_date FROM sessions_coverage;").fetchone() == (
+        '2023-01-01', '2023-12-31',
+    )
+    sessions = updater.pull_sessions('2023-11-24', '2023-11-24')
+    assert [ny_time(sessions[0][field]) for field in ('market_open', 'market_close', 'post_close')] == [
+        '2023-11-24 09:30', '2023-11-24 13:00', '2023-11-24 17:00',
+    ]
+
+
+def test_update_stops_at_early_close(updater, fake_client):
+    updater.update(start_date, end_date, tickers=['AAA'])
+    intra = updater.pull_intra('AAA', columns=['close'])
+    timestamps = intra['trade_timestamp'].to_numpy()
+    on_24th = timestamps[[ny_time(ts).startswith('2023-11-24') for ts in timestamps]]
+    assert ny_time(on_24th[-1]) == '2023-11-24 17:00'
+    # nothing after the early close is missing or recorded as no data
+    assert updater.pull_nodata_ranges('AAA') == ([], [])
+    fake_client.requests.clear()
+    assert len(updater.update(start_date, end_date, tickers=['AAA'])) == 0
+    assert fake_client.requests == []
@@ -0,0 +1,102 @@
+# -----------------------
+# ShardedDBHandler tests
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import os
+import zlib
+import pandas as pd
+import pytest
+
+from delta.sql_handler import ShardedDBHandler
+
+tickers = ['AAA', 'BBB', 'CCC', 'IBM', 'EE']     # shards 1, 0, 0, 2, 1
+n_shards = 3
+
+
+def eod_frame(dates:list[str], volume:int=1) -> pd.DataFrame:
+    return pd.DataFrame({
+        'trade_date': dates, 'open': 1., 'high': 2., 'low': .5, 'close': 1.5, 'adj_close': 1.5, 'volume': volume,
+    })
+
+
+@pytest.fixture
+def sharded(tmp_path, test_logger):
+    db = ShardedDBHandler(test_logger, str(tmp_path), n_shards)
+    db.crt_missing_tables(tickers)
+    yield db
+    db.close_all_conn()
+
+
+def test_tickers_are_routed_by_crc32(sharded):
+    assert {sharded.shard_of(ticker) for ticker in tickers} == set(range(n_shards))
+    for ticker in tickers:
+        shard = zlib.crc32(ticker.encode()) % n_shards
+        assert sharded.shard_of(ticker) == shard
+        assert sharded.handler_of(ticker) is sharded.shards[shard]
+        assert sharded.handler_of(ticker).is_stock_price_tables_exist(ticker)
+    # single ticker calls go to the ticker's shard only
+    api_eod = eod_frame(['2024-01-02']).rename(columns={'trade_date': 'date', 'adj_close': 'adjusted_close'})
+    assert sharded.push_eod('AAA', api_eod)
+    assert [len(shard.pull_eod('AAA')) for shard in sharded.shards] == [
+        int(shard == sharded.shard_of('AAA')) for shard in range(n_shards)
+    ]
+
+
+def test_batches_are_pulled_across_shards(sharded):
+    eod_frames = {ticker: eod_frame(['2024-01-02', '2024-01-03'], volume) for volume, ticker in enumerate(tickers)}
+    assert sharded.push_bars_batch(eod_frames, {})
+    # bulk rows come with the api's column names
+    bulk = pd.DataFrame({
+        'ticker': tickers, 'date': '2024-01-04',
+        'open': 1., 'high': 2., 'low': .5, 'close': 1.5, 'adjusted_close': 1.5, 'volume': 7,
+    })
+    assert sharded.push_eod_bulk(bulk)
+
+    order = ['EE', 'AAA', 'IBM', 'BBB', 'CCC']
+    eod = sharded.pull_eod(order)
+    assert len(eod) == 3 * len(tickers)
+    # in the order asked for, whatever the shards
+    assert list(dict.fromkeys(eod['ticker'])) == order
+    assert eod.loc[eod['ticker'] == 'IBM', 'volume'].tolist() == [3, 3, 7]
+    arr = sharded.pull_eod(order, as_frame=False)
+    assert list(dict.fromkeys(arr['ticker'])) == order
+    assert sum(len(chunk) for chunk in sharded.iter_eod(tickers, chunk_size=2)) == 3 * len(tickers)
+
+
+def test_cross_shard_view(sharded):
+    assert sharded.push_bars_batch({ticker: eod_frame(['2024-01-02']) for ticker in tickers}, {})
+    con = sharded.open_cross_shard_view()
+    counts = pd.read_sql_query('SELECT ticker, COUNT(*) AS n FROM eod GROUP BY ticker ORDER BY ticker;', con)
+    assert counts['ticker'].tolist() == sorted(tickers)
+    assert counts['n'].tolist() == [1] * len(tickers)
+    assert sorted(pd.read_sql_query('SELECT ticker FROM tickers;', con)['ticker']) == sorted(tickers)
+    con.close()
+
+
+@pytest.mark.parametrize('other_n_shards', [n_shards - 1, n_shards + 1])
+def test_layout_mismatch_raises(sharded, tmp_path, test_logger, other_n_shards):
+    assert sharded.push_bars_batch({ticker: eod_frame(['2024-01-02']) for ticker in tickers}, {})
+    sharded.close_all_conn()
+    with pytest.raises(ValueError, match='shard'):
+        ShardedDBHandler(test_logger, str(tmp_path), other_n_shards)
+    # the data dir is still usable with its own layout
+    db = ShardedDBHandler(test_logger, str(tmp_path), n_shards)
+    assert len(db.pull_eod(tickers)) == len(tickers)
+    db.close_all_conn()
+
+
+def test_data_dir_without_trailing_slash(tmp_path, test_logger):
+    data_dir_path = os.path.join(str(tmp_path), 'data')
+    db = ShardedDBHandler(test_logger, data_dir_path, n_shards)
+    db.crt_missing_tables(tickers)
+    assert db.push_bars_batch({ticker: eod_frame(['2024-01-02']) for ticker in tickers}, {})
+    db.close_all_conn()
+    # shard files are inside the data dir, not next to it
+    assert sorted(os.listdir(data_dir_path)) == sorted(
+        ['stock_price_{:02d}.db'.format(shard) for shard in range(n_shards)]
+        + ['nodata_{:02d}.db'.format(shard) for shard in range(n_shards)]
+        + ['fund']
+    )
+    assert sorted(os.listdir(str(tmp_path))) == ['data']
@@ -0,0 +1,56 @@
+# -----------------------
+# stock info tests
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import pandas as pd
+import pytest
+
+from delta.sql_handler.fundamental.stock_info import StockInfoDB
+
+codes = ['T{:02d}'.format(i) for i in range(23)]
+
+
+@pytest.fixture
+def stock_info_db(test_logger, tmp_path) -> StockInfoDB:
+    """stock_info.db with a ticker data row for each of `codes`
+    """
+    stock_info_db = StockInfoDB(test_logger, '{}/'.format(tmp_path))
+    stock_info_db.crt_ticker_data_table()
+    stock_info_db.data_cur.executemany(
+        "INSERT INTO tkl_data VALUES (?, ?, 'USA', 'US', 'USD', 'Common Stock', '2000-01-03', ?, ?);",
+        [(code, 'name {}'.format(code), 1000 * i, 'mega' if i % 2 else 'micro') for i, code in enumerate(codes)],
+    )
+    stock_info_db.data_con.commit()
+    yield stock_info_db
+    stock_info_db.data_con.close()
+
+
+@pytest.mark.parametrize('chunk_size', [1, 5, 23, 24])
+def test_ticker_data_chunks_neither_drop_nor_duplicate_rows(stock_info_db, chunk_size):
+    chunks = list(stock_info_db.iter_ticker_data(chunk_size=chunk_size))
+    assert all(0 < len(chunk) <= chunk_size for chunk in chunks)
+    ticker_data = pd.concat(chunks, ignore_index=True)
+    assert sorted(ticker_data['code']) == codes
+    assert ticker_data['mkt_cap_value'].tolist() == [1000 * i for i in range(len(codes))]
+
+    # tickers and keys, unknown tickers are left out
+    tickers = codes[::4] + ['ZZZ']
+    chunks = list(stock_info_db.iter_ticker_data(tickers, keys=['mkt_cap'], chunk_size=chunk_size))
+    ticker_data = pd.concat(chunks, ignore_index=True)
+    assert list(ticker_data.columns) == ['code', 'mkt_cap']
+    assert sorted(ticker_data['code']) == codes[::4]
+    with pytest.raises(ValueError):
+        next(stock_info_db.iter_ticker_data(keys=['price']))
+
+
+@pytest.mark.parametrize('file_format', ['csv', 'parquet'])
+def test_ticker_data_export_round_trips(stock_info_db, tmp_path, file_format):
+    if (file_format == 'parquet'):
+        pytest.importorskip('pyarrow')
+    file_path = '{}/tkl_data.{}'.format(tmp_path, file_format)
+    assert stock_info_db.export_ticker_data(file_path, chunk_size=4) == len(codes)
+    exported = pd.read_csv(file_path) if (file_format == 'csv') else pd.read_parquet(file_path)
+    expected = pd.concat(stock_info_db.iter_ticker_data(), ignore_index=True)
+    pd.testing.assert_frame_equal(exported, expected)
@@ -0,0 +1,159 @@
+# -----------------------
+# stock price store tests
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import sqlite3
+import pandas as pd
+import pytest
+
+from delta.sql_handler import DBHandler
+from delta.tests.fake_api import eod_json, intra_json
+
+dates = pd.bdate_range('2023-01-02', periods=10).strftime('%Y-%m-%d').tolist()
+timestamps = list(range(1672756200, 1672756200 + 60 * 25, 60))
+
+
+@pytest.fixture
+def data_dir_path(tmp_path) -> str:
+    return str(tmp_path)
+
+
+@pytest.fixture(params=['sqlite', 'parquet'])
+def db(request, test_logger, data_dir_path) -> DBHandler:
+    """handler with eod and intra bars of AAA, BB and CCC, CCC has a third of them
+    """
+    if (request.param == 'parquet'):
+        pytest.importorskip('pyarrow')
+    db = DBHandler(test_logger, data_dir_path, intra_backend=request.param)
+    db.crt_missing_tables(['AAA', 'BB', 'CCC'])
+    for ticker, n in (('AAA', 1), ('BB', 1), ('CCC', 3)):
+        assert db.push_eod(ticker, pd.DataFrame(eod_json(dates[::n], close=len(ticker))))
+        assert db.push_intra(ticker, pd.DataFrame(intra_json(timestamps[::n], close=len(ticker))))
+    yield db
+    db.close_all_conn()
+
+
+def crt_legacy_tables(db_path:str):
+    """stock_price.db as written before the shared tables: a pair of tables per ticker
+    """
+    con = sqlite3.connect(db_path)
+    for ticker in ('AAA', 'BRK_B'):
+        con.execute(
+            ("CREATE TABLE {}_eod(trade_date DATE UNIQUE, open FLOAT, high FLOAT, low FLOAT, "
+             "close FLOAT, volume BIGINT, adj_close FLOAT);").format(ticker)
+        )
+        con.execute(
+            ("CREATE TABLE {}_intra(trade_timestamp TIMESTAMP UNIQUE, open FLOAT, high FLOAT, low FLOAT, "
+             "close FLOAT, volume BIGINT, gmtoffset INT, trade_datetime DATETIME);").format(ticker)
+        )
+        con.executemany(
+            "INSERT INTO {}_eod VALUES (?, 1., 2., .5, 1.5, 100, 1.4);".format(ticker),
+            [('2023-01-03', ), ('2023-01-04', )],
+        )
+        con.executemany(
+            "INSERT INTO {}_intra VALUES (?, 1., 2., .5, 1.5, 10, 0, '');".format(ticker),
+            [(1672756200, ), (1672756260, ), (1672756320, )],
+        )
+    # a ticker with eod bars only
+    con.execute(
+        ("CREATE TABLE CCC_eod(trade_date DATE UNIQUE, open FLOAT, high FLOAT, low FLOAT, "
+         "close FLOAT, volume BIGINT, adj_close FLOAT);")
+    )
+    con.execute("INSERT INTO CCC_eod VALUES ('2023-01-03', 1., 2., .5, 1.5, 100, 1.4);")
+    con.commit()
+    con.close()
+
+
+def test_per_ticker_tables_migrate_to_shared_tables(test_logger, data_dir_path):
+    crt_legacy_tables('{}/stock_price.db'.format(data_dir_path))
+    db = DBHandler(test_logger, data_dir_path)
+    assert db.migrate_per_ticker_tables() == 3
+
+    for ticker in ('AAA', 'BRK_B'):
+        eod = db.pull_eod(ticker)
+        assert eod['trade_date'].tolist() == ['2023-01-03', '2023-01-04']
+        assert eod['adj_close'].tolist() == [1.4, 1.4]
+        assert db.pull_intra(ticker)['trade_timestamp'].tolist() == [1672756200, 1672756260, 1672756320]
+    assert len(db.pull_eod('CCC')) == 1
+    assert len(db.pull_intra('CCC')) == 0
+
+    # the legacy tables are gone, the shared ones are without rowid
+    table_names = {row[0] for row in db.cur.execute("SELECT name FROM sqlite_master WHERE type='table';").fetchall()}
+    assert {'tickers', 'eod', 'intra'} <= table_names
+    assert not ({'AAA_eod', 'AAA_intra', 'BRK_B_eod', 'BRK_B_intra', 'CCC_eod'} & table_names)
+    for table_name in ('eod', 'intra'):
+        sql = db.cur.execute("SELECT sql FROM sqlite_master WHERE name=?;", (table_name, )).fetchone()[0]
+        assert sql.endswith('WITHOUT ROWID')
+    assert db.migrate_per_ticker_tables() == 0
+    db.close_all_conn()
+
+    # and stay gone when the db is opened again
+    db = DBHandler(test_logger, data_dir_path)
+    assert db._legacy_stock_price_tickers() == {}
+    assert len(db.pull_intra(['AAA', 'BRK_B'])) == 6
+    db.close_all_conn()
+
+
+def test_migration_can_keep_legacy_tables(test_logger, data_dir_path):
+    crt_legacy_tables('{}/stock_price.db'.format(data_dir_path))
+    db = DBHandler(test_logger, data_dir_path)
+    assert db.migrate_per_ticker_tables(drop=False) == 3
+    assert len(db.pull_eod('BRK_B')) == 2
+    assert set(db._legacy_stock_price_tickers()) == {'AAA', 'BRK_B', 'CCC'}
+    # copying again does not duplicate rows
+    assert db.migrate_per_ticker_tables() == 3
+    assert len(db.pull_eod('BRK_B')) == 2
+    assert db._legacy_stock_price_tickers() == {}
+    db.close_all_conn()
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 10, 11, 100])
+def test_eod_chunks_neither_drop_nor_duplicate_rows(db, chunk_size):
+    tickers = ['AAA', 'BB', 'CCC', 'DDD']
+    chunks = list(db.iter_eod(tickers, chunk_size=chunk_size))
+    assert all(0 < len(chunk) <= chunk_size for chunk in chunks)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), db.pull_eod(tickers))
+
+    # bounds and columns, one ticker
+    chunks = list(db.iter_eod('AAA', dates[2], dates[8], columns=['close'], chunk_size=chunk_size))
+    pd.testing.assert_frame_equal(
+        pd.concat(chunks, ignore_index=True), db.pull_eod('AAA', dates[2], dates[8], columns=['close']),
+    )
+    assert sum(len(chunk) for chunk in chunks) == 7
+
+
+@pytest.mark.parametrize('chunk_size', [1, 4, 25, 26])
+def test_intra_chunks_neither_drop_nor_duplicate_rows(db, chunk_size):
+    tickers = ['CCC', 'AAA', 'BB']
+    chunks = list(db.iter_intra(tickers, chunk_size=chunk_size))
+    assert all(0 < len(chunk) <= chunk_size for chunk in chunks)
+    bars = pd.concat(chunks, ignore_index=True)
+    pd.testing.assert_frame_equal(bars, db.pull_intra(tickers))
+    assert len(bars) == 25 + 25 + 9
+    assert not bars.duplicated(['ticker', 'trade_timestamp']).any()
+
+    chunks = list(db.iter_intra('BB', timestamps[3], timestamps[20], chunk_size=chunk_size))
+    assert pd.concat(chunks)['trade_timestamp'].tolist() == timestamps[3:21]
+    assert list(db.iter_intra('BB', timestamps[-1] + 60, chunk_size=chunk_size)) == []
+    with pytest.raises(ValueError):
+        next(db.iter_intra('BB', chunk_size=0))
+
+
+@pytest.mark.parametrize('file_format', ['csv', 'parquet'])
+def test_export_round_trips(db, data_dir_path, file_format):
+    if (file_format == 'parquet'):
+        pytest.importorskip('pyarrow')
+    read = pd.read_csv if (file_format == 'csv') else pd.read_parquet
+    tickers = ['AAA', 'BB', 'CCC']
+
+    file_path = '{}/eod.{}'.format(data_dir_path, file_format)
+    assert db.export_eod(file_path, tickers, chunk_size=4) == 10 + 10 + 4
+    pd.testing.assert_frame_equal(read(file_path), db.pull_eod(tickers), check_dtype=(file_format == 'parquet'))
+
+    file_path = '{}/intra.{}'.format(data_dir_path, file_format)
+    assert db.export_intra(file_path, tickers, chunk_size=7) == 25 + 25 + 9
+    # csv keeps datetimes as text, parquet in milliseconds
+    exported = read(file_path).astype({'trade_datetime': 'datetime64[s]'})
+    pd.testing.assert_frame_equal(exported, db.pull_intra(tickers), check_dtype=(file_format == 'parquet'))
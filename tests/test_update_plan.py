@@ -0,0 +1,97 @@
+# -----------------------
+# UpdatePlan tests
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import logging
+import pytest
+
+from delta.update_plan import UpdatePlan
+
+call_weights = {'eod': 1, 'intra': 5}
+
+
+def ticker_plan(ticker:str, eod_requests:int, intra_requests:int) -> dict:
+    return {
+        'ticker': ticker,
+        'missing_date_ranges': [], 'missing_ts_ranges': [],
+        'eod_windows': [('2023-01-03', '2023-01-03')] * eod_requests,
+        'intra_windows': [(0, 0)] * intra_requests,
+    }
+
+
+@pytest.fixture
+def plan() -> UpdatePlan:
+    # AAA 6 calls, BBB 11, CCC 1, DDD 25
+    ticker_plans = [
+        ticker_plan('AAA', 1, 1), ticker_plan('BBB', 1, 2),
+        ticker_plan('CCC', 1, 0), ticker_plan('DDD', 0, 5),
+    ]
+    return UpdatePlan(
+        '2023-01-03', '2023-01-10', None, {}, ticker_plans, ['EEE'],
+        call_weights, calls_available=20, run_id=7,
+    )
+
+
+def test_calls(plan):
+    assert plan.calls == 43
+    assert not plan.is_within_quota()
+    assert plan.summary()['calls'].tolist() == [6, 11, 1, 25]
+
+
+def test_trim_within_calls(plan):
+    trimmed = plan.trim()
+    assert trimmed.tickers == ['AAA', 'BBB', 'CCC']
+    assert trimmed.calls == 18
+    assert trimmed.is_within_quota()
+    assert trimmed.dropped_tkls == ['DDD']
+    assert (trimmed.run_id, trimmed.done_tkls) == (7, ['EEE'])
+
+
+def test_trim_priority(plan):
+    # DDD and CCC take 26 of 30 calls, AAA and BBB no longer fit
+    trimmed = plan.trim(calls=30, priority=['DDD', 'CCC'])
+    assert trimmed.tickers == ['DDD', 'CCC']
+    assert trimmed.dropped_tkls == ['AAA', 'BBB']
+
+
+def test_trim_skips_expensive_ticker_keeps_cheaper_ones(plan):
+    assert plan.trim(calls=7).tickers == ['AAA', 'CCC']
+    assert plan.trim(calls=0).tickers == []
+
+
+def test_split_budgets(plan):
+    parts = plan.split(calls=20)
+    assert [part.tickers for part in parts] == [['AAA', 'BBB', 'CCC'], ['DDD']]
+    assert [part.calls for part in parts] == [18, 25]     # a ticker over budget gets a part of its own
+    assert parts[0].dropped_tkls == ['DDD']
+    assert parts[1].dropped_tkls == ['AAA', 'BBB', 'CCC']
+    assert sum(part.calls for part in parts) == plan.calls
+
+
+def test_split_priority(plan):
+    parts = plan.split(calls=12, priority=['CCC', 'BBB'])
+    assert [part.tickers for part in parts] == [['CCC', 'BBB'], ['AAA'], ['DDD']]
+    assert all(part.run_id == 7 for part in parts)
+
+
+def test_dry_run_requests_nothing(updater, fake_client):
+    plan = updater.update('2023-01-03', '2023-01-10', tickers=['AAA', 'BBB'], dry_run=True)
+    assert fake_client.requests == []
+    assert plan.tickers == ['AAA', 'BBB']
+    # one eod window and one intra window of the 6 days each
+    assert plan.calls == 2 * (updater.eod_calls_per_reqeust + updater.intra_calls_per_reqeust)
+    assert updater.pull_journal().empty
+
+    updater.execute_plan(plan)
+    assert len(fake_client.requests) == 4
+    assert updater.call_used == plan.calls
+    assert len(updater.update('2023-01-03', '2023-01-10', tickers=['AAA', 'BBB'], dry_run=True)) == 0
+
+
+def test_plan_is_logged_not_printed(updater, fake_client, capsys, caplog):
+    with caplog.at_level(logging.INFO, logger='delta.logger'):
+        plan = updater.update('2023-01-03', '2023-01-10', tickers=['AAA', 'BBB'], dry_run=True)
+    assert capsys.readouterr().out == ''
+    assert "planned 2 tickers to fetch, 0 up to date: {} api calls".format(plan.calls) in caplog.text
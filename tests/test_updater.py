@@ -0,0 +1,194 @@
+# -----------------------
+# DBUpdater fetch and write tests
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import os
+import multiprocessing
+from concurrent.futures import wait
+import pandas as pd
+import pytest
+
+from delta.tests.conftest import test_tickers
+from delta.tests.fake_api import eod_json
+
+start_date, end_date = '2023-01-03', '2023-01-10'
+
+
+def stored_bars(updater) -> tuple[pd.DataFrame, pd.DataFrame]:
+    return updater.pull_eod(test_tickers), updater.pull_intra(test_tickers)
+
+
+def test_workers_store_what_one_fetcher_does(updater, fake_client, tmp_path_factory, monkeypatch):
+    fake_client.holes = lambda symbol, ts: (ts // 60) % 7 == 0
+    updater.update(start_date, end_date, tickers=test_tickers)
+    expected_eod, expected_intra = stored_bars(updater)
+    assert len(expected_intra) < 3 * len(updater.session_calendar(start_date, end_date).timestamps)
+
+    # a second data dir, fetched by 3 threads
+    from delta.updater import DBUpdater
+    monkeypatch.setenv('DATA_DIR_PATH', '{}/'.format(tmp_path_factory.mktemp('threads')))
+    threaded = DBUpdater(activate_logger=False, use_response_cache=False)
+    threaded.push_fund([{'General': {'Code': ticker, 'IPODate': '2000-01-01'}} for ticker in test_tickers])
+    threaded.update(start_date, end_date, tickers=test_tickers, workers=3)
+    eod, intra = stored_bars(threaded)
+    pd.testing.assert_frame_equal(eod, expected_eod)
+    pd.testing.assert_frame_equal(intra, expected_intra)
+    # the minutes without bars are no data for both
+    for ticker in test_tickers:
+        assert threaded.pull_nodata_ranges(ticker) == updater.pull_nodata_ranges(ticker)
+    assert threaded.call_used == updater.call_used
+    threaded.close_all_conn()
+
+
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != 'fork',
+    reason='fetcher processes only see the fake client when forked',
+)
+def test_processes_store_what_threads_do(updater, fake_client, tmp_path_factory, monkeypatch):
+    updater.update(start_date, end_date, tickers=test_tickers, workers=2)
+    expected_eod, expected_intra = stored_bars(updater)
+
+    from delta.updater import DBUpdater
+    monkeypatch.setenv('DATA_DIR_PATH', '{}/'.format(tmp_path_factory.mktemp('processes')))
+    pooled = DBUpdater(activate_logger=False, use_response_cache=False)
+    pooled.push_fund([{'General': {'Code': ticker, 'IPODate': '2000-01-01'}} for ticker in test_tickers])
+    pooled.update(start_date, end_date, tickers=test_tickers, workers=2, processes=True)
+    eod, intra = stored_bars(pooled)
+    pd.testing.assert_frame_equal(eod, expected_eod)
+    pd.testing.assert_frame_equal(intra, expected_intra)
+    # calls counted in the fetcher processes are synced back
+    assert pooled.call_used == updater.call_used
+    assert pooled.unfinished_update_run(start_date, end_date) is None
+    pooled.close_all_conn()
+
+
+def test_failed_batch_is_pushed_ticker_by_ticker(updater, fake_client, monkeypatch):
+    from delta.updater import DBUpdater
+    batches = []
+    push_bars_batch = DBUpdater.push_bars_batch
+    def failing_batch(self, eod_frames, intra_frames):
+        batches.append(sorted(set(eod_frames) | set(intra_frames)))
+        if (len(batches[-1]) > 1):
+            return False
+        return push_bars_batch(self, eod_frames, intra_frames)
+    monkeypatch.setattr(DBUpdater, 'push_bars_batch', failing_batch)
+
+    # the writer waits for every fetch, so all tickers come round in one batch
+    import delta.updater
+    monkeypatch.setattr(delta.updater, 'wait', lambda futures, return_when=None: wait(futures))
+    updater.update(start_date, end_date, tickers=test_tickers, workers=3)
+    assert sorted(batches) == sorted([test_tickers] + [[ticker] for ticker in test_tickers])
+    journal = updater.pull_journal()
+    assert set(journal['state']) == {'pushed'}
+    assert sorted(updater.pull_eod(test_tickers)['ticker'].unique()) == test_tickers
+
+
+def test_bulk_eod_only_takes_dates_missed_by_enough_tickers(updater, fake_client):
+    updater.crt_missing_tables(test_tickers)
+    # CCC has the last date, so it is missed by 2 tickers only
+    assert updater.push_eod('CCC', pd.DataFrame(eod_json(['2023-01-05'])))
+    updater.bulk_calls_per_request = 2
+    fake_client.bulk_symbols = ['AAA', 'CCC']
+
+    assert updater.update_eod_bulk('2023-01-03', '2023-01-05', tickers=test_tickers) == ['2023-01-03', '2023-01-04']
+    assert [request[2] for request in fake_client.requests if (request[0] == 'bulk')] == ['2023-01-03', '2023-01-04']
+    eod = updater.pull_eod(test_tickers)
+    assert eod.groupby('ticker')['trade_date'].apply(list).to_dict() == {
+        'AAA': ['2023-01-03', '2023-01-04'], 'CCC': ['2023-01-03', '2023-01-04', '2023-01-05'],
+    }
+    # BBB is no data on the bulk dates it was missing from, not on the date left to `update`
+    assert updater.pull_nodata_ranges('BBB')[0] == ['2023-01-03', '2023-01-04']
+    assert updater.pull_nodata_ranges('AAA')[0] == []
+
+
+def test_update_writes_to_shards(updater, fake_client, tmp_path_factory, monkeypatch):
+    fake_client.holes = lambda symbol, ts: (ts // 60) % 7 == 0
+    updater.update(start_date, end_date, tickers=test_tickers)
+    expected_eod, expected_intra = stored_bars(updater)
+
+    from delta.updater import DBUpdater
+    data_dir_path = tmp_path_factory.mktemp('sharded')
+    monkeypatch.setenv('DATA_DIR_PATH', str(data_dir_path))     # without a trailing slash
+    sharded = DBUpdater(activate_logger=False, use_response_cache=False, n_shards=3)
+    sharded.db.push_fund([{'General': {'Code': ticker, 'IPODate': '2000-01-01'}} for ticker in test_tickers])
+    sharded.update(start_date, end_date, tickers=test_tickers, workers=2)
+    eod, intra = stored_bars(sharded.db)
+    pd.testing.assert_frame_equal(eod, expected_eod)
+    pd.testing.assert_frame_equal(intra, expected_intra)
+    for ticker in test_tickers:
+        assert sharded.db.pull_nodata_ranges(ticker) == updater.pull_nodata_ranges(ticker)
+        # bars and no data are in the ticker's shard only
+        shard = sharded.db.shard_of(ticker)
+        assert len(sharded.db.shards[shard].pull_intra(ticker)) == len(intra[intra['ticker'] == ticker])
+        assert not any(
+            other.is_stock_price_tables_exist(ticker)[0] for other in sharded.db.shards if (other is not sharded.db.shards[shard])
+        )
+    assert [sharded.db.shard_of(ticker) for ticker in test_tickers] == [1, 0, 0]
+    # the journal is kept in shard 0, a rerun has nothing left to fetch
+    assert set(sharded.db.pull_journal()['state']) == {'pushed'}
+    n_requests = len(fake_client.requests)
+    sharded.update(start_date, end_date, tickers=test_tickers)
+    assert len(fake_client.requests) == n_requests
+    sharded.close_all_conn()
+    # nothing is written to the unsharded files, nor next to the data dir
+    db_files = {file_name for file_name in os.listdir(data_dir_path) if file_name.endswith('.db')}
+    assert {'nodata_00.db', 'nodata_01.db', 'rate_limit.db', 'stock_price_00.db', 'stock_price_01.db'} <= db_files
+    assert not ({'nodata.db', 'stock_price.db'} & db_files)
+    assert [file_name for file_name in os.listdir(data_dir_path.parent) if file_name.startswith(data_dir_path.name)] == [
+        data_dir_path.name,
+    ]
+
+
+def test_a_malformed_response_fails_its_ticker_only(updater, fake_client, monkeypatch):
+    get_prices_eod = fake_client.get_prices_eod
+    def eod_without_dates(self, symbol, *args, **kwargs):
+        rows = get_prices_eod(self, symbol, *args, **kwargs)
+        return [{'close': row['close']} for row in rows] if (symbol == 'BBB.us') else rows
+    monkeypatch.setattr(fake_client, 'get_prices_eod', eod_without_dates)
+
+    updater.update(start_date, end_date, tickers=test_tickers, workers=2, max_attempts=1)
+    journal = updater.pull_journal().set_index('ticker')
+    assert journal.loc['BBB', 'state'] == 'failed'
+    assert 'format error' in journal.loc['BBB', 'error']
+    assert journal.loc[['AAA', 'CCC'], 'state'].tolist() == ['pushed', 'pushed']
+    assert updater.error_tkls == ['BBB']
+
+
+def test_a_fetcher_exception_fails_its_ticker_only(updater, fake_client, monkeypatch):
+    import delta.updater
+    fetch_and_format = delta.updater._fetch_and_format
+    def failing_fetch(handler, exchange, ticker_plan):
+        if (ticker_plan['ticker'] == 'BBB'):
+            raise RuntimeError('fetcher crashed')
+        return fetch_and_format(handler, exchange, ticker_plan)
+    monkeypatch.setattr(delta.updater, '_fetch_and_format', failing_fetch)
+
+    updater.update(start_date, end_date, tickers=test_tickers, workers=2, max_attempts=1)
+    journal = updater.pull_journal().set_index('ticker')
+    assert journal.loc['BBB', 'state'] == 'failed'
+    assert 'fetcher crashed' in journal.loc['BBB', 'error']
+    assert journal.loc[['AAA', 'CCC'], 'state'].tolist() == ['pushed', 'pushed']
+
+
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != 'fork',
+    reason='fetcher processes only see the patched fetch when forked',
+)
+def test_a_dead_fetcher_process_does_not_abort_the_run(updater, fake_client, monkeypatch):
+    import delta.updater
+    fetch_and_format = delta.updater._fetch_and_format
+    def dying_fetch(handler, exchange, ticker_plan):
+        if (ticker_plan['ticker'] == 'BBB'):
+            os._exit(1)
+        return fetch_and_format(handler, exchange, ticker_plan)
+    monkeypatch.setattr(delta.updater, '_fetch_and_format', dying_fetch)
+
+    updater.update(start_date, end_date, tickers=test_tickers, workers=1, processes=True, max_attempts=1)
+    journal = updater.pull_journal().set_index('ticker')
+    assert journal.loc['BBB', 'state'] == 'failed'
+    assert 'BrokenProcessPool' in journal.loc['BBB', 'error']
+    # tickers after it are failed with the pool or left for the next run, never lost
+    for ticker in ('AAA', 'CCC'):
+        assert (journal.loc[ticker, 'state'] in ('pushed', 'failed')) or (ticker in updater.remaining_tkls)
@@ -0,0 +1,146 @@
+# -----------------------
+# Utils range tests
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from delta.utils import Utils
+
+minutes = np.arange(0, 600, 60, dtype=np.int64)     # 0, 60, ..., 540
+dates = np.array(['2023-01-03', '2023-01-04', '2023-01-05', '2023-01-06'])
+
+
+@pytest.mark.parametrize('reference, comparants, covered_ranges, expected', [
+    (minutes, [[60, 120, 300]], None, [(0, 0), (180, 240), (360, 540)]),
+    (minutes, [[60], [120, 300]], [(360, 420)], [(0, 0), (180, 240), (480, 540)]),
+    (minutes, [minutes[::-1]], None, []),                       # all stored, any order
+    (minutes, [[]], [(0, 540)], []),                            # all no data
+    (minutes, [[]], None, [(0, 540)]),
+    (np.array([], dtype=np.int64), [[0]], None, []),
+    (np.array([0, 60, 1000, 1060]), [[]], None, [(0, 1060)]),   # consecutive reference points, not values
+    (dates, [['2023-01-04']], None, [('2023-01-03', '2023-01-03'), ('2023-01-05', '2023-01-06')]),
+    (dates, [[], ['2023-01-06']], None, [('2023-01-03', '2023-01-05')]),
+])
+def test_missing_ranges(reference, comparants, covered_ranges, expected):
+    assert Utils.missing_ranges(reference, *comparants, covered_ranges=covered_ranges) == expected
+
+
+@pytest.mark.parametrize('ranges, remove_ranges, expected', [
+    ([(0, 600)], [(120, 180)], [(0, 60), (240, 600)]),
+    ([(0, 600)], [(0, 600)], []),
+    ([(0, 600)], [(-600, 1200)], []),
+    ([(0, 600)], [(-60, 0), (600, 660)], [(60, 540)]),          # touching both ends
+    ([(0, 120), (300, 420)], [(60, 360)], [(0, 0), (420, 420)]),  # one removal over two ranges
+    ([(0, 600)], [(60, 60), (180, 240), (480, 480)], [(0, 0), (120, 120), (300, 420), (540, 600)]),
+    ([(0, 60)], [(120, 180)], [(0, 60)]),
+    ([(120, 180)], [(0, 60)], [(120, 180)]),
+    ([], [(0, 60)], []),
+    ([(0, 60)], [], [(0, 60)]),
+])
+def test_subtract_ranges(ranges, remove_ranges, expected):
+    assert Utils.subtract_ranges(ranges, remove_ranges) == expected
+
+
+def test_subtract_ranges_step():
+    assert Utils.subtract_ranges([(0, 10)], [(3, 4)], step=1) == [(0, 2), (5, 10)]
+
+
+@pytest.mark.parametrize('ranges, max_span, expected', [
+    ([], 300, []),
+    ([(0, 300)], 300, [(0, 300)]),                               # exactly one span
+    ([(0, 600)], 300, [(0, 300), (360, 600)]),                   # a long range is cut
+    ([(0, 60), (240, 300), (600, 660)], 300, [(0, 300), (600, 660)]),  # close ranges share a window
+    ([(0, 60), (240, 480)], 300, [(0, 300), (360, 480)]),        # a range across the window end is split
+    ([(0, 0), (300, 300)], 300, [(0, 300)]),
+    ([(0, 0), (360, 360)], 300, [(0, 0), (360, 360)]),
+])
+def test_request_windows(ranges, max_span, expected):
+    windows = Utils.request_windows(ranges, max_span)
+    assert windows == expected
+    assert all(end - start <= max_span for start, end in windows)
+
+
+def test_request_windows_cover_every_point():
+    ranges = Utils.points_to_ranges(np.flatnonzero(np.arange(2000) % 7 != 0) * 60)
+    windows = Utils.request_windows(ranges, 118 * 60)
+    points = np.concatenate([np.arange(start, end + 1, 60) for start, end in ranges])
+    assert Utils.in_ranges(points, windows).all()
+    assert len(windows) == int(np.ceil((points[-1] - points[0] + 60) / (119 * 60)))
+
+
+def test_plan_windows_from_missing_minutes(updater, fake_client):
+    start_date, end_date = '2023-01-03', '2023-01-10'
+    calendar = updater.session_calendar(start_date, end_date)
+    # store the first day and a 2h hole on the last; the rest goes in one intra window
+    first_day = calendar.slice(start_date, start_date)[1]
+    last_day = calendar.slice(end_date, end_date)[1]
+    stored = np.concatenate((first_day, last_day[120:240]))
+    updater.crt_missing_tables(['AAA'])
+    updater.push_intra('AAA', pd.DataFrame({
+        'timestamp': stored, 'gmtoffset': 0, 'datetime': '',
+        'open': 1., 'high': 1., 'low': 1., 'close': 1., 'volume': 1,
+    }))
+
+    ticker_plan = updater.plan_update(start_date, end_date, tickers=['AAA']).ticker_plans[0]
+    assert ticker_plan['missing_ts_ranges'] == [
+        (int(calendar.slice('2023-01-04')[1][0]), int(last_day[119])),
+        (int(last_day[240]), int(last_day[-1])),
+    ]
+    assert ticker_plan['intra_windows'] == [(int(calendar.slice('2023-01-04')[1][0]), int(last_day[-1]))]
+
+    # with windows of 2 days the missing minutes are cut into 4, none starting on a stored minute
+    updater.max_days = 2
+    ticker_plan = updater.plan_update(start_date, end_date, tickers=['AAA']).ticker_plans[0]
+    assert ticker_plan['intra_windows'] == Utils.request_windows(ticker_plan['missing_ts_ranges'], 2 * 86400)
+    assert len(ticker_plan['intra_windows']) == 4
+    assert not np.isin([start for start, _ in ticker_plan['intra_windows']], stored).any()
+
+
+@pytest.mark.parametrize('ranges, max_gap, expected', [
+    ([], 2, []),
+    ([('2023-01-03', '2023-01-03')], 2, [('2023-01-03', '2023-01-03')]),
+    # 1 stored date between them
+    ([('2023-01-03', '2023-01-03'), ('2023-01-05', '2023-01-06')], 1, [('2023-01-03', '2023-01-06')]),
+    ([('2023-01-03', '2023-01-03'), ('2023-01-05', '2023-01-06')], 0, [('2023-01-03', '2023-01-03'), ('2023-01-05', '2023-01-06')]),
+    ([('2023-01-03', '2023-01-03'), ('2023-01-06', '2023-01-06')], 1, [('2023-01-03', '2023-01-03'), ('2023-01-06', '2023-01-06')]),
+])
+def test_coalesce_ranges(ranges, max_gap, expected):
+    assert Utils.coalesce_ranges(dates, ranges, max_gap) == expected
+
+
+def test_coalesce_ranges_counts_reference_points():
+    # 01-09 is a gap of 1 trading date over a weekend of 3 calendar days
+    trading_dates = np.array(['2023-01-05', '2023-01-06', '2023-01-09', '2023-01-10'])
+    assert Utils.coalesce_ranges(trading_dates, [('2023-01-05', '2023-01-06'), ('2023-01-10', '2023-01-10')], 1) == [
+        ('2023-01-05', '2023-01-10'),
+    ]
+
+
+def test_plan_eod_windows_from_missing_dates(updater, fake_client):
+    updater.update('2023-01-03', '2023-03-31', tickers=['AAA'])
+    stored_dates = updater.pull_eod('AAA')['trade_date']
+    assert len(stored_dates) == len(updater.session_calendar('2023-01-03', '2023-03-31').dates)
+
+    # a daily top-up requests the new dates only
+    plan = updater.update('2023-01-03', '2023-04-06', tickers=['AAA'], dry_run=True)
+    assert plan.ticker_plans[0]['eod_windows'] == [('2023-04-03', '2023-04-06')]
+
+    # a stored gap is joined to the new dates when at most `eod_merge_dates` (9 here) apart
+    updater.con.execute("DELETE FROM eod WHERE trade_date = '2023-03-20';")
+    updater.con.commit()
+    plan = updater.update('2023-01-03', '2023-04-06', tickers=['AAA'], dry_run=True)
+    assert plan.ticker_plans[0]['eod_windows'] == [('2023-03-20', '2023-04-06')]
+    updater.eod_merge_dates = 5
+    plan = updater.update('2023-01-03', '2023-04-06', tickers=['AAA'], dry_run=True)
+    assert plan.ticker_plans[0]['eod_windows'] == [('2023-03-20', '2023-03-20'), ('2023-04-03', '2023-04-06')]
+
+    fake_client.requests.clear()
+    updater.execute_plan(plan)
+    assert [request[2:] for request in fake_client.requests if request[0] == 'eod'] == [
+        ('2023-03-20', '2023-03-20'), ('2023-04-03', '2023-04-06'),
+    ]
+    assert '2023-03-20' in updater.pull_eod('AAA')['trade_date'].tolist()
@@ -0,0 +1,190 @@
+# -----------------------
+# UpdatePlan class
+# @author: Shi Junjie
+# Sun 18 Oct 2026
+# -----------------------
+
+import pandas as pd
+
+from delta.utils import TradingCalendar
+
+
+class UpdatePlan:
+    """tickers an update will fetch, with their missing ranges, request windows and api cost
+
+    built by `DBUpdater.plan_update` from the databases at planning time and
+    run by `DBUpdater.execute_plan`. `trim` and `split` return smaller plans
+    of the same run, eg. to keep a backfill within the daily quota.
+    """
+
+    def __init__(
+        self, start_date:str, end_date:str, calendar:TradingCalendar,
+        ipo_dates:dict[str, str], ticker_plans:list[dict], done_tkls:list[str],
+        call_weights:dict[str, int], calls_available:int, run_id:int=None,
+        dropped_tkls:list[str]=None,
+    ):
+        """init UpdatePlan
+
+        Args:
+            start_date (str): update start date
+            end_date (str): update end date
+            calendar (TradingCalendar): trading calendar of the update
+            ipo_dates (dict[str, str]): ipo date of each ticker
+            ticker_plans (list[dict]): ticker plans from `DBUpdater._plan_ticker`, in update order
+            done_tkls (list[str]): tickers with nothing to fetch
+            call_weights (dict[str, int]): api calls per 'eod' and 'intra' request
+            calls_available (int): api calls left today when planned
+            run_id (int, optional): journaled run to continue. Defaults to None (new run).
+            dropped_tkls (list[str], optional): tickers left out by `trim` or `split`. Defaults to None.
+        """
+        self.start_date = start_date
+        self.end_date = end_date
+        self.calendar = calendar
+        self.ipo_dates = ipo_dates
+        self.ticker_plans = ticker_plans
+        self.done_tkls = done_tkls
+        self.call_weights = call_weights
+        self.calls_available = calls_available
+        self.run_id = run_id
+        self.dropped_tkls = dropped_tkls or []
+
+    def __len__(self) -> int:
+        return len(self.ticker_plans)
+
+    @property
+    def tickers(self) -> list[str]:
+        """tickers to fetch, in update order
+        """
+        return [ticker_plan['ticker'] for ticker_plan in self.ticker_plans]
+
+    @property
+    def calls(self) -> int:
+        """weighted api calls of the whole plan
+        """
+        return sum(self.ticker_calls(ticker_plan) for ticker_plan in self.ticker_plans)
+
+    def ticker_calls(self, ticker_plan:dict) -> int:
+        """weighted api calls of a ticker plan
+
+        Args:
+            ticker_plan (dict): ticker plan
+
+        Returns:
+            int: api calls
+        """
+        return (
+            len(ticker_plan['eod_windows']) * self.call_weights['eod']
+            + len(ticker_plan['intra_windows']) * self.call_weights['intra']
+        )
+
+    def is_within_quota(self) -> bool:
+        """check if the plan fits in the api calls left when planned
+
+        Returns:
+            bool: is within quota
+        """
+        return self.calls <= self.calls_available
+
+    def summary(self) -> pd.DataFrame:
+        """per ticker missing dts, requests and api calls
+
+        Returns:
+            pd.DataFrame: 'ticker', 'missing_date_ranges', 'missing_ts_ranges', 'eod_requests', 'intra_requests', 'calls'
+        """
+        return pd.DataFrame(
+            [
+                (
+                    ticker_plan['ticker'],
+                    len(ticker_plan['missing_date_ranges']), len(ticker_plan['missing_ts_ranges']),
+                    len(ticker_plan['eod_windows']), len(ticker_plan['intra_windows']),
+                    self.ticker_calls(ticker_plan),
+                )
+                for ticker_plan in self.ticker_plans
+            ],
+            columns=['ticker', 'missing_date_ranges', 'missing_ts_ranges', 'eod_requests', 'intra_requests', 'calls'],
+        )
+
+    def trim(self, calls:int=None, priority:list[str]=None) -> 'UpdatePlan':
+        """keep the tickers fitting in `calls`, highest priority first
+
+        Args:
+            calls (int, optional): api calls to spend. Defaults to None (calls left when planned).
+            priority (list[str], optional): tickers to keep first, in order, the rest follow in
+                update order. Defaults to None (update order).
+
+        Returns:
+            UpdatePlan: trimmed plan
+        """
+        calls = self.calls_available if (calls is None) else calls
+        ticker_plans = self._prioritized(priority)
+        kept, dropped = [], []
+        for ticker_plan in ticker_plans:
+            ticker_calls = self.ticker_calls(ticker_plan)
+            if (ticker_calls <= calls):
+                kept.append(ticker_plan)
+                calls -= ticker_calls
+            else:
+                dropped.append(ticker_plan['ticker'])
+        return self._subplan(kept, dropped)
+
+    def split(self, calls:int=None, priority:list[str]=None) -> list['UpdatePlan']:
+        """cut the plan into consecutive plans of at most `calls` each, eg. one per quota day,
+        a ticker costing more than `calls` gets a plan of its own
+
+        Args:
+            calls (int, optional): api calls per plan. Defaults to None (calls left when planned).
+            priority (list[str], optional): tickers to schedule first, in order. Defaults to None (update order).
+
+        Returns:
+            list[UpdatePlan]: plans
+        """
+        calls = self.calls_available if (calls is None) else calls
+        parts, part_calls = [[]], 0
+        for ticker_plan in self._prioritized(priority):
+            ticker_calls = self.ticker_calls(ticker_plan)
+            if (parts[-1] and (part_calls + ticker_calls > calls)):
+                parts.append([])
+                part_calls = 0
+            parts[-1].append(ticker_plan)
+            part_calls += ticker_calls
+        tickers = self.tickers
+        plans = []
+        for part in parts:
+            part_tickers = set(ticker_plan['ticker'] for ticker_plan in part)
+            plans.append(self._subplan(part, [ticker for ticker in tickers if ticker not in part_tickers]))
+        return plans
+
+    def _prioritized(self, priority:list[str]) -> list[dict]:
+        """ticker plans with the priority tickers first
+
+        Args:
+            priority (list[str]): tickers, in order, None for update order
+
+        Returns:
+            list[dict]: ticker plans
+        """
+        if (not priority):
+            return list(self.ticker_plans)
+        rank = {ticker: i for i, ticker in enumerate(priority)}
+        return sorted(self.ticker_plans, key=lambda ticker_plan: rank.get(ticker_plan['ticker'], len(rank)))
+
+    def _subplan(self, ticker_plans:list[dict], dropped_tkls:list[str]) -> 'UpdatePlan':
+        """plan of the same run with part of the tickers
+
+        Args:
+            ticker_plans (list[dict]): kept ticker plans
+            dropped_tkls (list[str]): tickers left out
+
+        Returns:
+            UpdatePlan: plan
+        """
+        return UpdatePlan(
+            self.start_date, self.end_date, self.calendar, self.ipo_dates,
+            ticker_plans, self.done_tkls, self.call_weights, self.calls_available,
+            run_id=self.run_id, dropped_tkls=self.dropped_tkls + dropped_tkls,
+        )
+
+    def __repr__(self) -> str:
+        return "UpdatePlan({} - {}, {} tickers, {} calls of {} available)".format(
+            self.start_date, self.end_date, len(self), self.calls, self.calls_available,
+        )
@@ -5,17 +5,25 @@
 # ----------------------------------------------------------
 
 import os
+import time
 import logging
 import pandas as pd
+import numpy as np
 import datetime as dt
 from tqdm import tqdm
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, BrokenExecutor, wait, FIRST_COMPLETED
 
 # local packages
-from delta.utils import Utils
-from delta.logger import logger
-from delta.sql_handler import DBHandler
+from delta.utils import Utils, TradingCalendar
+from delta.logger import logger, log_to_file
+from delta.sql_handler import DBHandler, ShardedDBHandler
 from delta.request_handler import EodApiRequestHandler
-from delta.sql_handler import hist_mktcap_table_name
+from delta.rate_limiter import QuotaExceededError
+from delta.update_plan import UpdatePlan
+
+_rate_limit_db_file_name = 'rate_limit.db'             # rate limiter state, shared by all updaters
+_response_cache_db_file_name = 'response_cache.db'      # api responses, reused by reruns
 
 class DBUpdater(
     DBHandler,
@@ -29,23 +37,42 @@ class DBUpdater(
         Utils (_type_): _description_
         EodApiRequestHandler (_type_): _description_
     """ 
-    def __init__(self, activate_logger:bool=True):
+    def __init__(
+        self, activate_logger:bool=True,
+        calls_per_minute:int=1000, wait_for_quota:bool=False,
+        db_profile:str='bulk-ingest', intra_backend:str='sqlite',
+        use_response_cache:bool=True, offline:bool=False,
+        n_shards:int=None,
+    ):
         """init DatabaseUpdate
 
         Args:
             activate_logger (bool, optional): _description_. Defaults to True.
-            tickers (list[str], optional): _description_. Defaults to None.
+            calls_per_minute (int, optional): api calls allowed per minute, shared by every
+                updater on the same DATA_DIR_PATH. Defaults to 1000.
+            wait_for_quota (bool, optional): pause until the daily quota resets instead of
+                stopping the update. Defaults to False.
+            db_profile (str, optional): sqlite connection profile, see `connection_profiles`.
+                Defaults to 'bulk-ingest'.
+            intra_backend (str, optional): 'sqlite' or 'parquet' storage of intra bars. Defaults to 'sqlite'.
+            use_response_cache (bool, optional): keep api responses in DATA_DIR_PATH and reuse them
+                on reruns. Defaults to True.
+            offline (bool, optional): replay cached responses only, never call the api. Defaults to False.
+            n_shards (int, optional): split the stock price and nodata dbs over `n_shards` files written
+                in parallel, see `ShardedDBHandler`; the dbs are then read through `self.db`.
+                Defaults to None (one stock_price.db).
         """
+        # init env vars
+        self.DATA_DIR_PATH = os.path.join(os.environ['DATA_DIR_PATH'], '')    # directiory, with a trailing slash
+        self.API_KEY = os.environ.get('API_KEY')            # api key, only needed once the api is called
+        self.LOG_PATH = os.environ.get('LOG_PATH')          # log path, only needed with `activate_logger`
+
         self.activate_logger = activate_logger  # determine if activate logger
         if (self.activate_logger):
+            log_to_file(self.LOG_PATH)
             logger.setLevel(logging.INFO)
         else:
             logger.setLevel(logging.NOTSET)
-
-        # init env vars
-        self.DATA_DIR_PATH = os.environ['DATA_DIR_PATH']    # directiory
-        self.API_KEY = os.environ['API_KEY']                # api key
-        self.LOG_PATH = os.environ['LOG_PATH']              # log path
         self.NASDAQ_CSV = '/home/junja/findata/data/market_caps/nasdaq_screener_1690263635982_mktcap.csv'   # nasdaq symbols csv file
 
         self.market_caps = [        # market caps to pull tickers
@@ -59,38 +86,272 @@ class DBUpdater(
         
 
         # init classes
-        Utils.__init__(self, logger)
-        DBHandler.__init__(self, logger, self.DATA_DIR_PATH)
-        EodApiRequestHandler.__init__(self, self.API_KEY)
+        if (n_shards is None):
+            DBHandler.__init__(self, logger, self.DATA_DIR_PATH, profile=db_profile, intra_backend=intra_backend)
+            self.db = self      # every read and write of the update goes through `db`
+        else:
+            self.db = ShardedDBHandler(
+                logger, self.DATA_DIR_PATH, n_shards, profile=db_profile, intra_backend=intra_backend,
+            )
+        EodApiRequestHandler.__init__(
+            self, logger, self.API_KEY,
+            calls_per_minute=calls_per_minute,
+            rate_limit_db_path='{}{}'.format(self.DATA_DIR_PATH, _rate_limit_db_file_name),
+            wait_for_quota=wait_for_quota,
+            response_cache_path=(
+                '{}{}'.format(self.DATA_DIR_PATH, _response_cache_db_file_name)
+                if (use_response_cache or offline) else None
+            ),
+            offline=offline,
+        )
 
         self.exchange = 'us'     # exchange code
 
         self.error_tkls = []       # list of tickers encountered error
+        self.remaining_tkls = []   # list of tickers not updated once the daily quota ran out
         self.max_days = 118     # maximum periods between ‘from’ and ‘to’ for 1 minute intra data
+        self.eod_merge_dates = 20   # stored dates re-fetched at most to join two missing eod ranges in 1 request
+
+
+    def close_all_conn(self):
+        """close all db connections, of every shard with `n_shards`
+        """
+        if (self.db is self):
+            DBHandler.close_all_conn(self)
+        else:
+            self.db.close_all_conn()
 
     # main func
     def update(
         self, start_date:str, end_date:str, 
-        tickers:list[str]=None
+        tickers:list[str]=None, workers:int=1,
+        resume:bool=False, max_attempts:int=3, backoff_secs:int=60,
+        dry_run:bool=False, processes:bool=False,
+    ) -> UpdatePlan:
+        """update eod and intra data of tickers between start and end dates,
+        `plan_update` then `execute_plan`
+
+        Args:
+            start_date (str): start date, '%Y-%m-%d'
+            end_date (str): end date, '%Y-%m-%d'
+            tickers (list[str], optional): tickers to update. Defaults to None (nasdaq screener).
+            workers (int, optional): number of fetchers. Defaults to 1.
+            resume (bool, optional): continue the last unfinished run between the same dates. Defaults to False.
+            max_attempts (int, optional): tries of a failing ticker within the run. Defaults to 3.
+            backoff_secs (int, optional): wait before the first retry, doubled for every further one. Defaults to 60.
+            dry_run (bool, optional): only plan, nothing is requested or written. Defaults to False.
+            processes (bool, optional): fetch and parse in `workers` processes instead of threads. Defaults to False.
+
+        Returns:
+            UpdatePlan: plan of the update
+        """
+        plan = self.plan_update(start_date, end_date, tickers, resume)
+        if (not dry_run):
+            self.execute_plan(plan, workers, max_attempts, backoff_secs, processes)
+        return plan
+
+    def plan_update(
+        self, start_date:str, end_date:str,
+        tickers:list[str]=None, resume:bool=False,
+    ) -> UpdatePlan:
+        """find the missing ranges, request windows and api calls of every ticker,
+        nothing is requested and only missing tables are written
+
+        Args:
+            start_date (str): start date, '%Y-%m-%d'
+            end_date (str): end date, '%Y-%m-%d'
+            tickers (list[str], optional): tickers to update. Defaults to None (nasdaq screener).
+            resume (bool, optional): plan the last unfinished run between the same dates, leaving out
+                what it already pushed. Defaults to False.
+
+        Returns:
+            UpdatePlan: plan, checked against the api calls left today
+        """
+        ipo_dates = self._prepare_tickers(tickers)
+
+        # construct trading dts from the stored sessions
+        calendar = self.db.session_calendar(start_date, end_date)
+
+        # journal, tickers pushed by the resumed run are done
+        run_id = self.db.unfinished_update_run(start_date, end_date) if (resume) else None
+        ticker_states = {} if (run_id is None) else self.db.pull_ticker_states(run_id)
+        tickers = [ticker for ticker in self.tickers if ticker_states.get(ticker, ('', 0))[0] != 'pushed']
+        if (len(tickers) < len(self.tickers)):
+            logger.info("{} tickers already pushed in run {}, skipped".format(len(self.tickers) - len(tickers), run_id))
+
+        ticker_plans, done_tkls = [], []
+        for ticker in tqdm(tickers, desc='plan'):
+            done_windows = {'eod': [], 'intra': []} if (run_id is None) else self.db.pull_windows(run_id, ticker)
+            ticker_plan = self._plan_ticker(ticker, start_date, end_date, calendar, ipo_dates, done_windows)
+            if (ticker_plan is None):
+                done_tkls.append(ticker)
+            else:
+                ticker_plans.append(ticker_plan)
+
+        plan = UpdatePlan(
+            start_date, end_date, calendar, ipo_dates, ticker_plans, done_tkls,
+            call_weights={'eod': self.eod_calls_per_reqeust, 'intra': self.intra_calls_per_reqeust},
+            calls_available=self.calls_remaining(), run_id=run_id,
+        )
+        plan_info = "planned {} tickers to fetch, {} up to date: {} api calls, {} left today".format(
+            len(plan), len(done_tkls), plan.calls, plan.calls_available,
+        )
+        logger.info(plan_info)
+        if (not plan.is_within_quota()):
+            logger.info("- plan exceeds the daily quota, `trim` or `split` it")
+        return plan
+
+    def update_eod_bulk(self, start_date:str, end_date:str, tickers:list[str]=None) -> list[str]:
+        """update eod data of every ticker a date at a time with the exchange's bulk eod,
+        one request per date instead of one per ticker; each date's rows are written
+        for all its tickers in one transaction
+
+        a date is only requested in bulk when it is missing for enough tickers that
+        per-ticker requests would cost more than the bulk one, the tickers of the
+        other dates are left to `update`. a ticker missing a bulk requested date and
+        not in its response is recorded as no data on that date. intra data is left to `update`.
+
+        Args:
+            start_date (str): start date, '%Y-%m-%d'
+            end_date (str): end date, '%Y-%m-%d'
+            tickers (list[str], optional): tickers to update. Defaults to None (nasdaq screener).
+
+        Returns:
+            list[str]: dates updated
+        """
+        ipo_dates = self._prepare_tickers(tickers)
+        trading_dates = self.db.session_calendar(start_date, end_date).dates
+        date_gaps = self._eod_date_gaps(self.tickers, trading_dates, ipo_dates, start_date, end_date)
+        # bulk only pays off once the date's per-ticker requests would cost more
+        bulk_gaps = {
+            date: gap_tkls for date, gap_tkls in date_gaps.items()
+            if (len(gap_tkls) * self.eod_calls_per_reqeust > self.bulk_calls_per_request)
+        }
+        left_tkls = sorted({
+            ticker for date, gap_tkls in date_gaps.items() if (date not in bulk_gaps) for ticker in gap_tkls
+        })
+        bulk_info = ("bulk eod: {} of {} dates in bulk for {} ticker dates, {} api calls, {} left today; "
+                     "{} ticker dates of {} tickers left to `update`").format(
+            len(bulk_gaps), len(trading_dates), sum(len(gap_tkls) for gap_tkls in bulk_gaps.values()),
+            len(bulk_gaps) * self.bulk_calls_per_request, self.calls_remaining(),
+            sum(len(gap_tkls) for date, gap_tkls in date_gaps.items() if (date not in bulk_gaps)), len(left_tkls),
+        )
+        logger.info(bulk_info)
+
+        updated_dates, error_dates = [], []
+        for date, gap_tkls in tqdm(bulk_gaps.items(), desc='bulk eod'):
+            try:
+                is_success_request, bulk_json = self.request_bulk_eod(self.exchange, date)
+            except QuotaExceededError as e:
+                logger.info('bulk eod stopped at {}: {}'.format(date, e))
+                break
+            if (not is_success_request):
+                logger.info('{} bulk eod request failed: \'{}\''.format(date, bulk_json))
+                error_dates.append(date)
+                continue
+            if (self._push_eod_bulk(date, gap_tkls, bulk_json)):
+                updated_dates.append(date)
+            else:
+                error_dates.append(date)
+
+        update_complete_info = "Complete {} dates bulk eod update, {} fail to update, {} left for the next run.".format(
+            len(updated_dates), len(error_dates), len(bulk_gaps) - len(updated_dates) - len(error_dates),
+        )
+        logger.info(update_complete_info)
+        print(update_complete_info)
+        return updated_dates
+
+    def _eod_date_gaps(
+        self, tickers:list[str], trading_dates:np.ndarray, ipo_dates:dict[str, str],
+        start_date:str, end_date:str,
+    ) -> dict[str, list[str]]:
+        """tickers missing eod data on each trading date, from their ipo date on and
+        leaving out no data dates
+
+        Args:
+            tickers (list[str]): tickers
+            trading_dates (np.ndarray): trading dates
+            ipo_dates (dict[str, str]): ipo date of each ticker
+            start_date (str): start date, '%Y-%m-%d'
+            end_date (str): end date, '%Y-%m-%d'
+
+        Returns:
+            dict[str, list[str]]: date: tickers, dates in order, only dates with gaps
+        """
+        stored = self.db.pull_eod(tickers, start_date, end_date, columns=['trade_date'], as_frame=False)
+        stored_dates = pd.Series(stored['trade_date']).groupby(stored['ticker']).agg(list).to_dict()
+        date_gaps = {}
+        for ticker in tickers:
+            tkl_trading_dates = trading_dates[trading_dates >= ipo_dates[ticker]]
+            nodata_dates, _ = self.db.pull_nodata_ranges(ticker)
+            missing_mask = Utils._missing_mask(tkl_trading_dates, stored_dates.get(ticker, []), nodata_dates)
+            for date in tkl_trading_dates[missing_mask].tolist():
+                date_gaps.setdefault(date, []).append(ticker)
+        return dict(sorted(date_gaps.items()))
+
+    def _push_eod_bulk(self, date:str, gap_tkls:list[str], bulk_json:list[dict]) -> bool:
+        """push the bulk eod rows of the tickers missing a date, record the missing ones
+        not in it as no data
+
+        a response without any row of the date is taken as failed, not as no data
+        for every ticker.
+
+        Args:
+            date (str): trade date
+            gap_tkls (list[str]): tickers missing the date and requested in bulk
+            bulk_json (list[dict]): bulk eod response of the date
+
+        Returns:
+            bool: is success
+        """
+        df_bulk = pd.DataFrame(bulk_json)
+        if ((not {'code', 'date'}.issubset(df_bulk.columns)) or (not (df_bulk['date'] == date).any())):
+            logger.info('{} bulk eod has no rows of the date'.format(date))
+            return False
+        df_bulk = df_bulk[df_bulk['code'].isin(gap_tkls) & (df_bulk['date'] == date)]
+        df_bulk = df_bulk.rename(columns={'code': 'ticker'})[
+            ['ticker', 'date', 'open', 'high', 'low', 'close', 'adjusted_close', 'volume']
+        ]
+        logger.info('push {} bulk eod: {} of {} missing tickers returned'.format(date, len(df_bulk), len(gap_tkls)))
+        if ((not df_bulk.empty) and (not self.db.push_eod_bulk(df_bulk))):
+            return False
+        returned_tkls = set(df_bulk['ticker'])
+        self.db.push_nodata_dates_bulk({ticker: [date] for ticker in gap_tkls if ticker not in returned_tkls})
+        return True
+
+    def execute_plan(
+        self, plan:UpdatePlan, workers:int=1,
+        max_attempts:int=3, backoff_secs:int=60, processes:bool=False,
     ):
-        # define tickers to update
-        if tickers:
-            self.tickers = tickers
-        else:
-            self.tickers = pd.read_csv(self.NASDAQ_CSV)['Symbol'].to_list()
-        # validate ticker
-        self.tickers, invalid_tickers, tkl_log_msg = Utils.validate_tickers(self.tickers)
+        """fetch and write the tickers of a plan
 
-        # construct trading dts
-        trading_dates, trading_timestamps = self.all_trading_dts(start_date, end_date)
-        # ipo dates
-        is_success_ipo_dates, ipo_dates = self.pull_ipo_dates_from_fud(self.tickers)
-        if (is_success_ipo_dates):
-            if (len(ipo_dates) != len(self.tickers)):
-                self.logger.info("Unmatch len {} of \'ipo_dates\' and {} of \'tickers\'".format(len(ipo_dates), len(self.tickers)))
-                raise ValueError("Unmatch len {} of \'ipo_dates\' and {} of \'tickers\'".format(len(ipo_dates), len(self.tickers)))
-        else:
-            raise Exception("fail to pull \'ipo_dates\'")
+        tickers are fetched from the api by a pool of `workers` threads (or
+        processes) while the calling thread is the only one touching the
+        databases: it hands the planned requests to the pool and writes the
+        fetched data back as soon as it arrives. fetchers also parse and
+        format the responses, handing back column arrays of the missing dts;
+        the writer pushes every ticker done by the time it comes round in one
+        transaction, and at most 2 x `workers` tickers are in flight.
+
+        once the daily api quota runs out the update stops submitting, writes
+        whatever was fetched and leaves the rest in `self.remaining_tkls`;
+        rerunning the update picks them up since finished tickers have no
+        missing dts.
+
+        progress is journaled in stock_price.db as it happens: the state of
+        every ticker (planned, fetched, pushed, failed) and the request windows
+        already pushed, so a resumed plan skips them. failed tickers are
+        planned again and retried with exponential backoff.
+
+        Args:
+            plan (UpdatePlan): plan from `plan_update`
+            workers (int, optional): number of fetchers. Defaults to 1.
+            max_attempts (int, optional): tries of a failing ticker within the run. Defaults to 3.
+            backoff_secs (int, optional): wait before the first retry, doubled for every further one. Defaults to 60.
+            processes (bool, optional): fetch and parse in processes, for parsing heavy backfills. Defaults to False.
+        """
+        if (workers < 1):
+            raise ValueError("\'workers\' should be a positive integer, not \'{}\'".format(workers))
 
         # init info
         init_string = """
@@ -100,191 +361,566 @@ class DBUpdater(
             - trading_dates: {}
             - trading_timestamps: {}
             - ticker count: {}
+            - api calls: {} ({} left today)
             - market caps: {}
             - exchanges: {}
+            - workers: {}
             -> DATA_DIR_PATH: {}
             -> LOG_PATH: {}
             -> API_KEY: {}
 
             -> program starts at {} <-
             """.format(
-                    start_date, end_date, len(trading_dates),
-                    len(trading_timestamps), len(self.tickers), ', '.join(self.market_caps),
-                    self.exchange, self.DATA_DIR_PATH, self.LOG_PATH, self.API_KEY, 
+                    plan.start_date, plan.end_date, len(plan.calendar.dates),
+                    len(plan.calendar.timestamps), len(plan), plan.calls, self.calls_remaining(),
+                    ', '.join(self.market_caps),
+                    self.exchange, workers, self.DATA_DIR_PATH, self.LOG_PATH, self.API_KEY, 
                     dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                 )
         
         print(init_string)
         logger.info('\n{}'.format(init_string))
         
-        # iter
-        iter_obj = tqdm(range(len(self.tickers)))
-        for i in iter_obj:
-            ticker = self.tickers[i]
-            iter_obj.set_description('{}'.format(ticker))
-            logger.info('-------------------------------------------')
-            logger.info('update {}'.format(ticker))
-            
-            # check ticker table exists, if not create tables
-            is_tkl_table_exists, tkl_tables = self.is_stock_price_tables_exist(ticker)
-            # if ticker table not exists, then create table 
-            if (not is_tkl_table_exists):
-                self.crt_stock_price_tables(ticker, tkl_tables)
-
-            # check nodata dt table exists, if not create table
-            is_nodata_table_exists, nodata_tables = self.is_nodata_table_exists(ticker)
-            if (not is_nodata_table_exists):
-                self.crt_nodata_tables(ticker, nodata_tables)
-                
-            # check hist market cap table exists
-            is_hist_mktcap_table_exists = self.is_data_table_exists(hist_mktcap_table_name.format(ticker))
-            if (not is_hist_mktcap_table_exists):
-                self.crt_ticker_hist_mktcap_table(ticker)
-                
-            # by this time, we will have all dt and ticker table types in place.
-            # ----------------------------------------------------
-
-            # check ticker start date
-            logger.info("check ticker start date")
-            diff = dt.datetime.strptime(ipo_dates[ticker], '%Y-%m-%d')\
-                   - dt.datetime.strptime(start_date, '%Y-%m-%d')
-            if (diff.days > 0):
-                tkl_start_date = ipo_dates[ticker]
-                # update trading dts
-                if (tkl_start_date in trading_dates):
-                    tkl_trading_dates = trading_dates[trading_dates.index(tkl_start_date):]
-                    start_ts = self._construct_trading_period_timestamps(tkl_start_date, tkl_start_date)[0]
-                    tkl_trading_timestamps = trading_timestamps[trading_timestamps.index(start_ts):]
-                    logger.info("- adjust ticker start date({}) to its ipo date({})".format(start_date, ipo_dates[ticker]))
-                    logger.info("- adjust trading dts: {}(dates) {}(tss)".format(len(tkl_trading_dates), len(tkl_trading_timestamps)))
-                else:
-                    logger.info("- update period before its ipo date")
-                    continue
-            else:
-                logger.info("- no change on start date")
-                tkl_start_date = start_date
-            
-            # pull dates & tss from db
-            exist_dates, exist_timestamps = self.pull_tkl_dts(
-                ticker, tkl_start_date, end_date,
-                tkl_trading_timestamps[0], tkl_trading_timestamps[-1],
-            )
+        # journal
+        self.run_id = self.db.start_update_run(plan.start_date, plan.end_date) if (plan.run_id is None) else plan.run_id
+        plan.run_id = self.run_id
+        self.db.set_ticker_states(self.run_id, plan.done_tkls, 'pushed')
+        self.db.set_ticker_states(self.run_id, plan.tickers, 'planned')
+
+        # iter, failed tickers are planned again and retried with exponential backoff
+        self.error_tkls = []
+        self.remaining_tkls = []
+        self._is_quota_exceeded = False
+        ticker_plans = plan.ticker_plans
+        for attempt in range(max_attempts):
+            if (attempt):
+                backoff = backoff_secs * 2 ** (attempt - 1)
+                logger.info("retry {} failed tickers in {}s, attempt {} of {}".format(
+                    len(self.error_tkls), backoff, attempt + 1, max_attempts,
+                ))
+                time.sleep(backoff)
+                ticker_plans = []
+                for ticker in self.error_tkls:
+                    ticker_plan = self._plan_ticker(
+                        ticker, plan.start_date, plan.end_date, plan.calendar, plan.ipo_dates,
+                        self.db.pull_windows(self.run_id, ticker),
+                    )
+                    if (ticker_plan is None):
+                        self.db.set_ticker_states(self.run_id, [ticker], 'pushed')
+                    else:
+                        ticker_plans.append(ticker_plan)
+                self.error_tkls = []
+            self._update_tickers(ticker_plans, workers, processes)
+            if ((not self.error_tkls) or self._is_quota_exceeded):
+                break
+
+        # finishing update
+        if (self.remaining_tkls):
+            logger.info("daily api quota reached, {} tickers left for the next run: {}".format(
+                len(self.remaining_tkls), ', '.join(self.remaining_tkls),
+            ))
+        if (self.error_tkls):
+            logger.info("{} tickers failed, see `pull_journal({})`: {}".format(
+                len(self.error_tkls), self.run_id, ', '.join(self.error_tkls),
+            ))
+        if ((not self.remaining_tkls) and (not self.error_tkls) and (not plan.dropped_tkls)):
+            self.db.finish_update_run(self.run_id)
+        update_complete_info = "Complete {} tickers update, {} fail to update, {} left for the next run.".format(
+            len(plan) + len(plan.done_tkls) - len(self.error_tkls) - len(self.remaining_tkls),
+            len(self.error_tkls), len(self.remaining_tkls) + len(plan.dropped_tkls),
+        )
+        logger.info(update_complete_info)
+        print(update_complete_info)
+
+    def _prepare_tickers(self, tickers:list[str]) -> dict[str, str]:
+        """set and validate `self.tickers`, create their missing tables and pull their ipo dates
+
+        Args:
+            tickers (list[str]): tickers to update, None for the nasdaq screener
+
+        Returns:
+            dict[str, str]: ipo date of each ticker
+        """
+        # define tickers to update
+        if tickers:
+            self.tickers = tickers
+        else:
+            self.tickers = pd.read_csv(self.NASDAQ_CSV)['Symbol'].to_list()
+        # validate ticker
+        self.tickers, invalid_tickers, tkl_log_msg = Utils.validate_tickers(self.tickers)
+
+        # create missing tables of all tickers at once
+        self.db.crt_missing_tables(self.tickers)
 
+        # ipo dates
+        is_success_ipo_dates, ipo_dates = self.db.pull_ipo_dates_from_fud(self.tickers)
+        if (is_success_ipo_dates):
+            if (len(ipo_dates) != len(self.tickers)):
+                self.logger.info("Unmatch len {} of \'ipo_dates\' and {} of \'tickers\'".format(len(ipo_dates), len(self.tickers)))
+                raise ValueError("Unmatch len {} of \'ipo_dates\' and {} of \'tickers\'".format(len(ipo_dates), len(self.tickers)))
+        else:
+            raise Exception("fail to pull \'ipo_dates\'")
+        return ipo_dates
+
+    def _update_tickers(self, ticker_plans:list[dict], workers:int, processes:bool=False):
+        """fetch and write planned tickers, failures are left in `self.error_tkls`
 
-            # pull nodata dts
-            nodata_trading_dates, nodata_timestamps = self.pull_nodata_dts(ticker)
-            exist_dates.append(nodata_trading_dates)
-            exist_timestamps.append(nodata_timestamps) 
-            # check missing
-            missing_trading_dates, missing_timestamps = self.missing_dts(
-                reference_dates=tkl_trading_dates, reference_timestamps=tkl_trading_timestamps,
-                comparant_dates=exist_dates, comparant_timestamps=exist_timestamps
+        Args:
+            ticker_plans (list[dict]): ticker plans from `_plan_ticker`
+            workers (int): number of fetchers
+            processes (bool, optional): fetch in processes instead of threads. Defaults to False.
+        """
+        # at most `max_pending` tickers are fetched or waiting to be written,
+        # so the writer never falls far behind the fetchers; whatever is done
+        # when the writer comes round is written as one batch
+        max_pending = 2 * workers
+        iter_obj = tqdm(total=len(ticker_plans))
+        self._writer_stats = {'batches': 0, 'tickers': 0, 'rows': 0, 'secs': 0.}
+        if (processes):
+            executor = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_fetch_process,
+                initargs=(self.handler_kwargs(), self.call_used),
             )
+            fetch = partial(_fetch_in_process, self.exchange)
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fetcher')
+            fetch = partial(_fetch_and_format, self, self.exchange)
+        with executor:
+            pending = {}    # future: ticker plan
+            for i, ticker_plan in enumerate(ticker_plans):
+                # checkpoint: quota spent, leave unsubmitted tickers for the next run
+                if (self._is_quota_exceeded):
+                    self.remaining_tkls.extend(ticker_plan['ticker'] for ticker_plan in ticker_plans[i:])
+                    break
+                iter_obj.set_description('{}'.format(ticker_plan['ticker']))
+                try:
+                    pending[executor.submit(fetch, ticker_plan)] = ticker_plan
+                except BrokenExecutor as e:
+                    # a fetcher process died, the pool takes nothing more; leave the rest for the next run
+                    logger.info('fetcher pool broken: {!r}, {} tickers left for the next run'.format(e, len(ticker_plans) - i))
+                    self.remaining_tkls.extend(ticker_plan['ticker'] for ticker_plan in ticker_plans[i:])
+                    break
+                # write back fetched tickers before submitting further
+                if (len(pending) >= max_pending):
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    self._write_fetched(done, pending, iter_obj)
             
-            if ((not missing_trading_dates) and (not missing_timestamps)):
-                logger.info('no missing dts; moving to next ticker')
-                continue
-            
-            # if missing dates
-            if (missing_trading_dates):
-                # request eod from api
-                is_success_eod_request, eod_json = self.request_eod(
-                    ticker, self.exchange, tkl_start_date,
-                    end_date
-                )
-                # check if resp valid
-                if (is_success_eod_request):
-                    logger.info('eod request success: {}; length of data: {}'.format(
-                        is_success_eod_request, len(eod_json),
-                    ))
-                else:
-                    logger.info('eod request success: {}; \'{}\', save for later action'.format(
-                        is_success_eod_request, eod_json,
-                    ))
-                    self.error_tkls.append(ticker) # error, save for later action
-                    continue
-            
-            # if missing timestamps
-            if (missing_timestamps):
-                # request intra from api
-                intra_json
-                # construct timestamps for periods within request start and end date
-                timestamp_periods = self.timestamp_periods(
-                    max_days_period=self.max_days, start_date=tkl_start_date, end_date=end_date,
+            # drain, dropping queued fetches if the quota is spent
+            if (self._is_quota_exceeded):
+                for future in list(pending):
+                    if (future.cancel()):
+                        self.remaining_tkls.append(pending.pop(future)['ticker'])
+            done, _ = wait(pending)
+            self._write_fetched(done, pending, iter_obj)
+        iter_obj.close()
+        if (processes):
+            # fetcher processes counted their calls in the shared rate limiter
+            self.call_used = max(self.call_used, self.call_limit - self.rate_limiter.remaining())
+
+        writer_info = "writer: {} tickers, {} rows in {} batches, {:.1f}s writing ({:.0f} rows/s)".format(
+            self._writer_stats['tickers'], self._writer_stats['rows'], self._writer_stats['batches'],
+            self._writer_stats['secs'], self._writer_stats['rows'] / max(self._writer_stats['secs'], 1e-9),
+        )
+        logger.info(writer_info)
+
+    def _plan_ticker(
+        self, ticker:str, start_date:str, end_date:str,
+        calendar:TradingCalendar, ipo_dates:dict[str, str],
+        done_windows:dict[str, list[tuple]],
+    ) -> dict:
+        """find the missing dts of a ticker and the requests to fetch them
+
+        Args:
+            ticker (str): ticker
+            start_date (str): update start date
+            end_date (str): update end date
+            calendar (TradingCalendar): trading calendar of the update
+            ipo_dates (dict[str, str]): ipo date of each ticker
+            done_windows (dict[str, list[tuple]]): request windows pushed earlier in the run, from `pull_windows`
+
+        Returns:
+            dict: ticker plan, None if there is nothing to fetch
+        """
+        logger.info('-------------------------------------------')
+        logger.info('update {}'.format(ticker))
+        
+        # tables of every ticker are created in bulk by `crt_missing_tables` before planning
+        # ----------------------------------------------------
+
+        # check ticker start date
+        logger.info("check ticker start date")
+        diff = dt.datetime.strptime(ipo_dates[ticker], '%Y-%m-%d')\
+               - dt.datetime.strptime(start_date, '%Y-%m-%d')
+        if (diff.days > 0):
+            tkl_start_date = ipo_dates[ticker]
+            # update trading dts
+            tkl_trading_dates, tkl_trading_timestamps = calendar.slice(tkl_start_date)
+            if (len(tkl_trading_dates) == 0):
+                logger.info("- update period before its ipo date")
+                return None
+            logger.info("- adjust ticker start date({}) to its ipo date({})".format(start_date, ipo_dates[ticker]))
+            logger.info("- adjust trading dts: {}(dates) {}(tss)".format(len(tkl_trading_dates), len(tkl_trading_timestamps)))
+        else:
+            logger.info("- no change on start date")
+            tkl_start_date = start_date
+            tkl_trading_dates, tkl_trading_timestamps = calendar.dates, calendar.timestamps
+        
+        # pull dates & tss from db
+        exist_dates, exist_timestamps = self.db.pull_tkl_dts(
+            ticker, tkl_start_date, end_date,
+            tkl_trading_timestamps[0], tkl_trading_timestamps[-1],
+        )
+
+        # pull nodata dts
+        nodata_trading_dates, nodata_ts_ranges = self.db.pull_nodata_ranges(ticker)
+        # check missing
+        missing_date_ranges = Utils.missing_ranges(tkl_trading_dates, exist_dates, nodata_trading_dates)
+        missing_ts_ranges = Utils.missing_ranges(
+            tkl_trading_timestamps, exist_timestamps, covered_ranges=nodata_ts_ranges,
+        )
+        logger.info('- missing dts: {}(dates) in {} ranges, {}(tss) in {} ranges'.format(
+            Utils.ranges_len(tkl_trading_dates, missing_date_ranges), len(missing_date_ranges),
+            Utils.ranges_len(tkl_trading_timestamps, missing_ts_ranges), len(missing_ts_ranges),
+        ))
+        
+        if ((not missing_date_ranges) and (not missing_ts_ranges)):
+            logger.info('no missing dts; moving to next ticker')
+            return None
+
+        # a ticker with every window already pushed is still planned, to record its no data dts
+        eod_windows, intra_windows = self._request_windows(
+            tkl_trading_dates, missing_date_ranges, missing_ts_ranges, done_windows,
+        )
+        logger.info('- requests: {}(eod) {}(intra)'.format(len(eod_windows), len(intra_windows)))
+
+        return {
+            'ticker': ticker,
+            'start_date': tkl_start_date,
+            'end_date': end_date,
+            'trading_dates': tkl_trading_dates,
+            'trading_timestamps': tkl_trading_timestamps,
+            'missing_date_ranges': missing_date_ranges,
+            'missing_ts_ranges': missing_ts_ranges,
+            'eod_windows': eod_windows,
+            'intra_windows': intra_windows,
+        }
+
+    def _request_windows(
+        self, trading_dates:np.ndarray, missing_date_ranges:list[tuple],
+        missing_ts_ranges:list[tuple], done_windows:dict[str, list[tuple]],
+    ) -> tuple[list[tuple], list[tuple]]:
+        """api request windows covering the missing ranges, leaving out the dts of windows already pushed
+
+        Args:
+            trading_dates (np.ndarray): trading dates of the ticker
+            missing_date_ranges (list[tuple]): missing date ranges
+            missing_ts_ranges (list[tuple]): missing timestamp ranges
+            done_windows (dict[str, list[tuple]]): request windows pushed earlier in the run
+
+        Returns:
+            tuple[list[tuple], list[tuple]]: eod windows (dates), intra windows (unix timestamps)
+        """
+        # dts within pushed windows were fetched already, what is left there is no data
+        to_fetch_mask = Utils.in_ranges(trading_dates, missing_date_ranges)
+        for start_date, end_date in done_windows['eod']:
+            to_fetch_mask &= ~((trading_dates >= start_date) & (trading_dates <= end_date))
+        missing_date_ranges = Utils.missing_ranges(trading_dates, trading_dates[~to_fetch_mask])
+        missing_ts_ranges = Utils.subtract_ranges(missing_ts_ranges, Utils.merge_ranges(done_windows['intra']))
+
+        # an eod request costs 1 call whatever its span, missing ranges a few stored
+        # dates apart are joined rather than paying a call for each
+        eod_windows = Utils.coalesce_ranges(trading_dates, missing_date_ranges, self.eod_merge_dates)
+        # every intra request costs the same up to `max_days`, so gaps are packed
+        # into as few windows as fit; stored and no data minutes are not in the gaps
+        intra_windows = Utils.request_windows(missing_ts_ranges, self.max_days * 86400)
+        return eod_windows, intra_windows
+
+    def _write_fetched(self, futures:set, pending:dict, iter_obj:tqdm):
+        """write a batch of fetched tickers to database and journal their states, in the calling (writer) thread
+
+        Args:
+            futures (set): done futures of `_fetch_and_format`
+            pending (dict): in-flight futures and their ticker plans, written ones are removed
+            iter_obj (tqdm): progress bar
+        """
+        if (not futures):
+            return
+        write_start = time.time()
+        ticker_plans = []
+        for future in futures:
+            ticker_plan = pending.pop(future)
+            try:
+                ticker_plan.update(future.result())
+            except Exception as e:
+                # eg. a fetcher process died (BrokenProcessPool), only its tickers fail
+                logger.info('{} fetcher error: {!r}, save for later action'.format(ticker_plan['ticker'], e))
+                ticker_plan.update(
+                    is_success=False, is_quota_exceeded=False, error='fetcher error: {!r}'.format(e),
+                    windows=[], eod_columns={}, intra_columns={},
                 )
-                is_intra_error_breaks = False
-                for start_ts, end_ts in timestamp_periods:
-                    # request intra from api
-                    is_success_intra_request, intra_json_perd = self.request_intra(
-                        ticker, self.exchange, start_ts,
-                        end_ts
-                    )
-                    # check if resp valid
-                    if (is_success_intra_request):
-                        logger.info('intra request success ({} - {}): {}; length of data: {}'.format(
-                            start_ts, end_ts,
-                            is_success_intra_request, len(intra_json_perd),
-                        ))
-                        # extend intra_json
-                        intra_json.extend(intra_json_perd)
-                    else:
-                        logger.info('intra request success ({} - {}): {}; \'{}\', save for later action'.format(
-                            start_ts, end_ts,
-                            is_success_intra_request, intra_json_perd,
-                        ))
-                        self.error_tkls.append(ticker) # error, save for later action
-                        is_intra_error_breaks = True
-                        break
-                # check intra http error
-                if (is_intra_error_breaks):
-                    intra_json = []
-                    continue
-            
-            # construct df for eod and intra
-            df_eod = pd.DataFrame(eod_json)
-            df_intra = pd.DataFrame(intra_json)
-            
-            # filter out non-missing dts and un-want columns
-            df_eod = df_eod[df_eod['date'] == missing_trading_dates]
-            df_intra = df_intra[df_intra['timestamp'] == missing_trading_dates]
-            
-            # push eod & intra
-            is_success_eod_push = self.push_eod(ticker, df_eod)
-            is_success_intra_push = self.push_intra(ticker, df_intra)
-            if ((not is_success_eod_push) or (not is_success_intra_push)):
-                logger.info('error pushing data, save for later action')
-                self.error_tkls.append(ticker)
+            ticker_plans.append(ticker_plan)
+
+        # fetched tickers are written together
+        fetched_plans = [ticker_plan for ticker_plan in ticker_plans if ticker_plan['is_success']]
+        fetched_tkls = [ticker_plan['ticker'] for ticker_plan in fetched_plans]
+        self.db.set_ticker_states(self.run_id, fetched_tkls, 'fetched')
+        pushed_tkls = self._push_tickers(fetched_plans)
+        self.db.set_ticker_states(self.run_id, pushed_tkls, 'pushed')
+        pushed_tkl_set = set(pushed_tkls)
+        push_error_tkls = [ticker for ticker in fetched_tkls if ticker not in pushed_tkl_set]
+        if (push_error_tkls):
+            self.error_tkls.extend(push_error_tkls)
+            self.db.set_ticker_states(self.run_id, push_error_tkls, 'failed', 'push error')
+
+        for ticker_plan in ticker_plans:
+            if (ticker_plan['is_success']):
                 continue
-            
-            # pull dates & tss from db
-            exist_dates, exist_timestamps = self.pull_tkl_dts(
-                ticker, tkl_start_date, end_date,
-                tkl_trading_timestamps[0], tkl_trading_timestamps[-1],
+            ticker = ticker_plan['ticker']
+            # checkpoint the windows fetched before stopping, no data dts are only
+            # recorded once every window of the ticker is in
+            if (ticker_plan['windows']):
+                self._push_tickers([ticker_plan], record_nodata=False)
+            if (ticker_plan['is_quota_exceeded']):
+                self._is_quota_exceeded = True
+                self.remaining_tkls.append(ticker)      # stays planned
+            else:
+                self.error_tkls.append(ticker) # error, save for later action
+                self.db.set_ticker_states(self.run_id, [ticker], 'failed', ticker_plan['error'])
+
+        # writer throughput
+        self._writer_stats['batches'] += 1
+        self._writer_stats['tickers'] += len(ticker_plans)
+        self._writer_stats['rows'] += sum(_rows_count(ticker_plan) for ticker_plan in ticker_plans)
+        self._writer_stats['secs'] += time.time() - write_start
+        iter_obj.set_postfix(rows_per_sec='{:.0f}'.format(
+            self._writer_stats['rows'] / max(self._writer_stats['secs'], 1e-9),
+        ))
+        iter_obj.update(len(ticker_plans))
+
+    def _push_tickers(self, ticker_plans:list[dict], record_nodata:bool=True) -> list[str]:
+        """push fetched eod & intra data of tickers in one transaction, journal their fetched
+        windows and record no data dts; a failing batch is pushed again ticker by ticker
+
+        Args:
+            ticker_plans (list[dict]): fetched ticker plans, with the columns of `_fetch_and_format`
+            record_nodata (bool, optional): record dts still missing as no data. Defaults to True.
+
+        Returns:
+            list[str]: pushed tickers
+        """
+        if (not ticker_plans):
+            return []
+        logger.info('push {}'.format(', '.join(ticker_plan['ticker'] for ticker_plan in ticker_plans)))
+
+        # push eod & intra
+        eod_frames, intra_frames = {}, {}
+        for ticker_plan in ticker_plans:
+            if (len(next(iter(ticker_plan['eod_columns'].values()), []))):
+                eod_frames[ticker_plan['ticker']] = pd.DataFrame(ticker_plan['eod_columns'])
+            if (len(next(iter(ticker_plan['intra_columns'].values()), []))):
+                intra_frames[ticker_plan['ticker']] = pd.DataFrame(ticker_plan['intra_columns'])
+        if ((eod_frames or intra_frames) and (not self.db.push_bars_batch(eod_frames, intra_frames))):
+            if (len(ticker_plans) == 1):
+                logger.info('error pushing data, save for later action')
+                return []
+            logger.info('error pushing a batch, push ticker by ticker')
+            return [
+                ticker for ticker_plan in ticker_plans
+                for ticker in self._push_tickers([ticker_plan], record_nodata)
+            ]
+        self.db.push_windows_batch(
+            self.run_id, {ticker_plan['ticker']: ticker_plan['windows'] for ticker_plan in ticker_plans},
+        )
+        if (record_nodata):
+            for ticker_plan in ticker_plans:
+                self._record_nodata(ticker_plan)
+        return [ticker_plan['ticker'] for ticker_plan in ticker_plans]
+
+    def _record_nodata(self, ticker_plan:dict):
+        """record the dts of a fully fetched ticker still missing as no data
+
+        Args:
+            ticker_plan (dict): pushed ticker plan
+        """
+        ticker = ticker_plan['ticker']
+        # pull dates & tss from db
+        exist_dates, exist_timestamps = self.db.pull_tkl_dts(
+            ticker, ticker_plan['start_date'], ticker_plan['end_date'],
+            ticker_plan['trading_timestamps'][0], ticker_plan['trading_timestamps'][-1],
+        )
+        
+        # double check missing
+        # if still missing then define as no data dates
+        # push to NODATADB
+        trading_dates, trading_timestamps = ticker_plan['trading_dates'], ticker_plan['trading_timestamps']
+        missing_date_ranges = Utils.missing_ranges(trading_dates, exist_dates)
+        missing_ts_ranges = Utils.missing_ranges(trading_timestamps, exist_timestamps)
+        # return if no missing dts
+        if ((not missing_date_ranges) and (not missing_ts_ranges)):
+            logger.info('no missing dts; moving to next ticker')
+            return
+        
+        # push no data dts
+        self.db.push_nodata_ranges(
+            ticker,
+            trading_dates[Utils.in_ranges(trading_dates, missing_date_ranges)].tolist(),
+            missing_ts_ranges,
+        )
+
+
+# fetcher side, runs on fetcher threads and processes, never touches the databases
+_process_handler = None     # api handler of a fetcher process, created by `_init_fetch_process`
+
+def _init_fetch_process(handler_kwargs:dict, call_used:int):
+    """create the api handler of a fetcher process, sharing the rate limiter
+    state and response cache files of the updater
+
+    Args:
+        handler_kwargs (dict): `EodApiRequestHandler` arguments, from `handler_kwargs`
+        call_used (int): api calls used today, known by the updater
+    """
+    global _process_handler
+    _process_handler = EodApiRequestHandler(logger, **handler_kwargs)
+    _process_handler.call_used = call_used
+
+def _fetch_in_process(exchange:str, ticker_plan:dict) -> dict:
+    """`_fetch_and_format` with the api handler of the fetcher process
+
+    Args:
+        exchange (str): exchange code
+        ticker_plan (dict): ticker plan from `DBUpdater._plan_ticker`
+
+    Returns:
+        dict: fetched columns and states, see `_fetch_and_format`
+    """
+    return _fetch_and_format(_process_handler, exchange, ticker_plan)
+
+def _fetch_and_format(handler:EodApiRequestHandler, exchange:str, ticker_plan:dict) -> dict:
+    """request the planned eod and intra windows of a ticker, parse the responses and
+    keep the missing dts as formatted column arrays, compact to hand to the writer
+
+    Args:
+        handler (EodApiRequestHandler): api handler
+        exchange (str): exchange code
+        ticker_plan (dict): ticker plan from `DBUpdater._plan_ticker`
+
+    Returns:
+        dict: 'is_success', 'is_quota_exceeded', 'error', 'windows' (fetched request windows, kept
+            on failure), 'eod_columns' and 'intra_columns' (column: np.ndarray, formatted names)
+    """
+    ticker = ticker_plan['ticker']
+    fetched = {
+        'is_success': False, 'is_quota_exceeded': False, 'error': None,
+        'windows': [], 'eod_columns': {}, 'intra_columns': {},
+    }
+    eod_json, intra_json = [], []
+    try:
+        for start_date, end_date in ticker_plan['eod_windows']:
+            # request eod from api
+            is_success_eod_request, eod_json_perd = handler.request_eod(
+                ticker, exchange, start_date, end_date,
             )
-            
-            # double check missing
-            # if still missing then define as no data dates
-            # push to NODATADB
-            # check missing
-            missing_trading_dates, missing_timestamps = self.missing_dts(
-                reference_dates=tkl_trading_dates, reference_timestamps=tkl_trading_timestamps,
-                comparant_dates=exist_dates, comparant_timestamps=exist_timestamps
+            # check if resp valid
+            if (is_success_eod_request):
+                logger.info('{} eod request success: {}; length of data: {}'.format(
+                    ticker, is_success_eod_request, len(eod_json_perd),
+                ))
+            else:
+                logger.info('{} eod request success: {}; \'{}\', save for later action'.format(
+                    ticker, is_success_eod_request, eod_json_perd,
+                ))
+                fetched['error'] = 'eod request: {}'.format(eod_json_perd)
+                break
+            eod_json.extend(eod_json_perd)
+            fetched['windows'].append(('eod', start_date, end_date))
+        
+        for start_ts, end_ts in (ticker_plan['intra_windows'] if (fetched['error'] is None) else []):
+            # request intra from api
+            is_success_intra_request, intra_json_perd = handler.request_intra(
+                ticker, exchange, start_ts,
+                end_ts
             )
-            # continue if no missing dts
-            if ((not missing_trading_dates) and (not missing_timestamps)):
-                logger.info('no missing dts; moving to next ticker')
-                continue
+            # check if resp valid
+            if (is_success_intra_request):
+                logger.info('{} intra request success ({} - {}): {}; length of data: {}'.format(
+                    ticker, start_ts, end_ts,
+                    is_success_intra_request, len(intra_json_perd),
+                ))
+                # extend intra_json
+                intra_json.extend(intra_json_perd)
+                fetched['windows'].append(('intra', start_ts, end_ts))
             else:
-                # push no data dts
-                self.push_nodata_dts(exist_dates, missing_trading_dates, missing_timestamps)
-            
-            # move to next ticker
+                logger.info('{} intra request success ({} - {}): {}; \'{}\', save for later action'.format(
+                    ticker, start_ts, end_ts,
+                    is_success_intra_request, intra_json_perd,
+                ))
+                fetched['error'] = 'intra request: {}'.format(intra_json_perd)
+                break
+        fetched['is_success'] = fetched['error'] is None
+    except QuotaExceededError as e:
+        logger.info('{} fetch stopped: {}'.format(ticker, e))
+        fetched['is_quota_exceeded'] = True
+    except Exception as e:
+        logger.info('{} fetch error: {}, save for later action'.format(ticker, e))
+        fetched['error'] = 'fetch error: {}'.format(e)
 
-        # finishing update
-        update_complete_info = "Complete {} tickers update, {} fail to update.".format(len(self.tickers)-len(self.error_tkls), len(self.error_tkls))
-        logger.info(update_complete_info)
-        print(update_complete_info)
-        
-        # choose to save error tickers
-        self._check_save_error_tkls(self.error_tkls)
-        
\ No newline at end of file
+    # format what was fetched, partly fetched tickers are checkpointed by the writer
+    try:
+        fetched['eod_columns'] = _format_columns(
+            eod_json, 'eod', 'date', ticker_plan['missing_date_ranges'], ticker_plan['trading_dates'],
+        )
+        fetched['intra_columns'] = _format_columns(
+            intra_json, 'intra', 'timestamp', ticker_plan['missing_ts_ranges'], ticker_plan['trading_timestamps'],
+        )
+    except (ValueError, KeyError) as e:
+        # eg. a response without its date/timestamp column
+        logger.info('{} format error: {!r}, save for later action'.format(ticker, e))
+        fetched.update(is_success=False, error='format error: {!r}'.format(e), windows=[])
+    return fetched
+
+def _format_columns(
+    json_rows:list[dict], table_type:str, dt_column:str,
+    missing_ranges:list[tuple], trading_dts:np.ndarray,
+) -> dict[str, np.ndarray]:
+    """missing dts on the trading grid of an api response, as formatted column arrays
+
+    Args:
+        json_rows (list[dict]): eod or intra response rows
+        table_type (str): 'eod' or 'intra'
+        dt_column (str): date/timestamp column of the response
+        missing_ranges (list[tuple]): missing ranges of the ticker plan
+        trading_dts (np.ndarray): trading dates or timestamps of the ticker plan
+
+    Raises:
+        ValueError: response columns do not match the table
+        KeyError: response without `dt_column`
+
+    Returns:
+        dict[str, np.ndarray]: formatted column: values, empty if nothing is missing
+    """
+    df = pd.DataFrame(json_rows)
+    if (df.empty):
+        return {}
+    # filter out non-missing dts and dts off the trading grid
+    df = df[
+        Utils.in_ranges(df[dt_column], missing_ranges)
+        & ~Utils._missing_mask(df[dt_column], trading_dts)
+    ]
+    is_success_format, df = Utils._format_column_names(df, table_type)
+    if (not is_success_format):
+        raise ValueError("unexpected {} columns".format(table_type))
+    return {col: df[col].to_numpy() for col in df.columns}
+
+def _rows_count(ticker_plan:dict) -> int:
+    """eod and intra rows fetched for a ticker
+
+    Args:
+        ticker_plan (dict): fetched ticker plan
+
+    Returns:
+        int: rows
+    """
+    return sum(
+        len(next(iter(columns.values()), []))
+        for columns in (ticker_plan['eod_columns'], ticker_plan['intra_columns'])
+    )
@@ -7,11 +7,10 @@
 import os
 import re
 import pytz
-import logging
+import functools
 import numpy as np
 import pandas as pd
 import datetime as dt
-import pandas_market_calendars as mcal
 
 from delta.logger import logger
 
@@ -26,6 +25,117 @@ numpy_num_types = [
 
 desire_fmt = '%Y-%m-%d'
 
+_pre_market_start = '04:00:00'      # EST, default session boundaries
+_after_hours_end = '20:00:00'       # EST
+
+# one NYSE session, unix timestamps of its boundaries; early closes end at 13:00, after hours at 17:00
+session_dtype = np.dtype([
+    ('trade_date', 'U10'),
+    ('pre_open', 'i8'),
+    ('market_open', 'i8'),
+    ('market_close', 'i8'),
+    ('post_close', 'i8'),
+])
+_schedule_columns = {       # pandas_market_calendars schedule column of each session field
+    'pre_open': 'pre',
+    'market_open': 'market_open',
+    'market_close': 'market_close',
+    'post_close': 'post',
+}
+
+
+def nyse_sessions(start_date:str, end_date:str) -> np.ndarray:
+    """NYSE sessions between start and end dates from pandas_market_calendars
+
+    Args:
+        start_date (str): start date, '%Y-%m-%d'
+        end_date (str): end date, '%Y-%m-%d'
+
+    Returns:
+        np.ndarray: `session_dtype` sessions, sorted by date
+    """
+    # heavy import, only needed once sessions are computed
+    import pandas_market_calendars as mcal
+    schedule = mcal.get_calendar('NYSE').schedule(start_date, end_date, start='pre', end='post') # type: ignore
+    sessions = np.empty(len(schedule), dtype=session_dtype)
+    sessions['trade_date'] = np.datetime_as_string(schedule.index.values.astype('datetime64[D]'), unit='D')
+    for field, column in _schedule_columns.items():
+        sessions[field] = pd.DatetimeIndex(schedule[column]).as_unit('s').asi8
+    return sessions
+
+
+class TradingCalendar:
+    """NYSE trading dates and their 1min timestamps from each session's
+    pre-market open to its after-hours close (04:00:00 - 20:00:00 EST, 17:00:00 on early closes)
+
+    built once per period with array arithmetic, from stored sessions (see
+    `StockPriceDB.session_calendar`) or from pandas_market_calendars; use
+    `Utils.trading_calendar` to get a cached instance and `slice` to cut it per ticker.
+    """
+    
+    def __init__(self, start_date:str, end_date:str, sessions:np.ndarray=None):
+        """init TradingCalendar
+
+        Args:
+            start_date (str): start date, '%Y-%m-%d'
+            end_date (str): end date, '%Y-%m-%d'
+            sessions (np.ndarray, optional): `session_dtype` sessions of the period, sorted by date.
+                Defaults to None (computed with pandas_market_calendars).
+        """
+        if (sessions is None):
+            sessions = nyse_sessions(start_date, end_date)
+        
+        self.start_date = start_date
+        self.end_date = end_date
+        self.sessions = sessions
+        self.dates = sessions['trade_date'].copy()      # '%Y-%m-%d'
+        # pre-market open of each day, dst aware
+        self.day_start_timestamps = sessions['pre_open'].astype(np.int64)
+        # minutes of each day and where each day starts in the flattened grid
+        minutes = (sessions['post_close'] - sessions['pre_open']) // 60 + 1
+        self._day_offsets = np.concatenate(([0], np.cumsum(minutes))).astype(np.int64)
+        # ragged (days, minutes) grid flattened to a sorted int64 array
+        self.timestamps = (
+            np.repeat(self.day_start_timestamps, minutes)
+            + (np.arange(self._day_offsets[-1], dtype=np.int64) - np.repeat(self._day_offsets[:-1], minutes)) * 60
+        )
+        self.timestamps.flags.writeable = False
+        self.dates.flags.writeable = False
+
+    def slice(self, start_date:str, end_date:str=None) -> tuple[np.ndarray, np.ndarray]:
+        """trading dates and timestamps between start and end dates, as read-only views
+
+        Args:
+            start_date (str): start date, '%Y-%m-%d'
+            end_date (str, optional): end date, '%Y-%m-%d'. Defaults to None (calendar end).
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: dates ('%Y-%m-%d'), timestamps (int64)
+        """
+        start_i = np.searchsorted(self.dates, start_date, side='left')
+        end_i = len(self.dates) if (end_date is None) else np.searchsorted(self.dates, end_date, side='right')
+        return (
+            self.dates[start_i:end_i],
+            self.timestamps[self._day_offsets[start_i]:self._day_offsets[end_i]],
+        )
+
+    def period_timestamps(self, start_date:str, end_date:str) -> list[int]:
+        """pre-market open of the first and after-hours close of the last session between start and end dates
+
+        Args:
+            start_date (str): start date, '%Y-%m-%d'
+            end_date (str): end date, '%Y-%m-%d'
+
+        Returns:
+            list[int]: [start_ts, end_ts], None if no session falls between the dates
+        """
+        start_i = np.searchsorted(self.dates, start_date, side='left')
+        end_i = np.searchsorted(self.dates, end_date, side='right') - 1
+        if (start_i > end_i):
+            return None
+        return [int(self.sessions['pre_open'][start_i]), int(self.sessions['post_close'][end_i])]
+
+
 class Utils:
 
     def dt_obj_2_str(dates:list) -> list[str]:
@@ -102,42 +212,31 @@ class Utils:
         # if not numpy number types then return itself
         return input_data
     
-    def all_trading_dts(start_date:str, end_date:str) -> tuple[list[str], list[int]]:
+    @functools.lru_cache(maxsize=8)
+    def trading_calendar(start_date:str, end_date:str) -> TradingCalendar:
+        """cached trading calendar between start and end dates
+
+        Args:
+            start_date (str): start date, '%Y-%m-%d'
+            end_date (str): end date, '%Y-%m-%d'
+
+        Returns:
+            TradingCalendar: calendar shared by all callers of the same period
+        """
+        return TradingCalendar(start_date, end_date)
+
+    def all_trading_dts(start_date:str, end_date:str) -> tuple[np.ndarray, np.ndarray]:
         """construct all trading dates and timestamps between start and end dates
-           * only call this function once *
 
         Args:
             start_date (str): _description_
             end_date (str): _description_
 
         Returns:
-            tuple[list[str], list[int]]: _description_
+            tuple[np.ndarray, np.ndarray]: dates ('%Y-%m-%d'), 1min timestamps (int64) from pre-market open to after-hours close
         """
-
-        # construct dates between input dates
-        nyse = mcal.get_calendar('NYSE')
-        schedule = nyse.schedule(start_date, end_date) # type: ignore
-        trading_dates = [
-            dt.datetime.strftime(d, desire_fmt)
-            for d in schedule.index.normalize().tolist()
-        ]
-        
-        timestamps = []
-        # construct timestamps between 09:00:00 and 20:00:00 for each trading date
-        for trading_date in trading_dates:
-            # Define the pre-market start and after-hours end times
-            pre_market_start = pd.Timestamp("{} 04:00:00".format(trading_date), tz=est)
-            after_hours_end = pd.Timestamp("{} 20:00:00".format(trading_date), tz=est)
-
-            # print(timestamps[0].timestamp(), int(timestamps[0].timestamp()))
-            timestamps.extend([
-                int(t.timestamp())
-                for t in pd.date_range(
-                    start=pre_market_start, end=after_hours_end, freq='1min'    # generate all 1min dt objs
-                )
-            ])
-        
-        return trading_dates, timestamps
+        calendar = Utils.trading_calendar(start_date, end_date)
+        return calendar.dates, calendar.timestamps
 
     def missing_dts(
         reference_dates:list, comparant_dates:list,
@@ -152,7 +251,7 @@ class Utils:
             comparant_timestamps (list): _description_
 
         Returns:
-            tuple[list[str], list[int]]: _description_
+            tuple[list[str], list[int]]: sorted missing dates and timestamps
         """
         logger.info('checking missing dts: {}(ref_dates), {}(ref_tss)'.format(
             len(reference_dates), len(reference_timestamps)
@@ -162,16 +261,231 @@ class Utils:
         ))
         
         # construct missings
-        missing_dates = list(set(reference_dates) - set(comparant_dates))
-        missing_timestamps = list(set(reference_timestamps) - set(comparant_timestamps))
+        reference_dates = np.sort(np.asarray(reference_dates, dtype=str))
+        reference_timestamps = np.sort(np.asarray(reference_timestamps, dtype=np.int64))
+        missing_dates = reference_dates[Utils._missing_mask(reference_dates, comparant_dates)].tolist()
+        missing_timestamps = reference_timestamps[Utils._missing_mask(reference_timestamps, comparant_timestamps)].tolist()
         
         logger.info('- missing dts: {}(dates) {}(tss)'.format(len(missing_dates), len(missing_timestamps)))
         
         return missing_dates, missing_timestamps
+
+    def missing_ranges(
+        reference:np.ndarray, *comparants:np.ndarray,
+        covered_ranges:list[tuple]=None,
+    ) -> list[tuple]:
+        """merged ranges of the reference grid not found in any comparant
+
+        a range is closed, (first missing, last missing), and runs over
+        consecutive reference points; eg. a gap from 19:58 to the next
+        day's 04:01 is one range.
+
+        Args:
+            reference (np.ndarray): sorted reference dates ('%Y-%m-%d') or timestamps
+            *comparants (np.ndarray): existing dates or timestamps, any order
+            covered_ranges (list[tuple], optional): sorted ranges known to be covered, eg. no data ranges. Defaults to None.
+
+        Returns:
+            list[tuple]: [(start, end), ...], sorted
+        """
+        reference = np.asarray(reference)
+        if (len(reference) == 0):
+            return []
+        mask = Utils._missing_mask(reference, *comparants)
+        if (covered_ranges):
+            mask &= ~Utils.in_ranges(reference, covered_ranges)
+        missing_i = np.flatnonzero(mask)
+        if (len(missing_i) == 0):
+            return []
+        
+        # split into runs of consecutive reference indices
+        breaks = np.flatnonzero(np.diff(missing_i) != 1)
+        starts = missing_i[np.concatenate(([0], breaks + 1))]
+        ends = missing_i[np.concatenate((breaks, [len(missing_i) - 1]))]
+        return list(zip(reference[starts].tolist(), reference[ends].tolist()))
+
+    def in_ranges(values:np.ndarray, ranges:list[tuple]) -> np.ndarray:
+        """mask of values inside any of the closed ranges
+
+        Args:
+            values (np.ndarray): dates ('%Y-%m-%d') or timestamps
+            ranges (list[tuple]): sorted, non-overlapping [(start, end), ...]
+
+        Returns:
+            np.ndarray: bool mask, same length as values
+        """
+        values = np.asarray(values)
+        if ((len(ranges) == 0) or (len(values) == 0)):
+            return np.zeros(len(values), dtype=bool)
+        starts, ends = (np.asarray(bounds) for bounds in zip(*ranges))
+        if (values.dtype.kind in 'OU'):
+            values, starts, ends = values.astype(str), starts.astype(str), ends.astype(str)
+        i = np.searchsorted(starts, values, side='right') - 1
+        return (i >= 0) & (values <= ends[np.clip(i, 0, None)])
+
+    def ranges_len(reference:np.ndarray, ranges:list[tuple]) -> int:
+        """number of reference points covered by the ranges
+
+        Args:
+            reference (np.ndarray): sorted reference dates or timestamps
+            ranges (list[tuple]): sorted, non-overlapping [(start, end), ...]
+
+        Returns:
+            int: number of points
+        """
+        if (len(ranges) == 0):
+            return 0
+        reference = np.asarray(reference)
+        starts, ends = (np.asarray(bounds).astype(reference.dtype) for bounds in zip(*ranges))
+        return int((
+            np.searchsorted(reference, ends, side='right')
+            - np.searchsorted(reference, starts, side='left')
+        ).sum())
+
+    def points_to_ranges(points:list[int], step:int=60) -> list[tuple[int, int]]:
+        """group points `step` apart into closed ranges
+
+        Args:
+            points (list[int]): timestamps, any order
+            step (int, optional): spacing of consecutive points. Defaults to 60 (1min).
+
+        Returns:
+            list[tuple[int, int]]: [(start, end), ...], sorted
+        """
+        points = np.unique(np.asarray(points, dtype=np.int64))
+        if (len(points) == 0):
+            return []
+        breaks = np.flatnonzero(np.diff(points) > step)
+        starts = points[np.concatenate(([0], breaks + 1))]
+        ends = points[np.concatenate((breaks, [len(points) - 1]))]
+        return list(zip(starts.tolist(), ends.tolist()))
+
+    def merge_ranges(ranges:list[tuple[int, int]], step:int=60) -> list[tuple[int, int]]:
+        """merge overlapping closed ranges and ranges at most `step` apart
+
+        Args:
+            ranges (list[tuple[int, int]]): [(start, end), ...], any order
+            step (int, optional): spacing of consecutive points. Defaults to 60 (1min).
+
+        Returns:
+            list[tuple[int, int]]: merged ranges, sorted
+        """
+        merged = []
+        for start, end in sorted(ranges):
+            if (merged and (start <= merged[-1][1] + step)):
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    def subtract_ranges(
+        ranges:list[tuple[int, int]], remove_ranges:list[tuple[int, int]],
+        step:int=60,
+    ) -> list[tuple[int, int]]:
+        """remove closed ranges from closed ranges of points `step` apart
+
+        Args:
+            ranges (list[tuple[int, int]]): sorted, non-overlapping ranges
+            remove_ranges (list[tuple[int, int]]): sorted, non-overlapping ranges to remove
+            step (int, optional): spacing of consecutive points. Defaults to 60 (1min).
+
+        Returns:
+            list[tuple[int, int]]: remaining ranges, sorted
+        """
+        remaining = []
+        j = 0
+        for start, end in ranges:
+            # skip removals ending before this range
+            while ((j < len(remove_ranges)) and (remove_ranges[j][1] < start)):
+                j += 1
+            k = j
+            while ((k < len(remove_ranges)) and (remove_ranges[k][0] <= end)):
+                rm_start, rm_end = remove_ranges[k]
+                if (rm_start - step >= start):
+                    remaining.append((start, rm_start - step))
+                start = max(start, rm_end + step)
+                k += 1
+            if (start <= end):
+                remaining.append((start, end))
+        return remaining
+
+    def coalesce_ranges(reference:np.ndarray, ranges:list[tuple], max_gap:int) -> list[tuple]:
+        """join neighbouring ranges at most `max_gap` reference points apart
+
+        Args:
+            reference (np.ndarray): sorted reference dates ('%Y-%m-%d') or timestamps
+            ranges (list[tuple]): sorted, non-overlapping ranges of reference points
+            max_gap (int): largest number of reference points between two joined ranges
+
+        Returns:
+            list[tuple]: [(start, end), ...], sorted
+        """
+        if (len(ranges) == 0):
+            return []
+        reference = np.asarray(reference)
+        starts, ends = (np.asarray(bounds).astype(reference.dtype) for bounds in zip(*ranges))
+        # reference points strictly between each range and the next
+        gaps = np.searchsorted(reference, starts[1:], side='left') - np.searchsorted(reference, ends[:-1], side='right')
+        coalesced = [ranges[0]]
+        for (start, end), gap in zip(ranges[1:], gaps.tolist()):
+            if (gap <= max_gap):
+                coalesced[-1] = (coalesced[-1][0], end)
+            else:
+                coalesced.append((start, end))
+        return coalesced
+
+    def request_windows(
+        ranges:list[tuple[int, int]], max_span:int, step:int=60,
+    ) -> list[tuple[int, int]]:
+        """fewest windows of at most `max_span` covering closed ranges of points `step` apart,
+        each window starts at the first point not covered yet and takes in every range
+        (or part of one) ending within `max_span` of it
+
+        Args:
+            ranges (list[tuple[int, int]]): sorted, non-overlapping ranges, eg. missing timestamps
+            max_span (int): largest `end - start` of a window
+            step (int, optional): spacing of consecutive points. Defaults to 60 (1min).
+
+        Returns:
+            list[tuple[int, int]]: [(start, end), ...], sorted
+        """
+        windows = []
+        for start, end in ranges:
+            while True:
+                if (windows and (start <= windows[-1][0] + max_span)):
+                    window_start, window_end = windows[-1]
+                    limit = window_start + max_span
+                    windows[-1] = (window_start, max(window_end, min(end, limit)))
+                    if (end <= limit):
+                        break
+                    start = limit + step    # rest of the range goes to a new window
+                else:
+                    windows.append((start, start))
+        return windows
+
+    def _missing_mask(reference:np.ndarray, *comparants:np.ndarray) -> np.ndarray:
+        """mask of reference points not found in any comparant
+
+        Args:
+            reference (np.ndarray): reference points, any order
+            *comparants (np.ndarray): existing points, any order
+
+        Returns:
+            np.ndarray: bool mask, same length as reference
+        """
+        reference = np.asarray(reference)
+        mask = np.ones(len(reference), dtype=bool)
+        for comparant in comparants:
+            if (len(comparant) == 0):
+                continue
+            comparant = np.sort(np.asarray(comparant).astype(reference.dtype))
+            i = np.clip(np.searchsorted(comparant, reference), 0, len(comparant) - 1)
+            mask &= (comparant[i] != reference)
+        return mask
         
     def timestamp_periods(
         max_days_period:int, start_date:str,
-        end_date:str,
+        end_date:str, calendar:TradingCalendar=None,
     ) -> list[list]:
         """_summary_
 
@@ -179,6 +493,7 @@ class Utils:
             max_days_period (int): _description_
             start_date (str): _description_
             end_date (str): _description_
+            calendar (TradingCalendar, optional): sessions bounding each period. Defaults to None (04:00 - 20:00 EST).
 
         Returns:
             list[list]: _description_
@@ -207,7 +522,7 @@ class Utils:
                 if (future_end_days_perd > 0):     # period future exceeds end date
                     timestamps_periods.append(
                         Utils._construct_trading_period_timestamps(
-                            current_dt_obj.strftime(desire_fmt), end_date
+                            current_dt_obj.strftime(desire_fmt), end_date, calendar,
                         )
                     )
                     is_last_period = True
@@ -215,7 +530,7 @@ class Utils:
                     timestamps_periods.append(
                         Utils._construct_trading_period_timestamps(
                             current_dt_obj.strftime(desire_fmt),
-                            future_dt_obj.strftime(desire_fmt)
+                            future_dt_obj.strftime(desire_fmt), calendar,
                         )
                     )
                     last_end_dt_obj = future_dt_obj
@@ -225,82 +540,83 @@ class Utils:
             return timestamps_periods 
             
         else:
-            return [Utils._construct_trading_period_timestamps(start_date, end_date)]
+            return [Utils._construct_trading_period_timestamps(start_date, end_date, calendar)]
 
     def _construct_trading_period_timestamps(
-        start_date:str, end_date:str,
+        start_date:str, end_date:str, calendar:TradingCalendar=None,
     ) -> list[int]:
-        """_summary_
+        """first and last timestamps of the sessions between start and end dates
 
         Args:
             start_date (str): _description_
             end_date (str): _description_
+            calendar (TradingCalendar, optional): sessions of the period. Defaults to None (04:00 - 20:00 EST).
 
         Returns:
-            _type_: _description_
+            list[int]: [start_ts, end_ts]
         """
+        if (calendar is not None):
+            period_timestamps = calendar.period_timestamps(start_date, end_date)
+            if (period_timestamps is not None):
+                return period_timestamps
         return [
-            int(pd.Timestamp("{} 04:00:00".format(start_date), tz=est).timestamp()),    # pre-market
-            int(pd.Timestamp("{} 20:00:00".format(end_date), tz=est).timestamp())    # after-hour
+            int(pd.Timestamp("{} {}".format(start_date, _pre_market_start), tz=est).timestamp()),    # pre-market
+            int(pd.Timestamp("{} {}".format(end_date, _after_hours_end), tz=est).timestamp())    # after-hour
         ]
         
-    def _check_save_error_tkls(error_tkls:list[str]):
-        """choose to save error tickers
+    def file_exists(file_path:str) -> bool:
+        """check if file path exists
 
         Args:
-            error_tkls (list[str]): tickers encountered error
-        """
-
-        save_error_tickers_info = "Do you want to save error tickers to a .csv file?\nYes or No(Y/N): "
-        print(save_error_tickers_info)
-        is_loop = True
-        # check input
-        while (is_loop):
-            is_save_error_tkls = input().lower()
-            if (is_save_error_tkls == "y"):
-                file_path = Utils._ask_4_path()
-                pd.DataFrame(columns=['ticker'], data=np.array(error_tkls)).to_csv(file_path)
-                logger.info('{}{}'.format(save_error_tickers_info, is_save_error_tkls))
-                logger.info('error tickers saved to \'{}\''.format(file_path))
-                print('error tickers saved to \'{}\''.format(file_path))
-                is_loop = False
-            elif (is_save_error_tkls == "n"):
-                logger.info('{}{}'.format(save_error_tickers_info, is_save_error_tkls))
-                is_loop = False
-            else:
-                continue
-
-    def _ask_4_path() -> str:
-        """ask file path to store error tickers
+            file_path (str): _description_
 
         Returns:
-            str: file path
-            
+            bool: _description_
         """
-        ask_4_path_info = "Plase enter full file path(.csv): "
-        is_loop = True
-        
-        while (is_loop):
-            file_path = input(ask_4_path_info)
-            dir_path = os.path.dirname(file_path)
-
-            # check valid path
-            if (os.path.isdir(dir_path)):
-                is_loop = False
-                return file_path
-            else:
-                print("Directory path is invalid")
+        return os.path.isfile(file_path)
 
-    def file_exists(file_path:str) -> bool:
-        """check if file path exists
+    def write_chunks(chunks, file_path:str, file_format:str=None) -> int:
+        """stream DataFrame chunks into one csv or parquet file, holding one chunk at a time
 
         Args:
-            file_path (str): _description_
+            chunks (Iterable[pd.DataFrame]): chunks with the same columns
+            file_path (str): output file
+            file_format (str, optional): 'csv' or 'parquet'. Defaults to None (from the file extension).
+
+        Raises:
+            ValueError: unknown file format
 
         Returns:
-            bool: _description_
+            int: rows written, a parquet file is only created once there is a chunk
         """
-        return os.path.isfile(file_path)
+        if (file_format is None):
+            file_format = os.path.splitext(file_path)[1].lstrip('.').lower()
+        if (file_format not in ('csv', 'parquet')):
+            raise ValueError("\'file_format\' should be 'csv' or 'parquet', not \'{}\'".format(file_format))
+
+        n_rows = 0
+        if (file_format == 'csv'):
+            with open(file_path, 'w', newline='') as csv_file:
+                for i, chunk in enumerate(chunks):
+                    chunk.to_csv(csv_file, header=(i == 0), index=False)
+                    n_rows += len(chunk)
+            return n_rows
+
+        # optional dependency, only needed for parquet
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if (writer is None):
+                    writer = pq.ParquetWriter(file_path, table.schema)
+                writer.write_table(table)
+                n_rows += len(chunk)
+        finally:
+            if (writer is not None):
+                writer.close()
+        return n_rows
 
     def _format_column_names(
         df: pd.DataFrame, table_type:str,